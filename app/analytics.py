@@ -0,0 +1,263 @@
+import array
+import math
+import threading
+import time
+from app.models.customer import CustomerModel
+from app.models.propertyAddress import PropertyAddressModel
+from app.models.types import normalize_state_code
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+"""
+Defines the columnar snapshot behind the /analytics/usage endpoints.
+
+Dashboards group electricity usage by state, old roof and postal prefix. Running those as
+ad hoc SQL on the primary competes with production traffic. Instead, a snapshot copies the
+few columns involved into compact typed arrays, once per refresh, and every query is a
+scan over those arrays:
+- usage: electricity_usage_kwh, with a validity mask for NULLs
+- old_roof: 0 or 1, 2 for NULL
+- state: dictionary-encoded state codes, 0 for NULL
+- postal: postal codes as integers, -1 for NULL
+
+Group-by queries use NumPy (sort, reduceat) when it is installed, and plain loops over
+the stdlib arrays otherwise. Both paths return the same results.
+
+This module contains:
+- UsageSnapshot: the column arrays and the group-by query
+- build_usage_snapshot: read the columns from the database into a snapshot
+- UsageAnalytics: holds the current snapshot, builds the first one and refreshes it in the
+  background
+"""
+
+GROUP_BY_STATE = "state_code"
+GROUP_BY_OLD_ROOF = "old_roof"
+GROUP_BY_POSTAL_PREFIX = "postal_prefix"
+GROUP_BY_COLUMNS = (GROUP_BY_STATE, GROUP_BY_OLD_ROOF, GROUP_BY_POSTAL_PREFIX)
+
+OLD_ROOF_NULL = 2
+POSTAL_NULL = -1
+
+
+def nearest_rank(sorted_values, percent: float):
+    """
+    Return the nearest-rank percentile of an ascending sequence, the same definition the
+    metrics histograms use.
+    """
+    rank = max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class UsageSnapshot:
+    """
+    Column arrays of every customer's usage, old roof flag, state and postal code.
+
+    Parameters:
+    - taken_at (float): Wall-clock time the snapshot was read, in seconds since the epoch.
+    """
+
+    def __init__(self, taken_at: float = None):
+        self.taken_at = time.time() if taken_at is None else taken_at
+        self.usage = array.array("q")
+        self.usage_valid = array.array("b")
+        self.old_roof = array.array("b")
+        # Unknown state codes are kept verbatim, so there may be far more than 255 of them
+        self.state = array.array("I")
+        self.postal = array.array("i")
+        self.state_dictionary = [None]  # code index -> state code
+        self._state_codes = {None: 0}
+
+    def __len__(self):
+        return len(self.usage)
+
+    def append(self, usage, old_roof, state_code, postal_code):
+        """
+        Add one customer's values.
+        """
+        self.usage.append(usage or 0)
+        self.usage_valid.append(usage is not None)
+        self.old_roof.append(OLD_ROOF_NULL if old_roof is None else int(old_roof))
+        code = self._state_codes.get(state_code)
+        if code is None:
+            code = self._state_codes[state_code] = len(self.state_dictionary)
+            self.state_dictionary.append(state_code)
+        self.state.append(code)
+        self.postal.append(int(postal_code) if postal_code and postal_code.isdigit() else POSTAL_NULL)
+
+    def _keys(self, group_by: str, prefix_digits: int):
+        # Integer group key per row, and the function labelling a key
+        if group_by == GROUP_BY_STATE:
+            return self.state, self.state_dictionary.__getitem__
+        if group_by == GROUP_BY_OLD_ROOF:
+            return self.old_roof, lambda key: None if key == OLD_ROOF_NULL else bool(key)
+        divisor = 10 ** (5 - prefix_digits)
+        if np is not None:
+            postal = np.frombuffer(self.postal, dtype=np.int32)
+            keys = np.where(postal == POSTAL_NULL, POSTAL_NULL, postal // divisor)
+        else:
+            keys = array.array("i", (POSTAL_NULL if postal == POSTAL_NULL else postal // divisor for postal in self.postal))
+        return keys, lambda key: None if key == POSTAL_NULL else f"{key:0{prefix_digits}d}"
+
+    def group_by(self, group_by: str, percentiles=(50, 90, 99), prefix_digits: int = 3) -> list:
+        """
+        Summarize usage per group.
+
+        Args:
+        - group_by (str): One of GROUP_BY_COLUMNS.
+        - percentiles (tuple): Percentiles of usage reported per group.
+        - prefix_digits (int): Postal prefix length when grouping by postal_prefix, 1 to 5.
+
+        Returns:
+        - list: One dict per group with usage_kwh present, ordered by key (None last):
+          key, count, sum, mean and p<percentile> entries.
+        """
+        if group_by not in GROUP_BY_COLUMNS:
+            raise ValueError(f"group_by should be one of {', '.join(GROUP_BY_COLUMNS)}")
+        if not 1 <= prefix_digits <= 5:
+            raise ValueError("prefix_digits should be between 1 and 5")
+        keys, label = self._keys(group_by, prefix_digits)
+        groups = self._group_numpy(keys, percentiles) if np is not None else self._group_arrays(keys, percentiles)
+        results = [dict(summary, key=label(key)) for key, summary in groups]
+        results.sort(key=lambda result: (result["key"] is None, str(result["key"])))
+        return results
+
+    def _group_arrays(self, keys, percentiles):
+        values = {}
+        usage, valid = self.usage, self.usage_valid
+        for index in range(len(usage)):
+            if valid[index]:
+                values.setdefault(keys[index], []).append(usage[index])
+        groups = []
+        for key, group in values.items():
+            group.sort()
+            total = sum(group)
+            summary = {"count": len(group), "sum": total, "mean": total / len(group)}
+            summary.update({f"p{percent:g}": nearest_rank(group, percent) for percent in percentiles})
+            groups.append((key, summary))
+        return groups
+
+    def _group_numpy(self, keys, percentiles):
+        valid = np.frombuffer(self.usage_valid, dtype=np.int8).astype(bool)
+        usage = np.frombuffer(self.usage, dtype=np.int64)[valid]
+        if isinstance(keys, array.array):
+            keys = np.frombuffer(keys, dtype=np.dtype(keys.typecode))
+        keys = keys[valid].astype(np.int64)
+        if usage.size == 0:
+            return []
+        # Sort by key, then usage, so each group is a contiguous ascending run
+        order = np.lexsort((usage, keys))
+        keys, usage = keys[order], usage[order]
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+        counts = np.diff(np.concatenate((starts, [usage.size])))
+        sums = np.add.reduceat(usage, starts)
+        ranks = {
+            percent: usage[starts + np.maximum(0, np.ceil(percent / 100 * counts).astype(np.int64) - 1)]
+            for percent in percentiles
+        }
+        groups = []
+        for group, start in enumerate(starts):
+            summary = {"count": int(counts[group]), "sum": int(sums[group]), "mean": float(sums[group]) / int(counts[group])}
+            summary.update({f"p{percent:g}": int(ranks[percent][group]) for percent in percentiles})
+            groups.append((int(keys[start]), summary))
+        return groups
+
+
+def build_usage_snapshot(db, batch_size: int = 10000) -> UsageSnapshot:
+    """
+    Read usage, old roof, state and postal code of every customer into a UsageSnapshot.
+
+    Args:
+    - db (Session): SQLAlchemy database session; every shard is read when sharded.
+    - batch_size (int): Rows fetched from the database at a time.
+
+    Returns:
+    - UsageSnapshot: The snapshot.
+    """
+    snapshot = UsageSnapshot()
+    rows = db.query(
+        CustomerModel.electricity_usage_kwh, CustomerModel.old_roof,
+        PropertyAddressModel.state_code, PropertyAddressModel.postal_code,
+    ).outerjoin(PropertyAddressModel, PropertyAddressModel.customer_id == CustomerModel.id).yield_per(batch_size)
+    for usage, old_roof, state_code, postal_code in rows:
+        # Known codes are grouped in any letter case, as rows written before the state code
+        # migration may not be upper-cased yet
+        snapshot.append(usage, old_roof, normalize_state_code(state_code) or state_code, postal_code)
+    return snapshot
+
+
+class UsageAnalytics:
+    """
+    Holds the current UsageSnapshot and replaces it when refreshed.
+
+    Parameters:
+    - clock (callable): Monotonic time source for the snapshot age, replaceable in tests.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.snapshot = None
+        self._refreshed_at = None
+        self._refreshing = False
+        # Held while the first snapshot is built, so concurrent first requests build it once
+        self._first_snapshot_lock = threading.Lock()
+
+    def age(self):
+        """
+        Seconds since the last refresh, None if there is no snapshot yet.
+        """
+        return None if self._refreshed_at is None else self.clock() - self._refreshed_at
+
+    def begin_refresh(self) -> bool:
+        """
+        Claim the next refresh.
+
+        Returns:
+        - bool: True if the caller should refresh, False if a refresh is already running.
+        """
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+            return True
+
+    def refresh(self, db):
+        """
+        Build a new snapshot from db and make it current. The caller must hold the refresh
+        claim from begin_refresh(), which is released here.
+        """
+        try:
+            snapshot = build_usage_snapshot(db)
+            with self._lock:
+                self.snapshot = snapshot
+                self._refreshed_at = self.clock()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def first_snapshot(self, db) -> UsageSnapshot:
+        """
+        Return the current snapshot, building it from db first if there is none yet.
+
+        Callers arriving while the first snapshot is being built wait for it instead of
+        building their own.
+        """
+        with self._first_snapshot_lock:
+            if self.snapshot is None:
+                snapshot = build_usage_snapshot(db)
+                with self._lock:
+                    if self.snapshot is None:
+                        self.snapshot = snapshot
+                        self._refreshed_at = self.clock()
+            return self.snapshot
+
+    def clear(self):
+        """
+        Drop the current snapshot.
+        """
+        with self._lock:
+            self.snapshot = None
+            self._refreshed_at = None
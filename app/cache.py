@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+
+"""
+Defines the in-memory customer cache with soft and hard TTLs.
+
+This module contains the StaleWhileRevalidateCache used by the customer read path:
+- Entries younger than the soft TTL are fresh and served without touching the database
+- Entries between the soft and hard TTL are stale: served immediately and refreshed in the background
+- Entries older than the hard TTL are dropped
+"""
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "refresh_failed")
+
+    def __init__(self, value, stored_at):
+        self.value = value
+        self.stored_at = stored_at
+        self.refresh_failed = False
+
+
+class StaleWhileRevalidateCache:
+    """
+    Bounded LRU cache whose entries go stale after soft_ttl and expire after hard_ttl.
+
+    Parameters:
+    - soft_ttl (float): Seconds after which an entry is stale and should be refreshed.
+    - hard_ttl (float): Seconds after which an entry is no longer served at all.
+    - max_entries (int): Least recently used entries are evicted beyond this size.
+    - clock (callable): Monotonic time source, replaceable in tests.
+    """
+
+    def __init__(self, soft_ttl: float, hard_ttl: float, max_entries: int = 10000, clock=time.monotonic):
+        if hard_ttl < soft_ttl:
+            raise ValueError("hard_ttl must be greater than or equal to soft_ttl")
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._refreshing = set()
+
+    def get(self, key):
+        """
+        Look up a key.
+
+        Returns:
+        - tuple: (value, state, refresh_failed) where state is FRESH or STALE,
+          or (None, None, False) when the key is missing or past the hard TTL.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None, False
+
+            age = self.clock() - entry.stored_at
+            if age >= self.hard_ttl:
+                del self._entries[key]
+                return None, None, False
+
+            self._entries.move_to_end(key)
+            state = FRESH if age < self.soft_ttl else STALE
+            return entry.value, state, entry.refresh_failed
+
+    def set(self, key, value):
+        """
+        Store a fresh value for key, evicting the least recently used entry if full.
+        """
+        with self._lock:
+            self._entries[key] = _Entry(value, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """
+        Remove key from the cache if present.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._refreshing.clear()
+
+    def begin_refresh(self, key) -> bool:
+        """
+        Claim the background refresh of key.
+
+        Returns:
+        - bool: True if the caller should refresh, False if a refresh is already running.
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key, succeeded: bool):
+        """
+        Release the refresh claim on key, remembering whether the refresh failed.
+        """
+        with self._lock:
+            self._refreshing.discard(key)
+            entry = self._entries.get(key)
+            if entry is not None and not succeeded:
+                entry.refresh_failed = True
@@ -0,0 +1,126 @@
+import threading
+import time
+from app.metrics import metrics
+
+"""
+Defines a circuit breaker guarding calls to the database.
+
+This module contains the CircuitBreaker class:
+- closed: calls go through; consecutive failures are counted
+- open: calls fail fast with CircuitOpenError until the reset timeout elapses
+- half_open: a single trial call decides whether to close or re-open the circuit
+"""
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Numeric values reported on the circuit_breaker_state gauge
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a call is rejected because the circuit is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated failures so a struggling dependency can recover.
+
+    Parameters:
+    - name (str): Label used for the breaker's metrics.
+    - failure_threshold (int): Consecutive failures that open the circuit.
+    - reset_timeout (float): Seconds the circuit stays open before a trial call is allowed.
+    - failure_exceptions (tuple): Exception types counted as failures.
+    - clock (callable): Monotonic time source, replaceable in tests.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 failure_exceptions=(Exception,), clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_exceptions = failure_exceptions
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._set_state(CLOSED)
+
+    def _set_state(self, state):
+        self._state = state
+        metrics.set_gauge("circuit_breaker_state", STATE_VALUES[state], breaker=self.name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def call(self, fn):
+        """
+        Run fn() through the breaker.
+
+        Returns:
+        - The value returned by fn().
+
+        Raises:
+        - CircuitOpenError: If the circuit is open, or half open with a trial already running.
+        - Any exception raised by fn().
+        """
+        with self._lock:
+            if self._state == OPEN:
+                if self.clock() - self._opened_at < self.reset_timeout:
+                    metrics.increment("circuit_breaker_rejected", breaker=self.name)
+                    raise CircuitOpenError(f"Circuit '{self.name}' is open")
+                self._set_state(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._trial_running:
+                    metrics.increment("circuit_breaker_rejected", breaker=self.name)
+                    raise CircuitOpenError(f"Circuit '{self.name}' is half open")
+                self._trial_running = True
+
+        try:
+            result = fn()
+        except self.failure_exceptions:
+            self._record_failure()
+            raise
+        except BaseException:
+            self._release_trial()
+            raise
+        self._record_success()
+        return result
+
+    def _release_trial(self):
+        with self._lock:
+            self._trial_running = False
+
+    def _record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_running = False
+            if self._state != CLOSED:
+                self._set_state(CLOSED)
+
+    def _record_failure(self):
+        metrics.increment("circuit_breaker_failures", breaker=self.name)
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+                self._set_state(OPEN)
+
+    def reset(self):
+        """
+        Close the circuit and forget past failures.
+        """
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+            self._set_state(CLOSED)
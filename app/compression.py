@@ -0,0 +1,109 @@
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from app.negotiation import accepts_encoding
+
+"""
+Defines gzip compression of responses, negotiated through Accept-Encoding.
+
+List and export responses are large, repetitive JSON or XML that gzip shrinks several
+times over, while a single customer is a few hundred bytes that compression would only
+make slower. Bodies below GZIP_MINIMUM_SIZE are therefore sent as they are. The first
+chunks of a streamed body are held back until they reach GZIP_MINIMUM_SIZE, or the stream
+ends, to decide; from then on every chunk is compressed and flushed as it is sent, so the
+client receives the stream as it is produced and it is never buffered whole.
+Responses that already carry a Content-Encoding (e.g. precompressed bodies) pass through.
+
+This module contains:
+- CompressionMiddleware: ASGI middleware gzip-compressing responses
+"""
+
+GZIP_MINIMUM_SIZE = 1024
+# Level 6 compresses JSON lists nearly as well as 9 at a fraction of the CPU (see benchmarks/response_compression.py)
+GZIP_COMPRESS_LEVEL = 6
+
+
+def gzip_compressor(compresslevel: int = GZIP_COMPRESS_LEVEL):
+    """
+    Return a zlib compressor writing the gzip format.
+    """
+    # wbits 16 + 15 selects the gzip header and trailer with the largest window
+    return zlib.compressobj(compresslevel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+class CompressionMiddleware:
+    """
+    Compresses HTTP responses with gzip when the request's Accept-Encoding allows it.
+
+    Parameters:
+    - app (ASGIApp): Application to wrap.
+    - minimum_size (int): Bodies smaller than this many bytes are not compressed; streams
+      are buffered up to this size before deciding.
+    - compresslevel (int): zlib compression level, 1 (fastest) to 9 (smallest).
+
+    Every response it could compress carries Vary: Accept-Encoding, compressed or not.
+    """
+
+    def __init__(self, app, minimum_size: int = GZIP_MINIMUM_SIZE, compresslevel: int = GZIP_COMPRESS_LEVEL):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not accepts_encoding(Headers(scope=scope).get("accept-encoding"), "gzip"):
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        pending = []
+        pending_size = 0
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start, pending_size, compressor
+            if message["type"] == "http.response.start":
+                # Held back until enough of the body shows whether to compress
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                encoded = "content-encoding" in headers
+                pending.append(body)
+                pending_size += len(body)
+                if more_body and not encoded and pending_size < self.minimum_size:
+                    # A stream is buffered until it reaches minimum_size or ends
+                    return
+                body = b"".join(pending)
+                pending.clear()
+                headers.add_vary_header("Accept-Encoding")
+                if not encoded and len(body) >= self.minimum_size:
+                    compressor = gzip_compressor(self.compresslevel)
+                    headers["Content-Encoding"] = "gzip"
+                    if more_body:
+                        del headers["Content-Length"]
+                        body = compressor.compress(body) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                    else:
+                        body = compressor.compress(body) + compressor.flush()
+                        headers["Content-Length"] = str(len(body))
+                        compressor = None
+                await send(start)
+                start = None
+                await send(dict(message, body=body))
+                return
+
+            if compressor is not None:
+                if not more_body:
+                    body = compressor.compress(body) + compressor.flush()
+                    compressor = None
+                elif body:
+                    # Flushed so every chunk reaches the client as it is sent, not when zlib's buffer fills
+                    body = compressor.compress(body) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                message = dict(message, body=body)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,107 @@
+import json
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from app.negotiation import media_type
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+"""
+Defines fast JSON encoding and decoding for request bodies and responses.
+
+orjson is used when it is installed, and the standard library json module otherwise. The
+fallback produces the same bytes as Starlette's JSONResponse (compact separators, UTF-8,
+no NaN), so responses only change in speed when orjson is missing.
+
+This module contains:
+- dumps / loads: encode to and decode from UTF-8 JSON bytes
+- FastJSONResponse: JSONResponse rendering through dumps
+- FastJSONRoute: APIRoute parsing JSON request bodies through loads, and other body
+  media types through the route class's body_decoders
+"""
+
+
+def dumps(content) -> bytes:
+    """
+    Encode content as compact UTF-8 JSON bytes.
+
+    Raises:
+    - TypeError: If content holds a value JSON cannot represent.
+    - ValueError: If content holds NaN or infinity (stdlib fallback only; orjson writes null).
+    """
+    if orjson is not None:
+        # OPT_NON_STR_KEYS accepts int dict keys the way json.dumps does
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    """
+    Decode JSON from bytes or str.
+
+    Raises:
+    - json.JSONDecodeError: If data is not valid JSON (orjson's error is a subclass).
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse encoding its content with dumps.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class FastJSONRequest(Request):
+    """
+    Request whose json() decodes the body with loads, or with the decoder set on it.
+    """
+
+    decode = staticmethod(loads)
+
+    async def json(self):
+        if not hasattr(self, "_json"):
+            self._json = self.decode(await self.body())
+        return self._json
+
+
+def _decoded_as_json(request: FastJSONRequest, decode) -> FastJSONRequest:
+    # FastAPI only parses bodies it sees as JSON, so the decoded request claims to be JSON
+    headers = [(name, value) for name, value in request.scope["headers"] if name != b"content-type"]
+    headers.append((b"content-type", b"application/json"))
+    decoded = FastJSONRequest(dict(request.scope, headers=headers), request.receive)
+    decoded.decode = decode
+    return decoded
+
+
+class FastJSONRoute(APIRoute):
+    """
+    APIRoute handing its endpoint a FastJSONRequest, so JSON bodies are parsed with loads.
+
+    FastAPI turns a json.JSONDecodeError raised while parsing into a 422 response, as it
+    does for the default parser. Subclasses accept other body media types by mapping them
+    in body_decoders to a function decoding the body bytes to what the JSON body would
+    hold; FastAPI turns any other error it raises into a 400 response.
+    """
+
+    body_decoders = {}
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        body_decoders = self.body_decoders
+
+        async def route_handler(request: Request):
+            request = FastJSONRequest(request.scope, request.receive)
+            decode = body_decoders.get(media_type(request.headers.get("content-type")))
+            if decode is not None:
+                request = _decoded_as_json(request, decode)
+            return await handler(request)
+
+        return route_handler
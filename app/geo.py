@@ -0,0 +1,218 @@
+import array
+import bisect
+import bz2
+import gzip
+import json
+import math
+import os
+import sys
+import threading
+
+"""
+Defines the postal code proximity index behind GET /customers/near.
+
+ZIP code centroids are read from a file in the GeoNames postal code format, one row per
+place a postal code serves, its primary place first. The repository ships app/data/US.txt.gz,
+built from the MIT-licensed zipcodes package (see app/data/ATTRIBUTION) with:
+    python -m app.geo path/to/zipcodes/zips.json.bz2 [app/data/US.txt.gz]
+POSTAL_CENTROIDS_PATH can name another file in the same format instead, such as US.txt from
+the GeoNames dump (https://download.geonames.org/export/zip/, CC BY 4.0). The file is read
+once per process, on first use.
+
+This module contains:
+- read_geonames_postal_codes: parse the tab-separated GeoNames postal code format
+- write_geonames_postal_codes: write the bundled file from the zipcodes package dataset
+- haversine_km: great-circle distance between two points
+- PostalCodeGrid: a uniform latitude/longitude grid over typed arrays. The points are
+  sorted by grid cell, so each cell is one contiguous slice of the arrays, and a radius
+  query only measures distances to points in the cells the radius overlaps.
+- postal_code_grid: the process-wide grid, None when the dataset is not installed
+"""
+
+POSTAL_CENTROIDS_PATH = os.environ.get(
+    "POSTAL_CENTROIDS_PATH", os.path.join(os.path.dirname(__file__), "data", "US.txt.gz")
+)
+GRID_CELL_DEGREES = 0.5
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LATITUDE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def read_geonames_postal_codes(path: str):
+    """
+    Read a GeoNames postal code file.
+
+    Parameters:
+    - path (str): Path of the tab-separated file (country code, postal code, place name,
+      admin name1, admin code1, admin name2, admin code2, admin name3, admin code3,
+      latitude, longitude, accuracy), gzip-compressed when it ends in .gz.
+
+    Yields:
+    - tuple: (postal_code, place_name, state_code, latitude, longitude) for every row with
+      a 5-digit postal code and coordinates.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as lines:
+        for line in lines:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 11 or len(fields[1]) != 5 or not fields[1].isdigit() or not fields[9] or not fields[10]:
+                continue
+            yield fields[1], fields[2], fields[4], float(fields[9]), float(fields[10])
+
+
+def write_geonames_postal_codes(source: str, path: str) -> int:
+    """
+    Write the bundled postal code file from the dataset of the zipcodes package.
+
+    Active ZIP codes are written in ascending order, one row for the primary city and one
+    for each acceptable city. The output is gzip-compressed without a timestamp, so the
+    same source always gives the same bytes.
+
+    Parameters:
+    - source (str): Path of zips.json.bz2 from the zipcodes package.
+    - path (str): Path of the file to write, replaced atomically.
+
+    Returns:
+    - int: The number of postal codes written.
+    """
+    with bz2.open(source, "rt", encoding="utf-8") as dataset:
+        entries = sorted((entry for entry in json.load(dataset) if entry["active"]), key=lambda entry: entry["zip_code"])
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as raw, gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) as output:
+        for entry in entries:
+            for city in [entry["city"]] + entry["acceptable_cities"]:
+                fields = ["US", entry["zip_code"], city, "", entry["state"], "", "", "", "", entry["lat"], entry["long"], ""]
+                output.write(("\t".join(fields) + "\n").encode("utf-8"))
+    os.replace(temporary, path)
+    return len(entries)
+
+
+def haversine_km(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
+    """
+    Return the great-circle distance in km between two points given in degrees.
+    """
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    half_dphi = (phi2 - phi1) / 2
+    half_dlambda = math.radians(longitude2 - longitude1) / 2
+    a = math.sin(half_dphi) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(half_dlambda) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _cell(latitude: float, longitude: float, cell_degrees: float) -> tuple:
+    return math.floor(latitude / cell_degrees), math.floor(longitude / cell_degrees)
+
+
+class PostalCodeGrid:
+    """
+    Uniform grid of postal code centroids over typed arrays.
+
+    Parameters:
+    - points (iterable): (postal_code, latitude, longitude) tuples; postal codes are 5-digit
+      strings. The first point of a postal code wins.
+    - cell_degrees (float): Grid cell size in degrees of latitude and longitude.
+    """
+
+    def __init__(self, points, cell_degrees: float = GRID_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        centroids = {}
+        for postal_code, latitude, longitude in points:
+            centroids.setdefault(int(postal_code), (latitude, longitude))
+        points = sorted(
+            (_cell(latitude, longitude, cell_degrees), code, latitude, longitude)
+            for code, (latitude, longitude) in centroids.items()
+        )
+        self.codes = array.array("I", (point[1] for point in points))
+        self.latitudes = array.array("d", (point[2] for point in points))
+        self.longitudes = array.array("d", (point[3] for point in points))
+
+        # cell -> (start, end) slice of the arrays
+        self.cells = {}
+        for position, (cell, *_) in enumerate(points):
+            start, _ = self.cells.get(cell, (position, position))
+            self.cells[cell] = (start, position + 1)
+
+        # Sorted codes and their array positions, for looking up a code's centroid
+        order = sorted(range(len(self.codes)), key=self.codes.__getitem__)
+        self.sorted_codes = array.array("I", (self.codes[position] for position in order))
+        self.sorted_positions = array.array("I", order)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def location(self, postal_code: str):
+        """
+        Return the (latitude, longitude) centroid of a postal code, None if unknown.
+        """
+        code = int(postal_code)
+        index = bisect.bisect_left(self.sorted_codes, code)
+        if index == len(self.sorted_codes) or self.sorted_codes[index] != code:
+            return None
+        position = self.sorted_positions[index]
+        return self.latitudes[position], self.longitudes[position]
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> list:
+        """
+        Find the postal codes whose centroid lies within radius_km of a point.
+
+        Returns:
+        - list: (distance_km, postal_code) tuples, nearest first.
+        """
+        delta_latitude = radius_km / KM_PER_DEGREE_LATITUDE
+        # Longitude degrees shrink towards the poles; clamp so the span stays finite
+        delta_longitude = delta_latitude / max(math.cos(math.radians(latitude)), 0.01)
+        low_row, low_column = _cell(latitude - delta_latitude, longitude - delta_longitude, self.cell_degrees)
+        high_row, high_column = _cell(latitude + delta_latitude, longitude + delta_longitude, self.cell_degrees)
+
+        found = []
+        for row in range(low_row, high_row + 1):
+            for column in range(low_column, high_column + 1):
+                span = self.cells.get((row, column))
+                if span is None:
+                    continue
+                for position in range(*span):
+                    distance = haversine_km(latitude, longitude, self.latitudes[position], self.longitudes[position])
+                    if distance <= radius_km:
+                        found.append((distance, f"{self.codes[position]:05d}"))
+        found.sort()
+        return found
+
+    def near(self, postal_code: str, radius_km: float):
+        """
+        Find the postal codes within radius_km of a postal code's centroid.
+
+        Returns:
+        - list: (distance_km, postal_code) tuples, nearest first, or None if the postal code is unknown.
+        """
+        location = self.location(postal_code)
+        if location is None:
+            return None
+        return self.within(*location, radius_km)
+
+
+_grid = None
+_grid_lock = threading.Lock()
+
+
+def postal_code_grid():
+    """
+    Return the process-wide PostalCodeGrid, loading POSTAL_CENTROIDS_PATH on first use.
+
+    Returns:
+    - PostalCodeGrid: The grid, or None if the dataset is not installed.
+    """
+    global _grid
+    if _grid is None:
+        with _grid_lock:
+            if _grid is None and os.path.exists(POSTAL_CENTROIDS_PATH):
+                _grid = PostalCodeGrid(
+                    (postal_code, latitude, longitude)
+                    for postal_code, _, _, latitude, longitude in read_geonames_postal_codes(POSTAL_CENTROIDS_PATH)
+                )
+    return _grid
+
+
+if __name__ == "__main__":
+    source = sys.argv[1]
+    target = sys.argv[2] if len(sys.argv) > 2 else POSTAL_CENTROIDS_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    count = write_geonames_postal_codes(source, target)
+    print(f"{count} postal codes written to {target}")
@@ -0,0 +1,138 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from app.metrics import metrics
+
+"""
+Defines hedged reads across read replicas.
+
+This module contains the HedgedReader class:
+- A read is sent to the replica picked from the per-replica latency histograms
+- If it has not answered within a percentile of that replica's recent latency, the same
+  read is sent to a second replica
+- The first successful answer wins and the losing attempt is cancelled
+- Every attempt feeds its replica's histogram once: failures count as at least the failure
+  penalty, and an attempt still running when the read returns counts the time it has taken
+  so far, so replicas that error fast or hang stop looking fast
+"""
+
+
+class _Attempt:
+    """
+    One attempt of a hedged read on a replica, whose latency is recorded at most once.
+    """
+
+    __slots__ = ("index", "started", "recorded")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.started = None
+        self.recorded = False
+
+
+class HedgedReader:
+    """
+    Runs read functions against a ReplicaSet, hedging slow attempts on a second replica.
+
+    Parameters:
+    - replica_set (ReplicaSet): Replicas to read from.
+    - percentile (float): Percentile of a replica's latency used as its hedge delay.
+    - default_delay (float): Hedge delay in seconds while a replica has too few samples.
+    - min_delay (float): Lower bound of the hedge delay in seconds.
+    - min_samples (int): Samples needed before the percentile is trusted.
+    - max_workers (int): Threads available for concurrent attempts.
+    - failure_penalty (float): Latency in seconds recorded for a failed attempt that failed
+      faster than this.
+    """
+
+    def __init__(self, replica_set, percentile: float = 95, default_delay: float = 0.05,
+                 min_delay: float = 0.002, min_samples: int = 20, max_workers: int = 16,
+                 failure_penalty: float = 1.0):
+        self.replica_set = replica_set
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.failure_penalty = failure_penalty
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedged-read")
+
+    def hedge_delay(self, index: int) -> float:
+        """
+        Return how long to wait on replica index before hedging, in seconds.
+        """
+        latencies = self.replica_set.latencies[index]
+        if len(latencies) < self.min_samples:
+            return self.default_delay
+        return max(self.min_delay, latencies.percentile(self.percentile))
+
+    def _record(self, attempt: _Attempt, seconds: float):
+        with self._lock:
+            if attempt.recorded:
+                return
+            attempt.recorded = True
+        self.replica_set.latencies[attempt.index].observe(seconds)
+
+    def _attempt(self, attempt: _Attempt, read):
+        db = self.replica_set.session_factories[attempt.index]()
+        attempt.started = time.perf_counter()
+        try:
+            result = read(db)
+        except Exception:
+            self._record(attempt, max(time.perf_counter() - attempt.started, self.failure_penalty))
+            raise
+        finally:
+            db.close()
+        self._record(attempt, time.perf_counter() - attempt.started)
+        return result
+
+    def _submit(self, index: int, read):
+        attempt = _Attempt(index)
+        return self._executor.submit(self._attempt, attempt, read), attempt
+
+    def read(self, read):
+        """
+        Run read(session) on a replica, hedging on a second replica if the first is slow.
+
+        Attempts that already started cannot be interrupted portably, so a losing attempt
+        that is still running is left to finish in the background and its result is
+        discarded. Its replica's histogram gets the time it had taken when the read returned,
+        a lower bound that still counts if the attempt hangs.
+
+        Parameters:
+        - read (callable): Function taking a Session and returning the read result.
+
+        Returns:
+        - The result of the first attempt that succeeded.
+
+        Raises:
+        - The last attempt's exception if every attempt failed.
+        """
+        first = self.replica_set.choose_index()
+        future, attempt = self._submit(first, read)
+        attempts = {future: attempt}
+
+        done, _ = wait(attempts, timeout=self.hedge_delay(first))
+        if not done or next(iter(done)).exception() is not None:
+            second = self.replica_set.choose_index(exclude={first})
+            if second is not None:
+                metrics.increment("hedged_reads_issued")
+                future, attempt = self._submit(second, read)
+                attempts[future] = attempt
+
+        error = None
+        pending = set(attempts)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        if loser.cancel():
+                            metrics.increment("hedged_reads_cancelled")
+                        elif attempts[loser].started is not None:
+                            self._record(attempts[loser], time.perf_counter() - attempts[loser].started)
+                    if len(attempts) > 1:
+                        metrics.increment("hedged_reads_won", replica=attempts[future].index)
+                    return future.result()
+                error = future.exception()
+        raise error
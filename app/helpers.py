@@ -1,16 +1,33 @@
 import re
 import uuid
 from fastapi import HTTPException
-from app.models.customer import CustomerModel
+from app.models.customer import CustomerModel, normalize_email
 from app.models.propertyAddress import PropertyAddressModel
+from app.models.customerEmail import CustomerEmailModel
+from app.sharding import is_sharded
+from app.ids import new_id
 from sqlalchemy.orm import Session
 from app.schemas.propertyAddress import CustomerResponse, PropertyAddress
+from app.serializers import serializer_for
 # from app.routers.customer import POSTAL_CODE
 
+# The email format has always been ^[A-Za-z0-9]+[.-_]*[A-Za-z0-9]+@[A-Za-z0-9-]+(\.[A-Z|a-z]{2,})+$,
+# where [.-_] is the range from "." to "_" (digits, capitals and ./:;<=>?@[\]^_) and
+# [A-Z|a-z] includes "|". Matching the local part with that pattern backtracks over the
+# overlapping classes, so validate_email checks the same language with unambiguous patterns
+# and single-class scans.
+_EMAIL_LOCAL_INVALID = re.compile(r"[^A-Za-z0-9./:;<=>?@\[\\\]^_]")
+_EMAIL_LOCAL_SYMBOL = re.compile(r"[./:;<=>?@\[\\\]^_]")
+_EMAIL_LOWERCASE = re.compile(r"[a-z]")
+# Unambiguous: no label class includes ".", so it matches in linear time
+_EMAIL_DOMAIN = re.compile(r"[A-Za-z0-9-]+(?:\.[A-Z|a-z]{2,})+")
+# Most addresses, in one unambiguous match: alphanumerics around at most one "." or "_"
+_EMAIL_COMMON = re.compile(r"[A-Za-z0-9](?:[A-Za-z0-9]*[._])?[A-Za-z0-9]+@[A-Za-z0-9-]+(?:\.[A-Z|a-z]{2,})+")
+
 
 def validate_email(email: str) -> bool:
     """
-    Validate an email address using a regular expression.
+    Validate an email address in time linear in its length.
 
     Parameters:
     - email (str): The email address to be validated.
@@ -18,11 +35,72 @@ def validate_email(email: str) -> bool:
     Returns:
     - bool: True if the email address is valid, False otherwise.
 
-    The function uses a regular expression to check if the provided email address
-    adheres to a common pattern for valid email formats
+    Accepts exactly the addresses matching the pattern above. The domain cannot contain
+    "@", so the address splits at its last "@". The local part must then be alphanumeric
+    runs around a middle of symbols, digits and capitals: every character alphanumeric or
+    a symbol, at least two characters, and, if it has symbols, none first or last and no
+    lowercase letter between the first and the last symbol.
+    """
+    if _EMAIL_COMMON.fullmatch(email) is not None:
+        return True
+    at = email.rfind("@")
+    if at < 2 or _EMAIL_DOMAIN.fullmatch(email, at + 1) is None:
+        return False
+    if _EMAIL_LOCAL_INVALID.search(email, 0, at) is not None:
+        return False
+    first_symbol = _EMAIL_LOCAL_SYMBOL.search(email, 0, at)
+    if first_symbol is None:
+        return True
+    first = first_symbol.start()
+    # The last symbol is the first one of the reversed local part
+    last = at - 1 - _EMAIL_LOCAL_SYMBOL.search(email[at - 1::-1]).start()
+    return 0 < first and last < at - 1 and _EMAIL_LOWERCASE.search(email, first, last) is None
+
+
+def validate_emails(emails) -> list:
+    """
+    Validate many email addresses, e.g. for a bulk import.
+
+    Parameters:
+    - emails (iterable): The email addresses to be validated.
+
+    Returns:
+    - list: validate_email of each address, in order.
+    """
+    return [validate_email(email) for email in emails]
+
+def canonical_uuid(value: str):
+    """
+    Spell a customer or property address ID the one way it is cached and sharded by.
+
+    Parameters:
+    - value (str): The ID as given, e.g. in a request path.
+
+    Returns:
+    - Union[str, None]: The lower-case hyphenated UUID, or None if the value is not a UUID.
+
+    uuid.UUID accepts upper case, hyphen-less, {...} and urn:uuid: spellings, which all
+    name the same 16-byte row; only the canonical one may key caches.
+    """
+    try:
+        return str(uuid.UUID(value))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+def is_valid_uuid(value: str) -> bool:
+    """
+    Check whether a value is a UUID string that can be used as a customer or property address ID.
+
+    Parameters:
+    - value (str): The ID to be checked.
+
+    Returns:
+    - bool: True if the value parses as a UUID, False otherwise.
+
+    IDs are stored as 16-byte binary UUIDs, so anything else can never match a row
+    and is rejected before querying the database.
     """
-    regex = r'^[A-Za-z0-9]+[.-_]*[A-Za-z0-9]+@[A-Za-z0-9-]+(\.[A-Z|a-z]{2,})+$'
-    return re.fullmatch(regex, email) is not None
+    return canonical_uuid(value) is not None
 
 def validate_postal_code(postal_code: str):
     """
@@ -42,6 +120,22 @@ def validate_postal_code(postal_code: str):
         return False
     return True
 
+def prefix_range(prefix: str) -> tuple:
+    """
+    Turn a string prefix into a half-open range of strings.
+
+    Parameters:
+    - prefix (str): Leading characters of the value, e.g. a postal code prefix "021".
+
+    Returns:
+    - tuple: (low, high) such that low <= value < high matches exactly the values
+      starting with prefix, e.g. ("021", "022").
+
+    A range predicate is answered by an index on the column, which is not guaranteed
+    for LIKE 'prefix%'.
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
 def check_if_email_unique(email: str, db: Session) -> bool:
     """
     Check if the given email is unique in the database.
@@ -52,11 +146,56 @@ def check_if_email_unique(email: str, db: Session) -> bool:
 
     Returns:
         bool: True if the email is unique, False if it already exists in the database.
+
+    Emails are compared case-insensitively through the normalized email index.
+    When customers are sharded, the global customer_email table is checked instead,
+    since customer.email is only unique within a shard.
     """
 
-    if db.query(CustomerModel).filter(CustomerModel.email == email).first():
-        return False
-    return True
+    return get_customer_id_by_email(email, db) is None
+
+def get_customer_id_by_email(email: str, db: Session):
+    """
+    Find the customer owning an email, ignoring case.
+
+    Args:
+        email (str): The email address to look up.
+        db (Session): The SQLAlchemy database session.
+
+    Returns:
+        Union[str, None]: The customer ID, or None if no customer has this email.
+
+    Uses the unique index on customer.email_normalized, or the global customer_email
+    table (keyed by normalized email) when customers are sharded.
+    """
+    email = normalize_email(email)
+    if is_sharded(db):
+        row = db.query(CustomerEmailModel.customer_id).filter(CustomerEmailModel.email == email).first()
+    else:
+        row = db.query(CustomerModel.id).filter(CustomerModel.email_normalized == email).first()
+    return row[0] if row else None
+
+def register_customer_email(email: str, customer_id: str, db: Session, previous_email: str = None):
+    """
+    Record a customer's email in the global customer_email table when customers are sharded.
+
+    Args:
+        email (str): The customer's new email address.
+        customer_id (str): The ID of the customer owning the email.
+        db (Session): The SQLAlchemy database session.
+        previous_email (str): The email the customer is changing from, released from the table.
+
+    Emails are stored normalized. Without shards, the unique index on
+    customer.email_normalized is enough and nothing is written.
+    """
+    if not is_sharded(db):
+        return
+
+    if previous_email is not None:
+        db.query(CustomerEmailModel).filter(
+            CustomerEmailModel.email == normalize_email(previous_email)
+        ).delete(synchronize_session=False)
+    db.add(CustomerEmailModel(email=normalize_email(email), customer_id=customer_id))
 
 def create_property_address_record(property_address_payload: dict, customer_id: str, db:Session) -> PropertyAddressModel:
     """
@@ -77,16 +216,16 @@ def create_property_address_record(property_address_payload: dict, customer_id:
     validate_postal_code function. If the postal code is invalid, it raises an HTTPException
     with a 400 status code and a corresponding detail message.
 
-    If the postal code is valid, a new PropertyAddressModel instance is created with a new UUID
-    as the ID, and the provided customer_id and property_address_payload details. The instance is
+    If the postal code is valid, a new PropertyAddressModel instance is created with a new ID
+    from new_id(), and the provided customer_id and property_address_payload details. The instance is
     then added to the database session, and the changes are flushed to ensure the ID is populated.
     """
     if 'postal_code' in property_address_payload.keys() and not validate_postal_code(property_address_payload.get("postal_code")):
         raise HTTPException(status_code=400, detail="Invalid Postal Code. It should be a 5-digit number.")
-    
+
     
     property_address_db = PropertyAddressModel(
-        id=str(uuid.uuid4()),  # Generate a new UUID as the ID,
+        id=new_id(),  # Generate a new UUID as the ID,
         customer_id = customer_id,
         **property_address_payload
     )
@@ -113,9 +252,12 @@ def get_customer_and_property_address(customer_id: str, db: Session) -> Customer
     details and the property address details. If no property address is found, the property_address
     field in CustomerResponse is set to None.
 
-    If the customer is not found in the database, the function returns None.
+    If the customer is not found in the database, or customer_id is not a UUID,
+    the function returns None.
     """
-    
+    if not is_valid_uuid(customer_id):
+        return None
+
     customer = db.query(CustomerModel).filter(CustomerModel.id == customer_id).first()
     if customer:
         property_address = db.query(PropertyAddressModel).filter(
@@ -136,4 +278,35 @@ def get_customer_and_property_address(customer_id: str, db: Session) -> Customer
                 state_code=property_address.state_code
             ) if property_address else None
         )
-    return None
\ No newline at end of file
+    return None
+
+
+def get_customer_fields(customer_id: str, fields: tuple, db: Session) -> dict:
+    """
+    Retrieve some of a customer's CustomerResponse fields, reading only the columns they need.
+
+    Parameters:
+    - customer_id (str): The ID of the customer.
+    - fields (tuple): CustomerResponse field names, in schema order (see serializers.parse_fields).
+    - db (Session): The database session.
+
+    Returns:
+    - Union[dict, None]: The requested fields in CustomerResponse's shape, None if the customer
+      is not found or customer_id is not a UUID.
+
+    The property_address table is only queried when property_address is requested.
+    """
+    if not is_valid_uuid(customer_id):
+        return None
+
+    columns = [getattr(CustomerModel, field) for field in fields if field != "property_address"]
+    row = db.query(*(columns or [CustomerModel.id])).filter(CustomerModel.id == customer_id).first()
+    if row is None:
+        return None
+
+    data = {field: getattr(row, field) for field in fields if field != "property_address"}
+    if "property_address" in fields:
+        address_columns = [getattr(PropertyAddressModel, field) for field in PropertyAddress.__fields__]
+        property_address = db.query(*address_columns).filter(PropertyAddressModel.customer_id == customer_id).first()
+        data["property_address"] = serializer_for(PropertyAddress)(property_address) if property_address else None
+    return data
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+import uuid
+
+"""
+Defines the pluggable generator of customer and property address IDs.
+
+This module contains:
+- uuid4: random UUIDs
+- uuid7: time-ordered UUIDs (RFC 9562 version 7), monotonic within the process
+- new_id: returns an ID from the generator selected by ID_GENERATOR
+
+Both generators produce canonical 36-character UUID strings. Version 7 IDs start with a
+millisecond timestamp, so new rows land at the end of the primary key index instead of at
+random points, and ordering by ID roughly follows creation order.
+"""
+
+ID_GENERATOR = "uuid7"
+
+
+class UUIDv7Generator:
+    """
+    Generates strictly increasing version 7 UUIDs.
+
+    Layout: 48-bit Unix time in milliseconds, version (7), a 12-bit sequence (rand_a),
+    variant (0b10) and 62 random bits. The sequence starts at a random value in the lower
+    half of its range each millisecond and is incremented for further IDs in the same
+    millisecond; if it overflows, the timestamp is advanced by one millisecond. This keeps
+    IDs from one process strictly increasing even when the clock stalls or steps back.
+
+    Parameters:
+    - clock (callable): Returns the current time in nanoseconds, replaceable in tests.
+    """
+
+    def __init__(self, clock=time.time_ns):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def __call__(self) -> str:
+        now_ms = self.clock() // 1000000
+        with self._lock:
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = int.from_bytes(os.urandom(2), "big") & 0x7FF
+            else:
+                self._sequence += 1
+                if self._sequence > 0xFFF:
+                    self._last_ms += 1
+                    self._sequence = int.from_bytes(os.urandom(2), "big") & 0x7FF
+            timestamp_ms, sequence = self._last_ms, self._sequence
+
+        random_bits = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+        value = (
+            (timestamp_ms & ((1 << 48) - 1)) << 80
+            | 0x7 << 76
+            | sequence << 64
+            | 0b10 << 62
+            | random_bits
+        )
+        return str(uuid.UUID(int=value))
+
+
+def uuid4() -> str:
+    return str(uuid.uuid4())
+
+
+GENERATORS = {
+    "uuid4": uuid4,
+    "uuid7": UUIDv7Generator(),
+}
+
+
+def new_id() -> str:
+    """
+    Generate a new ID with the generator selected by ID_GENERATOR.
+
+    Returns:
+    - str: A canonical UUID string.
+    """
+    return GENERATORS[ID_GENERATOR]()
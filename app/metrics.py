@@ -0,0 +1,137 @@
+import math
+import threading
+from collections import deque
+
+"""
+In-process metrics registry.
+
+This module contains a small thread-safe registry of named counters, gauges and latency histograms.
+Each metric may carry labels, e.g. metrics.increment("customer_cache_stale_served", reason="error").
+The current values are exposed through the GET /metrics endpoint.
+"""
+
+REPORTED_PERCENTILES = (50, 95, 99)
+
+
+def _metric_key(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    label_text = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return f"{name}{{{label_text}}}"
+
+
+class LatencyHistogram:
+    """
+    Rolling latency histogram over the most recent samples.
+
+    Parameters:
+    - window (int): Number of most recent samples kept; older samples are forgotten,
+      so percentiles follow the current behaviour of the measured dependency.
+    """
+
+    def __init__(self, window: int = 512):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self.total_count = 0
+
+    def observe(self, seconds: float):
+        """
+        Record one latency sample, in seconds.
+        """
+        with self._lock:
+            self._samples.append(seconds)
+            self.total_count += 1
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, percent: float):
+        """
+        Return the given percentile of the samples in the window, None if there are none.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(0, math.ceil(percent / 100 * len(samples)) - 1)
+        return samples[rank]
+
+    def summary(self) -> dict:
+        summary = {f"p{percent}": self.percentile(percent) for percent in REPORTED_PERCENTILES}
+        summary["count"] = self.total_count
+        return summary
+
+
+class Metrics:
+    """
+    Registry of counters, gauges and latency histograms keyed by metric name and labels.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def increment(self, name: str, value: int = 1, **labels):
+        """
+        Add value to the counter identified by name and labels.
+        """
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value, **labels):
+        """
+        Set the gauge identified by name and labels to value.
+        """
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def counter(self, name: str, **labels) -> int:
+        """
+        Return the current value of a counter, 0 if it was never incremented.
+        """
+        with self._lock:
+            return self._counters.get(_metric_key(name, labels), 0)
+
+    def gauge(self, name: str, **labels):
+        """
+        Return the current value of a gauge, None if it was never set.
+        """
+        with self._lock:
+            return self._gauges.get(_metric_key(name, labels))
+
+    def histogram(self, name: str, **labels) -> LatencyHistogram:
+        """
+        Return the latency histogram identified by name and labels, creating it if needed.
+        """
+        key = _metric_key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            return histogram
+
+    def snapshot(self) -> dict:
+        """
+        Return a copy of every metric, grouped by metric kind.
+        """
+        with self._lock:
+            histograms = dict(self._histograms)
+            snapshot = {"counters": dict(self._counters), "gauges": dict(self._gauges)}
+        snapshot["histograms"] = {key: histogram.summary() for key, histogram in histograms.items()}
+        return snapshot
+
+    def reset(self):
+        """
+        Drop every recorded value.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+metrics = Metrics()
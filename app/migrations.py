@@ -0,0 +1,305 @@
+import logging
+import uuid
+from sqlalchemy import text, inspect
+from app.database import Base
+# Imported so every table is registered on Base.metadata
+from app.models import customer, customerEmail, customerStateStats, propertyAddress
+
+"""
+Defines one-off data migrations for existing databases.
+
+create_all only creates missing tables, so schema changes to existing tables are applied here.
+Every migration works in chunks so large tables are never locked for a single huge statement,
+and can be re-run safely after an interruption.
+
+This module contains:
+- migrate_ids_to_binary: convert 36-character UUID text keys to 16-byte binary keys
+- migrate_property_address_geo_columns: narrow postal codes to CHAR(5), upper-case state
+  codes and add the geography indexes
+- migrate_customer_sort_collation: compare customer last names and emails by code point
+- create_missing_indexes: create model indexes missing from existing tables
+- migrate_email_normalized: add and backfill customer.email_normalized, normalize the
+  customer_email directory, then add the unique index
+"""
+
+logger = logging.getLogger(__name__)
+
+# (table, column) pairs holding UUID text that BinaryUUID now stores as 16 bytes
+UUID_COLUMNS = [
+    ("customer", "id"),
+    ("property_address", "id"),
+    ("property_address", "customer_id"),
+    ("customer_email", "customer_id"),
+]
+
+
+def _existing_uuid_columns(bind):
+    tables = set(inspect(bind).get_table_names())
+    return [(table, column) for table, column in UUID_COLUMNS if table in tables]
+
+
+def migrate_ids_to_binary(bind, chunk_size: int = 10000):
+    """
+    Convert UUID primary and foreign keys stored as text to 16-byte binary.
+
+    Parameters:
+    - bind (Engine): Engine of the database to migrate (MySQL or SQLite).
+    - chunk_size (int): Rows converted per statement.
+
+    On MySQL each column is copied into a BINARY(16) shadow column with UNHEX() in chunks,
+    then the columns are swapped and the primary keys, indexes and the property_address
+    foreign key are recreated. Only the swap step takes a table lock.
+
+    On SQLite, whose columns are dynamically typed, the values are rewritten in place.
+    """
+    if bind.dialect.name == "mysql":
+        _migrate_ids_to_binary_mysql(bind, chunk_size)
+    else:
+        _migrate_ids_to_binary_in_place(bind, chunk_size)
+
+
+def _migrate_ids_to_binary_in_place(bind, chunk_size):
+    for table, column in _existing_uuid_columns(bind):
+        while True:
+            with bind.begin() as connection:
+                values = connection.execute(
+                    text(f"SELECT {column} FROM {table} WHERE typeof({column}) = 'text' LIMIT :limit"),
+                    {"limit": chunk_size},
+                ).scalars().all()
+                for value in values:
+                    connection.execute(
+                        text(f"UPDATE {table} SET {column} = :binary WHERE {column} = :value"),
+                        {"binary": uuid.UUID(value).bytes, "value": value},
+                    )
+            if len(values) < chunk_size:
+                break
+
+
+def _column_type(connection, table, column):
+    return connection.execute(
+        text(
+            "SELECT DATA_TYPE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND COLUMN_NAME = :column"
+        ),
+        {"table": table, "column": column},
+    ).scalar()
+
+
+def _migrate_ids_to_binary_mysql(bind, chunk_size):
+    columns = _existing_uuid_columns(bind)
+    with bind.connect() as connection:
+        columns = [(table, column) for table, column in columns if _column_type(connection, table, column) != "binary"]
+    if not columns:
+        return
+
+    with bind.begin() as connection:
+        foreign_keys = connection.execute(text(
+            "SELECT CONSTRAINT_NAME FROM information_schema.KEY_COLUMN_USAGE "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'property_address' AND REFERENCED_TABLE_NAME = 'customer'"
+        )).scalars().all()
+        for foreign_key in foreign_keys:
+            connection.execute(text(f"ALTER TABLE property_address DROP FOREIGN KEY {foreign_key}"))
+
+        for table, column in columns:
+            if _column_type(connection, table, f"{column}_bin") is None:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column}_bin BINARY(16) NULL"))
+
+    # Backfill the shadow columns in chunks
+    for table, column in columns:
+        while True:
+            with bind.begin() as connection:
+                converted = connection.execute(text(
+                    f"UPDATE {table} SET {column}_bin = UNHEX(REPLACE({column}, '-', '')) "
+                    f"WHERE {column}_bin IS NULL AND {column} IS NOT NULL LIMIT {int(chunk_size)}"
+                )).rowcount
+            if converted == 0:
+                break
+
+    # Swap the shadow columns in and restore keys and indexes
+    swaps = {
+        "customer": (
+            "ALTER TABLE customer DROP PRIMARY KEY, DROP COLUMN id, "
+            "CHANGE id_bin id BINARY(16) NOT NULL, ADD PRIMARY KEY (id), ADD INDEX ix_customer_id (id)"
+        ),
+        "property_address": (
+            "ALTER TABLE property_address DROP PRIMARY KEY, DROP COLUMN id, DROP COLUMN customer_id, "
+            "CHANGE id_bin id BINARY(16) NOT NULL, CHANGE customer_id_bin customer_id BINARY(16) NULL, "
+            "ADD PRIMARY KEY (id), ADD INDEX ix_property_address_id (id)"
+        ),
+        "customer_email": (
+            "ALTER TABLE customer_email DROP COLUMN customer_id, "
+            "CHANGE customer_id_bin customer_id BINARY(16) NOT NULL"
+        ),
+    }
+    with bind.begin() as connection:
+        for table in dict.fromkeys(table for table, _ in columns):
+            connection.execute(text(swaps[table]))
+        connection.execute(text(
+            "ALTER TABLE property_address ADD FOREIGN KEY (customer_id) REFERENCES customer (id)"
+        ))
+
+
+GEO_INDEXES = ("ix_property_address_state_postal", "ix_property_address_postal_code")
+
+
+def migrate_property_address_geo_columns(bind, chunk_size: int = 10000) -> int:
+    """
+    Narrow property_address.postal_code to CHAR(5), upper-case the state codes in chunks and
+    create the (state_code, postal_code) and postal_code indexes.
+
+    Rows whose postal code is longer than 5 characters are left as they are and reported:
+    postal_code keeps its type until they are fixed and the migration is re-run. State codes
+    and the indexes are migrated either way. Safe to re-run.
+
+    Parameters:
+    - bind (Engine): Engine of the database to migrate (MySQL or SQLite).
+    - chunk_size (int): Rows of state codes upper-cased per statement.
+
+    Returns:
+    - int: The number of rows whose postal code is longer than 5 characters.
+    """
+    is_mysql = bind.dialect.name == "mysql"
+    with bind.connect() as connection:
+        too_long = connection.execute(text(
+            f"SELECT COUNT(*) FROM property_address WHERE {'CHAR_LENGTH' if is_mysql else 'LENGTH'}(postal_code) > 5"
+        )).scalar()
+    if too_long:
+        logger.warning("%d property_address rows have postal codes longer than 5 characters; "
+                       "postal_code is not narrowed until they are fixed", too_long)
+    elif is_mysql:
+        with bind.begin() as connection:
+            if _column_type(connection, "property_address", "postal_code") != "char":
+                connection.execute(text("ALTER TABLE property_address MODIFY postal_code CHAR(5) NULL"))
+
+    # State codes are filtered with a plain equality, so every stored one is upper-cased like
+    # the model writes them. MySQL compares case-insensitively, so the bytes are compared there.
+    pending = (
+        "WHERE CAST(state_code AS BINARY) <> CAST(UPPER(TRIM(state_code)) AS BINARY) LIMIT {limit}" if is_mysql
+        else "WHERE rowid IN (SELECT rowid FROM property_address "
+             "WHERE state_code <> UPPER(TRIM(state_code)) LIMIT {limit})"
+    )
+    while True:
+        with bind.begin() as connection:
+            converted = connection.execute(text(
+                "UPDATE property_address SET state_code = UPPER(TRIM(state_code)) "
+                + pending.format(limit=int(chunk_size))
+            )).rowcount
+        if converted == 0:
+            break
+
+    # SQLite columns are dynamically typed, so only the indexes are missing there
+    for index in Base.metadata.tables["property_address"].indexes:
+        if index.name in GEO_INDEXES:
+            index.create(bind=bind, checkfirst=True)
+    return too_long
+
+
+# Customer columns GET /customers sorts by, declared CodePointString on the model
+CODE_POINT_COLUMNS = ("last_name", "email")
+
+
+def migrate_customer_sort_collation(bind):
+    """
+    Give customer.last_name and customer.email the utf8mb4_bin collation on MySQL, so their
+    indexes return rows in the code point order shard results are merged in. SQLite already
+    compares by code point. Safe to re-run.
+
+    Email uniqueness ignoring case is kept by the email_normalized unique index.
+
+    Parameters:
+    - bind (Engine): Engine of the database to migrate (MySQL or SQLite).
+    """
+    if bind.dialect.name != "mysql" or "customer" not in inspect(bind).get_table_names():
+        return
+    with bind.begin() as connection:
+        collations = dict(connection.execute(text(
+            "SELECT COLUMN_NAME, COLLATION_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'customer'"
+        )).all())
+        pending = [column for column in CODE_POINT_COLUMNS if collations.get(column) != "utf8mb4_bin"]
+        if pending:
+            # One statement, so the table and its indexes are rebuilt once
+            connection.execute(text("ALTER TABLE customer " + ", ".join(
+                f"MODIFY {column} VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL"
+                for column in pending
+            )))
+
+
+def create_missing_indexes(bind):
+    """
+    Create every index declared on the models that the database does not have yet.
+
+    create_all skips tables that already exist, so indexes added to existing tables (such as
+    the GET /customers filter indexes) are created here. Safe to re-run.
+
+    Parameters:
+    - bind (Engine): Engine of the database to migrate.
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        # Indexes on columns a later migration still has to add are skipped
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for index in table.indexes:
+            if {column.name for column in index.columns} <= existing_columns:
+                index.create(bind=bind, checkfirst=True)
+
+
+def _duplicates(connection, table, column):
+    return connection.execute(text(
+        f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL GROUP BY {column} HAVING COUNT(*) > 1"
+    )).scalars().all()
+
+
+def migrate_email_normalized(bind, chunk_size: int = 10000):
+    """
+    Add customer.email_normalized, backfill it with LOWER(email) in chunks and create its
+    unique index. Directory emails in customer_email are lower-cased as well.
+
+    Parameters:
+    - bind (Engine): Engine of the database to migrate (MySQL or SQLite).
+    - chunk_size (int): Rows backfilled per statement.
+
+    Raises:
+    - ValueError: If emails differing only in case belong to different rows. They must be
+      merged first; the unique index is not created until then, and re-running resumes.
+    """
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+    is_mysql = bind.dialect.name == "mysql"
+
+    if "customer" in tables:
+        if "email_normalized" not in {column["name"] for column in inspector.get_columns("customer")}:
+            with bind.begin() as connection:
+                connection.execute(text("ALTER TABLE customer ADD COLUMN email_normalized VARCHAR(255) NULL"))
+
+        pending = (
+            "WHERE email_normalized IS NULL LIMIT {limit}" if is_mysql
+            else "WHERE rowid IN (SELECT rowid FROM customer WHERE email_normalized IS NULL LIMIT {limit})"
+        )
+        while True:
+            with bind.begin() as connection:
+                converted = connection.execute(text(
+                    "UPDATE customer SET email_normalized = LOWER(email) " + pending.format(limit=int(chunk_size))
+                )).rowcount
+            if converted == 0:
+                break
+
+    with bind.begin() as connection:
+        duplicates = _duplicates(connection, "customer", "email_normalized") if "customer" in tables else []
+        if "customer_email" in tables:
+            duplicates += connection.execute(text(
+                "SELECT LOWER(email) FROM customer_email GROUP BY LOWER(email) HAVING COUNT(*) > 1"
+            )).scalars().all()
+    if duplicates:
+        raise ValueError(f"Emails used by more than one customer when ignoring case: {', '.join(duplicates)}")
+
+    with bind.begin() as connection:
+        if "customer_email" in tables:
+            connection.execute(text("UPDATE customer_email SET email = LOWER(email)"))
+        if "customer" in tables:
+            index = next(index for index in Base.metadata.tables["customer"].indexes
+                         if index.name == "ix_customer_email_normalized")
+            index.create(bind=connection, checkfirst=True)
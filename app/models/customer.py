@@ -1,29 +1,61 @@
-from sqlalchemy import Column, String, Integer, Boolean, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, Index
+from sqlalchemy.orm import relationship, validates
 from app.database import Base
+from app.models.types import BinaryUUID, CodePointString
+
+
+def normalize_email(email: str) -> str:
+    """
+    Return the form of an email address used for lookups and uniqueness: lower case.
+
+    Valid emails are ASCII, so this matches SQL LOWER(email) on every supported database.
+    """
+    return email.lower() if email is not None else None
 
 class CustomerModel(Base):
     """
     Represents a customer in the database.
 
     Attributes:
-    - id: Primary key for the CustomerModel - uuid
+    - id: Primary key for the CustomerModel - uuid, stored as 16 bytes
     - first_name: Customer's first name
-    - last_name: Customer's last name
-    - email: Customer's email address (unique)
+    - last_name: Customer's last name, compared by code point
+    - email: Customer's email address (unique), as entered, compared by code point
+    - email_normalized: Lower-cased email (unique), kept in sync with email and used for
+      lookups and uniqueness checks so case variants of an email are the same customer
     - electricity_usage_kwh: Customer's electricity usage in kilowatt-hours
     - old_roof: Boolean indicating whether the customer has an old roof
     - property_address_id: Foreign key referencing the property address of the customer
     - property_address: Relationship with PropertyAddressModel
+
+    Indexes (backing the GET /customers filters):
+    - ix_customer_email_normalized: email_normalized, for email lookups and email prefix filters
+    - ix_customer_old_roof_usage: (old_roof, electricity_usage_kwh), for old_roof with an optional usage range
+    - ix_customer_usage: electricity_usage_kwh, for usage ranges
+    - ix_customer_last_name: last_name, for last name prefix filters
     """
     __tablename__ = "customer"
+    __table_args__ = (
+        Index("ix_customer_old_roof_usage", "old_roof", "electricity_usage_kwh"),
+        Index("ix_customer_usage", "electricity_usage_kwh"),
+        Index("ix_customer_last_name", "last_name"),
+    )
 
-    id = Column(String(255), primary_key=True, index=True)
+    id = Column(BinaryUUID, primary_key=True, index=True)
     first_name = Column(String(255), nullable=False)
-    last_name = Column(String(255), nullable=False)
-    email = Column(String(255), unique=True, index=True, nullable=False)
+    # Sort columns of GET /customers, ordered like Python orders str when shards are merged
+    last_name = Column(CodePointString(255), nullable=False)
+    email = Column(CodePointString(255), unique=True, index=True, nullable=False)
+    # Nullable only until migrate_email_normalized has backfilled existing rows
+    email_normalized = Column(String(255), unique=True, index=True)
     electricity_usage_kwh = Column(Integer)
     old_roof = Column(Boolean)
 
     property_address = relationship('PropertyAddressModel', back_populates='customer')
 
+    @validates("email")
+    def _write_email_normalized(self, key, email):
+        # Every write of email, on create or patch, also writes the normalized form
+        self.email_normalized = normalize_email(email)
+        return email
+
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String
+from app.database import Base
+from app.models.types import BinaryUUID
+
+class CustomerEmailModel(Base):
+    """
+    Global email lookup table used when customers are sharded.
+
+    Customers are spread across shards by id, so a unique index on customer.email only
+    holds within one shard. This table lives on the directory shard only, and its primary
+    key makes emails unique across all shards.
+
+    Attributes:
+    - email: Primary key, the customer's normalized (lower-cased) email address
+    - customer_id: ID of the customer owning the email
+    """
+    __tablename__ = "customer_email"
+
+    email = Column(String(255), primary_key=True)
+    customer_id = Column(BinaryUUID, nullable=False)
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger
+from app.database import Base
+
+class CustomerStateStatsModel(Base):
+    """
+    Rollup of customers and electricity usage per state, behind GET /stats.
+
+    create_customer and patch_customer apply deltas to these rows in the same transaction
+    as the customer write, and app.stats.reconcile_customer_state_stats rebuilds them from
+    the customer and property_address tables. When customers are sharded, every shard
+    holds the rollup of its own customers.
+
+    Attributes:
+    - state_code: Primary key, the STATE_CODE_VALUES value of the state code (SMALLINT), 0
+      for customers without a known state
+    - customers: Number of customers
+    - customers_with_usage: Number of customers with electricity_usage_kwh set
+    - electricity_usage_kwh: Sum of electricity_usage_kwh
+    """
+    __tablename__ = "customer_state_stats"
+
+    state_code = Column(SmallInteger, primary_key=True, autoincrement=False)
+    customers = Column(Integer, nullable=False, default=0)
+    customers_with_usage = Column(Integer, nullable=False, default=0)
+    electricity_usage_kwh = Column(BigInteger, nullable=False, default=0)
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, CheckConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, CheckConstraint, CHAR, Index
+from sqlalchemy.orm import relationship, validates
 from app.database import Base
+from app.models.types import BinaryUUID, stored_state_code
 
 class PropertyAddressModel(Base):
     """Defines the SQLAlchemy model for Property Addresses.
@@ -9,20 +10,35 @@ class PropertyAddressModel(Base):
     It defines a table 'property_addresses' to store property address information.
 
     Attributes:
-    id (str): The primary key representing the property address ID.
+    id (str): The primary key representing the property address ID (a uuid stored as 16 bytes).
+    customer_id (str): The ID of the customer owning the property address.
     street (str): Represents the street address.
     city (str): Represents the city of the property address.
-    postal_code (str): Represents the postal code of the property address.
-    state_code (str): Represents the state code of the property address (maximum length of 5 characters).
+    postal_code (str): Represents the 5-digit postal code of the property address.
+    state_code (str): Represents the state code of the property address, stored upper-cased (maximum length of 5 characters).
+
+    Indexes:
+    ix_property_address_state_postal: (state_code, postal_code) for state filters and state + postal prefix ranges.
+    ix_property_address_postal_code: postal_code for postal prefix and range lookups.
+    ix_property_address_customer_id: customer_id, joining filtered addresses back to their customer.
     """
     __tablename__ = "property_address"
+    __table_args__ = (
+        Index("ix_property_address_state_postal", "state_code", "postal_code"),
+        Index("ix_property_address_postal_code", "postal_code"),
+    )
 
-    id = Column(String(255), primary_key=True, index=True)
-    customer_id = Column(String(255), ForeignKey('customer.id'))
+    id = Column(BinaryUUID, primary_key=True, index=True)
+    customer_id = Column(BinaryUUID, ForeignKey('customer.id'), index=True)
     street = Column(String(255))
     city = Column(String(255))
-    postal_code = Column(String(255))
+    postal_code = Column(CHAR(5))
     state_code = Column(String(5))
 
     # Relationship with CustomerModel
-    customer = relationship("CustomerModel", back_populates='property_address')
\ No newline at end of file
+    customer = relationship("CustomerModel", back_populates='property_address')
+
+    @validates("state_code")
+    def _upper_case_state_code(self, key, state_code):
+        # Every write, on create or patch, stores the one spelling filters compare against
+        return stored_state_code(state_code)
\ No newline at end of file
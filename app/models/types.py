@@ -0,0 +1,104 @@
+import uuid
+from sqlalchemy.dialects import mysql
+from sqlalchemy.types import TypeDecorator, LargeBinary, String
+
+"""
+Defines custom SQLAlchemy column types shared by the models.
+
+This module contains:
+- BinaryUUID: UUIDs stored as 16 raw bytes and exposed as canonical 36-character strings
+- CodePointString: strings compared and indexed by code point, as Python compares str
+- STATE_CODES / normalize_state_code: the USPS state codes, and their canonical form
+"""
+
+
+class BinaryUUID(TypeDecorator):
+    """
+    Stores a UUID in 16 bytes: BINARY(16) on MySQL, BLOB elsewhere (e.g. SQLite).
+
+    Python code and the API keep using canonical UUID strings
+    ("088242aa-1805-450a-a4ea-f1f392b330f4"); conversion happens when binding
+    parameters and reading rows. Compared with String(255) this shrinks every
+    primary and foreign key index entry from up to 36+ bytes to 16.
+
+    Binding a string that is not a UUID raises ValueError, so callers should reject
+    malformed ids (see helpers.is_valid_uuid) before querying.
+    """
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "mysql":
+            return dialect.type_descriptor(mysql.BINARY(16))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, uuid.UUID):
+            return value.bytes
+        if isinstance(value, (bytes, bytearray)) and len(value) == 16:
+            return bytes(value)
+        return uuid.UUID(value).bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return str(uuid.UUID(bytes=bytes(value)))
+
+    def process_literal_param(self, value, dialect):
+        return f"X'{self.process_bind_param(value, dialect).hex()}'"
+
+    @property
+    def python_type(self):
+        return str
+
+
+class CodePointString(TypeDecorator):
+    """
+    A string column compared by code point: VARCHAR with the utf8mb4_bin collation on MySQL,
+    a plain VARCHAR elsewhere (SQLite compares with BINARY by default).
+
+    Sharded listings merge each shard's rows with Python's str ordering, so a sort column
+    must be ordered the same way in the database. Declaring the collation on the column,
+    rather than in ORDER BY, keeps its index usable for the sort.
+    """
+
+    impl = String
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "mysql":
+            return dialect.type_descriptor(mysql.VARCHAR(self.impl.length, charset="utf8mb4", collation="utf8mb4_bin"))
+        return dialect.type_descriptor(String(self.impl.length))
+
+
+# USPS state, district, territory and military codes. The position in this list is the
+# key of the customer_state_stats rollup rows, so the list is append-only: never reorder
+# or remove codes.
+STATE_CODES = [
+    "AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DE", "FL", "GA",
+    "HI", "ID", "IL", "IN", "IA", "KS", "KY", "LA", "ME", "MD",
+    "MA", "MI", "MN", "MS", "MO", "MT", "NE", "NV", "NH", "NJ",
+    "NM", "NY", "NC", "ND", "OH", "OK", "OR", "PA", "RI", "SC",
+    "SD", "TN", "TX", "UT", "VT", "VA", "WA", "WV", "WI", "WY",
+    "DC", "AS", "GU", "MP", "PR", "VI", "UM", "FM", "MH", "PW",
+    "AA", "AE", "AP",
+]
+STATE_CODE_VALUES = {code: index + 1 for index, code in enumerate(STATE_CODES)}
+
+
+def stored_state_code(state_code):
+    """
+    Return the form a state code is stored and filtered in: stripped and upper-cased.
+    """
+    return state_code.strip().upper() if isinstance(state_code, str) else None
+
+
+def normalize_state_code(state_code):
+    """
+    Return the canonical upper-case form of a state code, or None if it is not a known code.
+    """
+    state_code = stored_state_code(state_code)
+    return state_code if state_code in STATE_CODE_VALUES else None
@@ -0,0 +1,96 @@
+"""
+Defines HTTP content negotiation for the customer endpoints.
+
+This module contains:
+- media_type: the bare media type of a Content-Type or Accept entry
+- choose_media_type: pick the representation to send from an Accept header
+- accepts_encoding: whether an Accept-Encoding header allows a content coding
+"""
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def media_type(value: str) -> str:
+    """
+    Return the lower-cased media type of a header value, without parameters.
+    """
+    return value.split(";", 1)[0].strip().lower() if value else ""
+
+
+def _accepted(accept: str):
+    # (media range, q) for each entry of an Accept header
+    for entry in accept.split(","):
+        media_range, *parameters = entry.split(";")
+        q = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        yield media_range.strip().lower(), q
+
+
+def choose_media_type(accept: str, offered: tuple):
+    """
+    Choose the representation to send.
+
+    Args:
+    - accept (str): The request's Accept header, None when absent.
+    - offered (tuple): Media types the endpoint can produce, preferred first.
+
+    Returns:
+    - str: The offered media type with the highest q value, the most preferred one on ties.
+      offered[0] without an Accept header, when nothing offered matches, and when it is
+      acceptable but the client's first choice is not offered: browsers list types such as
+      application/xml below text/html and */*, and get offered[0] rather than XML. None if
+      offered[0] is refused with q=0 (e.g. by */*;q=0) and nothing else is acceptable.
+    """
+    if not accept:
+        return offered[0]
+    accepted = list(_accepted(accept))
+    q_values = {}
+    for offered_type in offered:
+        main_type = offered_type.split("/")[0]
+        # The most specific matching range sets the q value; None when no range matches
+        q, specificity = None, -1
+        for media_range, range_q in accepted:
+            if media_range == offered_type:
+                match = 2
+            elif media_range == f"{main_type}/*":
+                match = 1
+            elif media_range == "*/*":
+                match = 0
+            else:
+                continue
+            if match > specificity:
+                q, specificity = range_q, match
+        q_values[offered_type] = q
+    best, best_q = None, 0.0
+    for offered_type in offered:
+        if (q_values[offered_type] or 0.0) > best_q:
+            best, best_q = offered_type, q_values[offered_type]
+    default_q = q_values[offered[0]]
+    if best is None:
+        return None if default_q == 0.0 else offered[0]
+    if default_q and best_q < max(q for _, q in accepted):
+        return offered[0]
+    return best
+
+
+def accepts_encoding(accept_encoding: str, coding: str) -> bool:
+    """
+    Return whether an Accept-Encoding header allows a content coding, e.g. "gzip".
+
+    The coding's own entry decides over "*"; a q value of 0 refuses it. Codings other
+    than identity are only used when the client lists them.
+    """
+    if not accept_encoding:
+        return False
+    q, specificity = 0.0, -1
+    for listed, listed_q in _accepted(accept_encoding):
+        match = 1 if listed == coding else 0 if listed == "*" else -1
+        if match > specificity:
+            q, specificity = listed_q, match
+    return q > 0
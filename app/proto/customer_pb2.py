@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: app/proto/customer.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x18\x61pp/proto/customer.proto\x12\x16\x65nergysage.customer.v1\"\x9f\x01\n\x0fPropertyAddress\x12\x13\n\x06street\x18\x01 \x01(\tH\x00\x88\x01\x01\x12\x11\n\x04\x63ity\x18\x02 \x01(\tH\x01\x88\x01\x01\x12\x18\n\x0bpostal_code\x18\x03 \x01(\tH\x02\x88\x01\x01\x12\x17\n\nstate_code\x18\x04 \x01(\tH\x03\x88\x01\x01\x42\t\n\x07_streetB\x07\n\x05_cityB\x0e\n\x0c_postal_codeB\r\n\x0b_state_code\"\xcd\x02\n\x08\x43ustomer\x12\x0f\n\x02id\x18\x01 \x01(\tH\x00\x88\x01\x01\x12\x17\n\nfirst_name\x18\x02 \x01(\tH\x01\x88\x01\x01\x12\x16\n\tlast_name\x18\x03 \x01(\tH\x02\x88\x01\x01\x12\x12\n\x05\x65mail\x18\x04 \x01(\tH\x03\x88\x01\x01\x12\"\n\x15\x65lectricity_usage_kwh\x18\x05 \x01(\x03H\x04\x88\x01\x01\x12\x15\n\x08old_roof\x18\x06 \x01(\x08H\x05\x88\x01\x01\x12\x46\n\x10property_address\x18\x07 \x01(\x0b\x32\'.energysage.customer.v1.PropertyAddressH\x06\x88\x01\x01\x42\x05\n\x03_idB\r\n\x0b_first_nameB\x0c\n\n_last_nameB\x08\n\x06_emailB\x18\n\x16_electricity_usage_kwhB\x0b\n\t_old_roofB\x13\n\x11_property_address\"C\n\x0c\x43ustomerList\x12\x33\n\tcustomers\x18\x01 \x03(\x0b\x32 .energysage.customer.v1.Customerb\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'app.proto.customer_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _PROPERTYADDRESS._serialized_start=53
+  _PROPERTYADDRESS._serialized_end=212
+  _CUSTOMER._serialized_start=215
+  _CUSTOMER._serialized_end=548
+  _CUSTOMERLIST._serialized_start=550
+  _CUSTOMERLIST._serialized_end=617
+# @@protoc_insertion_point(module_scope)
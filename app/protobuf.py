@@ -0,0 +1,84 @@
+from google.protobuf.message import DecodeError
+from starlette.responses import Response
+from app.proto.customer_pb2 import Customer, CustomerList, PropertyAddress
+
+"""
+Defines the protobuf encoding of customers, served as application/x-protobuf.
+
+The messages are defined in app/proto/customer.proto and mirror CustomerResponse. Content
+is converted from and to the same dicts the JSON endpoints use (see app.serializers): None
+values are left unset on encoding, and decoding returns only the fields that are set, so
+PATCH bodies keep their partial-update meaning.
+
+This module contains:
+- encode_customer / encode_customers: dicts to Customer and CustomerList message bytes
+- decode_customer / decode_customers: message bytes to dicts
+- ProtobufResponse: response with the protobuf media type
+"""
+
+PROTOBUF_MEDIA_TYPE = "application/x-protobuf"
+
+
+def _customer_message(content: dict) -> Customer:
+    values = {field: value for field, value in content.items() if value is not None}
+    property_address = values.get("property_address")
+    if property_address is not None:
+        values["property_address"] = PropertyAddress(
+            **{field: value for field, value in property_address.items() if value is not None}
+        )
+    return Customer(**values)
+
+
+def _message_fields(message) -> dict:
+    return {
+        field.name: _message_fields(value) if field.message_type is not None else value
+        for field, value in message.ListFields()
+    }
+
+
+def encode_customer(content: dict) -> bytes:
+    """
+    Encode a customer dict, shaped as Customer or CustomerResponse, as a Customer message.
+    """
+    return _customer_message(content).SerializeToString()
+
+
+def encode_customers(contents: list) -> bytes:
+    """
+    Encode a list of customer dicts as a CustomerList message.
+    """
+    return CustomerList(customers=[_customer_message(content) for content in contents]).SerializeToString()
+
+
+def decode_customer(data: bytes) -> dict:
+    """
+    Decode a Customer message to a dict of the fields that are set.
+
+    Raises:
+    - ValueError: If data is not a valid Customer message.
+    """
+    message = Customer()
+    try:
+        message.ParseFromString(data)
+    except DecodeError as error:
+        raise ValueError(f"Invalid protobuf Customer message: {error}")
+    return _message_fields(message)
+
+
+def decode_customers(data: bytes) -> list:
+    """
+    Decode a CustomerList message to a list of dicts of the fields that are set.
+
+    Raises:
+    - ValueError: If data is not a valid CustomerList message.
+    """
+    message = CustomerList()
+    try:
+        message.ParseFromString(data)
+    except DecodeError as error:
+        raise ValueError(f"Invalid protobuf CustomerList message: {error}")
+    return [_message_fields(customer) for customer in message.customers]
+
+
+class ProtobufResponse(Response):
+    media_type = PROTOBUF_MEDIA_TYPE
@@ -0,0 +1,175 @@
+from sqlalchemy import select
+from app.helpers import prefix_range
+from app.models.customer import CustomerModel, normalize_email
+from app.models.propertyAddress import PropertyAddressModel
+from app.models.types import stored_state_code
+
+"""
+Plans the filtered and sorted customer listing behind GET /customers.
+
+Every supported filter combination is answered by an index, so a filtered listing never
+scans the whole customer table. The filters on each table must match one of that table's
+indexes exactly: equality filters on the leading index columns, optionally followed by
+one range or prefix filter on the next column. Address filters become a
+customer.id IN (SELECT customer_id ...) semi-join, so the database can drive the query
+from either table's index and reach the other through the primary key or the
+ix_property_address_customer_id index. Sorting by the column of the range filter lets the
+same index also return the rows in order, without a sort step.
+
+The string sort columns are declared CodePointString, i.e. ordered by code point, so every
+shard returns its rows in the order Python compares the values when the shards are merged,
+and their indexes still return the rows in that order. Under MySQL's case-insensitive
+collations the column order would put "adams" and "Baker" the other way round from Python.
+
+Any other combination would force a scan and is rejected with UnsupportedQueryError.
+
+This module contains:
+- plan_customer_query: check a set of filters and return the index chosen for each table
+- build_customer_query: apply the filters and sort key to a customer query
+"""
+
+# Filters answered by each index: index name -> (equality filters, range or prefix filter)
+CUSTOMER_FILTER_INDEXES = {
+    "ix_customer_old_roof_usage": (("old_roof",), "usage"),
+    "ix_customer_usage": ((), "usage"),
+    "ix_customer_last_name": ((), "last_name_prefix"),
+    "ix_customer_email_normalized": ((), "email_prefix"),
+}
+PROPERTY_ADDRESS_FILTER_INDEXES = {
+    "ix_property_address_state_postal": (("state_code",), "postal_prefix"),
+    "ix_property_address_postal_code": ((), "postal_prefix"),
+}
+
+# Query parameters folded into the logical filter named in the index tables
+FILTER_PARAMETERS = {"min_usage": "usage", "max_usage": "usage"}
+
+# Sort keys for GET /customers, all indexed; prefix with "-" for descending order
+SORT_COLUMNS = {
+    "id": CustomerModel.id,
+    "last_name": CustomerModel.last_name,
+    "email": CustomerModel.email,
+    "electricity_usage_kwh": CustomerModel.electricity_usage_kwh,
+}
+
+
+class UnsupportedQueryError(ValueError):
+    """
+    Raised for filter combinations or sort keys that no index supports.
+    """
+
+
+def _choose_index(filters: set, indexes: dict):
+    if not filters:
+        return None
+    for name, (equality, range_filter) in indexes.items():
+        if set(equality) <= filters <= set(equality) | {range_filter}:
+            return name
+    raise UnsupportedQueryError(
+        "Unsupported filter combination: " + ", ".join(sorted(filters))
+        + ". Supported: " + "; ".join(
+            " + ".join(equality + (f"[{range_filter}]",)) for equality, range_filter in indexes.values()
+        )
+    )
+
+
+def plan_customer_query(filters: dict) -> dict:
+    """
+    Choose the index answering the given filters on each table.
+
+    Parameters:
+    - filters (dict): Query parameter name to value; parameters set to None are ignored.
+
+    Returns:
+    - dict: {"customer": index name or None, "property_address": index name or None}.
+
+    Raises:
+    - UnsupportedQueryError: If the filters on a table match none of its indexes.
+    """
+    given = {FILTER_PARAMETERS.get(name, name) for name, value in filters.items() if value is not None}
+    customer_filters = given & {name for _, (equality, range_filter) in CUSTOMER_FILTER_INDEXES.items()
+                                for name in equality + (range_filter,)}
+    return {
+        "customer": _choose_index(customer_filters, CUSTOMER_FILTER_INDEXES),
+        "property_address": _choose_index(given - customer_filters, PROPERTY_ADDRESS_FILTER_INDEXES),
+    }
+
+
+def sort_columns(sort: str):
+    """
+    Resolve a sort key such as "-electricity_usage_kwh".
+
+    Returns:
+    - tuple: (column, descending).
+
+    Raises:
+    - UnsupportedQueryError: If the key is not one of SORT_COLUMNS.
+    """
+    descending = sort.startswith("-")
+    column = SORT_COLUMNS.get(sort.lstrip("-"))
+    if column is None:
+        raise UnsupportedQueryError(f"Unsupported sort key: {sort}. Supported: {', '.join(SORT_COLUMNS)}")
+    return column, descending
+
+
+def _prefix_filter(column, prefix):
+    low, high = prefix_range(prefix)
+    return (column >= low) & (column < high)
+
+
+def build_customer_query(query, state_code=None, postal_prefix=None, old_roof=None, min_usage=None,
+                         max_usage=None, last_name_prefix=None, email_prefix=None, sort="id"):
+    """
+    Apply the filters and the sort key to a CustomerModel query.
+
+    Parameters:
+    - query (Query): Query selecting CustomerModel rows.
+    - state_code, postal_prefix, old_roof, min_usage, max_usage, last_name_prefix, email_prefix:
+      Filters, ignored when None. Prefixes are turned into index range predicates;
+      email_prefix ignores case.
+    - sort (str): Sort key; ties are broken by id in the same direction.
+
+    Returns:
+    - tuple: (query, sort_key) where sort_key maps a CustomerModel to its position in the
+      order, for merging ordered results from several shards.
+
+    Raises:
+    - UnsupportedQueryError: If no index supports the filters or the sort key.
+    """
+    plan_customer_query({
+        "state_code": state_code, "postal_prefix": postal_prefix, "old_roof": old_roof,
+        "min_usage": min_usage, "max_usage": max_usage,
+        "last_name_prefix": last_name_prefix, "email_prefix": email_prefix,
+    })
+    column, descending = sort_columns(sort)
+
+    if old_roof is not None:
+        query = query.filter(CustomerModel.old_roof == old_roof)
+    if min_usage is not None:
+        query = query.filter(CustomerModel.electricity_usage_kwh >= min_usage)
+    if max_usage is not None:
+        query = query.filter(CustomerModel.electricity_usage_kwh <= max_usage)
+    if last_name_prefix is not None:
+        query = query.filter(_prefix_filter(CustomerModel.last_name, last_name_prefix))
+    if email_prefix is not None:
+        query = query.filter(_prefix_filter(CustomerModel.email_normalized, normalize_email(email_prefix)))
+
+    address_filters = []
+    if state_code is not None:
+        # State codes are stored upper-cased, so one equality matches every spelling of the code
+        address_filters.append(PropertyAddressModel.state_code == stored_state_code(state_code))
+    if postal_prefix is not None:
+        address_filters.append(_prefix_filter(PropertyAddressModel.postal_code, postal_prefix))
+    if address_filters:
+        query = query.filter(CustomerModel.id.in_(select(PropertyAddressModel.customer_id).where(*address_filters)))
+
+    order = [column] if column is CustomerModel.id else [column, CustomerModel.id]
+    query = query.order_by(*(ordered.desc() for ordered in order) if descending else order)
+
+    attribute = column.key
+
+    def sort_key(customer):
+        value = getattr(customer, attribute)
+        # NULLs sort first, as they do in SQLite and MySQL; strings compare by code point
+        return value is not None, value, customer.id
+
+    return query, sort_key
@@ -0,0 +1,104 @@
+import logging
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+from app.analytics import UsageAnalytics, GROUP_BY_STATE
+from app.database import get_read_db, session_factory_for
+from app.metrics import metrics
+from concurrent.futures import ThreadPoolExecutor
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+"""
+Defines the API endpoints for usage analytics.
+
+This module contains the FastAPI router for:
+- Reading electricity usage distributions grouped by state, old roof or postal prefix
+
+Every request is answered from the in-memory UsageSnapshot. The database is only read to
+build the first snapshot, by the first request, and then by the background refresh, on a
+read replica when one is available.
+"""
+
+ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS = 300
+
+refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analytics-refresh")
+
+usage_analytics = UsageAnalytics()
+
+
+def refresh_usage_snapshot(session_factory):
+    """
+    Refresh the usage snapshot in the background using a session of its own. The caller
+    must hold the refresh claim from usage_analytics.begin_refresh().
+
+    Args:
+    - session_factory (sessionmaker): Factory for the refresh session.
+    """
+    db = session_factory()
+    try:
+        usage_analytics.refresh(db)
+    except Exception:
+        # Nothing waits on the refresh, so its failures are logged here; the previous
+        # snapshot keeps being served and the next stale request retries
+        logger.exception("Usage analytics refresh failed")
+        metrics.increment("usage_analytics_refresh_failures")
+    finally:
+        db.close()
+
+
+def parse_percentiles(percentiles: str) -> tuple:
+    """
+    Parse a comma-separated list of percentiles, each greater than 0 and at most 100.
+    """
+    try:
+        parsed = tuple(float(percent) for percent in percentiles.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="percentiles should be comma-separated numbers")
+    if not all(0 < percent <= 100 for percent in parsed):
+        raise HTTPException(status_code=400, detail="percentiles should be greater than 0 and at most 100")
+    return parsed
+
+
+@router.get("/analytics/usage")
+def read_usage_analytics(group_by: str = GROUP_BY_STATE, percentiles: str = "50,90,99", prefix_digits: int = 3,
+                         db: Session = Depends(get_read_db)):
+    """
+    Endpoint to read electricity usage per group: count, sum, mean and percentiles.
+
+    Served from the latest usage snapshot, which is refreshed in the background once older
+    than ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS. The first request builds the first snapshot.
+    Customers without electricity_usage_kwh are left out; customers without an address are
+    grouped under a null key.
+
+    Args:
+    - group_by (str): state_code, old_roof or postal_prefix.
+    - percentiles (str): Comma-separated percentiles of usage to report, e.g. "50,90,99".
+    - prefix_digits (int): Postal prefix length when grouping by postal_prefix, 1 to 5.
+    - db (Session): SQLAlchemy database session, read only for the first snapshot and
+      otherwise handed over to the background refresh.
+
+    Returns:
+    - dict: group_by, snapshot_taken_at, customers (rows in the snapshot) and groups.
+    """
+    parsed_percentiles = parse_percentiles(percentiles)
+
+    snapshot = usage_analytics.snapshot
+    if snapshot is None:
+        try:
+            snapshot = usage_analytics.first_snapshot(db)
+        except Exception:
+            # Whatever failed, the next request builds the first snapshot again
+            logger.exception("Usage analytics first snapshot failed")
+            metrics.increment("usage_analytics_refresh_failures")
+            raise HTTPException(status_code=503, detail="Analytics snapshot not available")
+    else:
+        age = usage_analytics.age()
+        if (age is None or age >= ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS) and usage_analytics.begin_refresh():
+            refresh_executor.submit(refresh_usage_snapshot, session_factory_for(db))
+
+    try:
+        groups = snapshot.group_by(group_by, parsed_percentiles, prefix_digits)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return {"group_by": group_by, "snapshot_taken_at": snapshot.taken_at, "customers": len(snapshot), "groups": groups}
@@ -1,68 +1,282 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, load_only, selectinload
 from app.schemas.customer import Customer
 from app.schemas.propertyAddress import PropertyAddress, CustomerResponse
-from app.database import get_db
+from app.schemas.search import CustomerSearchResult
+from app.database import get_db, get_read_db, pin_reads_to_primary, read_source, session_factory_for
 from app.models.customer import CustomerModel
 from app.models.propertyAddress import PropertyAddressModel
-from app.helpers import check_if_email_unique, create_property_address_record, validate_email, validate_postal_code, get_customer_and_property_address
-from typing import List
+from app.helpers import check_if_email_unique, create_property_address_record, validate_postal_code, get_customer_and_property_address, get_customer_fields, get_customer_id_by_email, register_customer_email, canonical_uuid
+from app.queryplan import build_customer_query, UnsupportedQueryError
+from app.singleflight import SingleFlight
+from app.ids import new_id
+from app.sharding import iter_scatter_gather, scatter_gather
+from app.cache import StaleWhileRevalidateCache, FRESH
+from app.search import CustomerSearchIndex
+from app.stats import apply_customer_stats_delta, customer_stats_entry
+from app.geo import postal_code_grid
+from app.zipcodes import resolve_property_address
+from app.circuitbreaker import CircuitBreaker, CircuitOpenError, OPEN
+from app.metrics import metrics
+from app.fastjson import FastJSONResponse, FastJSONRoute
+from app.serializers import customer_columns, parse_fields, serializer_for
+from app.negotiation import JSON_MEDIA_TYPE, choose_media_type
+from app.protobuf import PROTOBUF_MEDIA_TYPE, ProtobufResponse, decode_customer, encode_customer, encode_customers
+from app.xmlstream import XML_MEDIA_TYPE, XMLResponse, encode_customer_xml, iter_customers_xml
+from app.streaming import iterate_in_thread
+from app.validation import validate_customer_create, validate_customer_patch
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
 import uuid, re
 
-router = APIRouter()
+
+class CustomerRoute(FastJSONRoute):
+    # Customer bodies may also be sent as protobuf Customer messages
+    body_decoders = {PROTOBUF_MEDIA_TYPE: decode_customer}
+
+
+# JSON bodies and responses go through orjson when it is installed
+router = APIRouter(route_class=CustomerRoute, default_response_class=FastJSONResponse)
 
 """
 Defines API endpoints related to customer operations.
 
 This module contains FastAPI router definitions for handling customer-related operations:
 - Creating a customer
-- Reading a single customer by ID
-- Reading all customers
+- Reading a single customer by ID or by email
+- Reading customers, filtered, sorted and paginated
+- Searching customers by name, email or city
+- Finding customers near a postal code
 - Updating a customer
 
+Customers are sent as JSON, or as protobuf (app/proto/customer.proto) or XML (app.xmlstream)
+when the Accept header prefers application/x-protobuf or application/xml. Request bodies
+may be protobuf Customer messages. XML customer lists are streamed from the database.
+
+When the ZIP table (app.zipcodes) is installed, property addresses are checked against it
+and their missing state codes and cities are filled in from the postal code.
+
 It utilizes SQLAlchemy models and helper functions for database interactions.
 """
 
 ELECTRICITY_USAGE_KWH = "electricity_usage_kwh"
-OLD_ROOF = "old_roof"
 PROPERTY_ADDRESS = "property_address"
 EMAIL = 'email'
-CUSTOMER_REQUIRED_FIELDS = ['first_name', 'last_name', 'email']
-POSTAL_CODE = 'postal_code'
+EMAIL_NORMALIZED = 'email_normalized'
+STATE_CODE = 'state_code'
+STATE_CODE_MAX_LENGTH = 5
 ID = "id"
+# Representations of customers, preferred first
+CUSTOMER_MEDIA_TYPES = (JSON_MEDIA_TYPE, PROTOBUF_MEDIA_TYPE, XML_MEDIA_TYPE)
+# Rows fetched per database round trip while streaming a customer list
+CUSTOMERS_STREAM_BATCH_SIZE = 1000
+
+CUSTOMER_CACHE_SOFT_TTL_SECONDS = 30
+CUSTOMER_CACHE_HARD_TTL_SECONDS = 600
+CUSTOMER_CACHE_MAX_ENTRIES = 10000
+STALE_WARNING = '110 - "Response is Stale"'
+REVALIDATION_FAILED_WARNING = '111 - "Revalidation Failed"'
+CUSTOMERS_MAX_PAGE_SIZE = 1000
+CUSTOMER_SEARCH_MAX_LIMIT = 50
+NEAR_MAX_RADIUS_KM = 250
+# Writes made by other processes reach the search index when it is rebuilt
+SEARCH_INDEX_MAX_AGE_SECONDS = 300
+
+# Concurrent identical reads share one database fetch
+customer_reads = SingleFlight()
+
+# Recently read customers, served stale while they are refreshed or while the database is down
+customer_cache = StaleWhileRevalidateCache(
+    soft_ttl=CUSTOMER_CACHE_SOFT_TTL_SECONDS,
+    hard_ttl=CUSTOMER_CACHE_HARD_TTL_SECONDS,
+    max_entries=CUSTOMER_CACHE_MAX_ENTRIES,
+)
+database_breaker = CircuitBreaker("database", failure_threshold=5, reset_timeout=30, failure_exceptions=(SQLAlchemyError,))
+refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="customer-refresh")
+
+# Names, emails and cities of every customer, for autocomplete
+customer_search = CustomerSearchIndex()
+
+
+def load_customer(customer_id: str, db: Session, fields: tuple = None):
+    """
+    Load a customer through the circuit breaker and the single-flight group, caching the result.
+
+    Replica sessions that carry a hedged reader fetch through it instead of using db directly.
+
+    Args:
+    - customer_id (str): ID of the customer to load.
+    - db (Session): SQLAlchemy database session.
+    - fields (tuple): Only read these CustomerResponse fields; partial results are not cached.
+
+    Returns:
+    - Union[CustomerResponse, dict, None]: The customer (a dict of the fields when fields is
+      given), or None if it does not exist.
+    """
+    hedged_reader = getattr(db, "hedged_reader", None)
+
+    def read(session):
+        if fields is None:
+            return get_customer_and_property_address(customer_id, session)
+        return get_customer_fields(customer_id, fields, session)
+
+    def fetch():
+        if hedged_reader is not None:
+            return hedged_reader.read(read)
+        return read(db)
+
+    data = database_breaker.call(lambda: customer_reads.do(("customer", customer_id, fields, read_source(db)), fetch))
+    if data is not None and fields is None:
+        customer_cache.set(customer_id, data)
+    return data
+
+
+def refresh_customer(customer_id: str, session_factory):
+    """
+    Reload a stale cache entry using a session of its own, recording whether the refresh failed.
+
+    Args:
+    - customer_id (str): ID of the customer to refresh.
+    - session_factory (sessionmaker): Factory for the refresh session.
+    """
+    succeeded = False
+    db = session_factory()
+    try:
+        if load_customer(customer_id, db) is None:
+            customer_cache.invalidate(customer_id)
+        succeeded = True
+    except (SQLAlchemyError, CircuitOpenError):
+        metrics.increment("customer_cache_refresh_failures")
+    finally:
+        db.close()
+        customer_cache.end_refresh(customer_id, succeeded)
+
+
+def rebuild_search_index(session_factory):
+    """
+    Rebuild the search index in the background using a session of its own.
+
+    Args:
+    - session_factory (sessionmaker): Factory for the rebuild session.
+    """
+    db = session_factory()
+    try:
+        customer_search.rebuild(db)
+    except SQLAlchemyError:
+        metrics.increment("customer_search_rebuild_failures")
+    finally:
+        db.close()
+
+
+def serve_stale(data, response: Response, warning: str, reason: str):
+    metrics.increment("customer_cache_stale_served", reason=reason)
+    if response is not None:
+        response.headers["Warning"] = warning
+    return data
+
+
+def negotiate(request: Request) -> str:
+    """
+    Return the customer media type to respond with, chosen from the request's Accept header.
+
+    Raises:
+    - HTTPException: 406 if the client refuses JSON, e.g. with */*;q=0, and accepts none of
+      the other CUSTOMER_MEDIA_TYPES. Headers matching none of them get JSON.
+    """
+    if request is None:
+        return JSON_MEDIA_TYPE
+    chosen = choose_media_type(request.headers.get("accept"), CUSTOMER_MEDIA_TYPES)
+    if chosen is None:
+        raise HTTPException(status_code=406, detail=f"Customers are available as {', '.join(CUSTOMER_MEDIA_TYPES)}")
+    return chosen
+
+
+def negotiated(rendered: Response, response: Response = None) -> Response:
+    # Headers set on the injected response (e.g. Warning, the consistency token) are carried over
+    if response is not None:
+        rendered.raw_headers.extend(
+            header for header in response.raw_headers if header[0] not in (b"content-length", b"content-type")
+        )
+    rendered.headers["Vary"] = "Accept"
+    return rendered
+
+
+def customer_response(data, response: Response = None, fields: tuple = None,
+                      media_type: str = JSON_MEDIA_TYPE) -> Response:
+    """
+    Render a customer with the compiled serializer instead of response_model validation.
+
+    Args:
+    - data (Union[CustomerResponse, dict]): Customer read from our own database or the cache,
+      or the dict of requested fields from get_customer_fields.
+    - response (Response): Injected response whose headers (e.g. Warning) are carried over.
+    - fields (tuple): CustomerResponse fields to render, all when None.
+    - media_type (str): One of CUSTOMER_MEDIA_TYPES, from negotiate.
+
+    Returns:
+    - Response: The customer as JSON, as a protobuf Customer message or as XML.
+    """
+    content = data if isinstance(data, dict) else serializer_for(CustomerResponse, fields)(data)
+    if media_type == PROTOBUF_MEDIA_TYPE:
+        return negotiated(ProtobufResponse(encode_customer(content)), response)
+    if media_type == XML_MEDIA_TYPE:
+        return negotiated(XMLResponse(encode_customer_xml(content)), response)
+    return negotiated(FastJSONResponse(content), response)
+
+
+def customers_response(contents: list, media_type: str = JSON_MEDIA_TYPE) -> Response:
+    """
+    Render serialized customers as a JSON list, a protobuf CustomerList message or XML.
+    """
+    if media_type == PROTOBUF_MEDIA_TYPE:
+        return negotiated(ProtobufResponse(encode_customers(contents)))
+    if media_type == XML_MEDIA_TYPE:
+        return negotiated(XMLResponse(b"".join(iter_customers_xml(contents))))
+    return negotiated(FastJSONResponse(contents))
+
 
 @router.post("/customer/", response_model=CustomerResponse)
-def create_customer(customer_payload: dict, db: Session = Depends(get_db)):
+def create_customer(customer_payload: dict, db: Session = Depends(get_db), response: Response = None,
+                    request: Request = None):
     """
     Endpoint to create a new customer with optional property address.
 
     Args:
     - customer_payload (dict): Payload containing customer details.
-    - db (Session): SQLAlchemy database session.
+    - db (Session): SQLAlchemy database session on the primary.
+    - response (Response): Outgoing response, used to hand out the consistency token.
+    - request (Request): Incoming request, whose Accept header picks the representation.
 
     Returns:
-    - CustomerResponse: Created customer and property address details.
+    - CustomerResponse: Created customer and property address details, as a protobuf
+      Customer message or as XML when negotiated.
     """
+    media_type = negotiate(request)
 
-    if not set(CUSTOMER_REQUIRED_FIELDS).issubset(customer_payload.keys()):
-        raise HTTPException(status_code=400, detail="Missing Required Information")
-    
-    if not validate_email(customer_payload.get(EMAIL)):
-        raise HTTPException(status_code=400, detail="Please enter correct email - abc@xyz.com")
+    # Every error of the payload, checked against the request schema in customers.yaml
+    errors = validate_customer_create(customer_payload)
+    if errors:
+        raise HTTPException(status_code=400, detail="; ".join(errors))
 
+    property_address_payload = customer_payload.get("property_address")
+    # The state code and city must agree with the postal code; missing ones are filled in
+    if property_address_payload is not None:
+        try:
+            property_address_payload = resolve_property_address(property_address_payload)
+        except ValueError as error:
+            raise HTTPException(status_code=400, detail=str(error))
+
+    # Validation above never touches the database; uniqueness is checked last
     if not check_if_email_unique(customer_payload.get("email"), db):
         raise HTTPException(status_code=409, detail="Email already taken")
 
-    if ELECTRICITY_USAGE_KWH in customer_payload.keys() and not isinstance(customer_payload.get("electricity_usage_kwh"), int):
-        raise HTTPException(status_code=400, detail="electricity_usage_kwh should be number")
-
-    if OLD_ROOF in customer_payload.keys() and not isinstance(customer_payload.get("old_roof"), bool):
-        raise HTTPException(status_code=400, detail="old_roof should be boolean")
-
     # Create customer with the property address ID
     customer_db = CustomerModel(
-        id=str(uuid.uuid4()),  # Generate a new UUID as the ID
+        id=new_id(),  # Generate a new time-ordered UUID as the ID
         first_name=customer_payload.get("first_name"),
         last_name=customer_payload.get("last_name"),
         email=customer_payload.get("email"),
@@ -70,89 +284,372 @@ def create_customer(customer_payload: dict, db: Session = Depends(get_db)):
         old_roof=customer_payload.get("old_roof"),
     )
     db.add(customer_db)
+    register_customer_email(customer_db.email, customer_db.id, db)
     db.flush()
 
     # Create property address with a new ID
-    property_address_payload = customer_payload.get("property_address")
-    
     if property_address_payload is not None:
         property_address_db = create_property_address_record(property_address_payload, customer_db.id, db)
 
+    state_code = property_address_payload.get(STATE_CODE) if property_address_payload is not None else None
+    apply_customer_stats_delta(db, customer_db.id, after=customer_stats_entry(state_code, customer_db.electricity_usage_kwh))
+
     db.commit()
     db.flush()
 
-    return get_customer_and_property_address(customer_db.id, db)
+    data = get_customer_and_property_address(customer_db.id, db)
+    customer_cache.set(customer_db.id, data)
+    customer_search.add_customer(data)
+    pin_reads_to_primary(response)
+    if media_type != JSON_MEDIA_TYPE:
+        return customer_response(data, response, media_type=media_type)
+    return data
 
 @router.get("/customer/{customer_id}", response_model=CustomerResponse)
-def read_customer(customer_id: str, db: Session = Depends(get_db)):
+def read_customer(customer_id: str, db: Session = Depends(get_read_db), response: Response = None,
+                  fields: Optional[str] = None, request: Request = None):
     """
     Endpoint to read a customer by their ID.
 
+    Fresh cache entries are returned without touching the database. Stale entries are
+    returned immediately with a Warning header and refreshed in the background. If the
+    database fails or the circuit breaker is open, the stale entry is still served.
+    On a cache miss with fields, only the requested columns are read, and the
+    property_address table only when property_address is requested.
+
     Args:
     - customer_id (str): ID of the customer to retrieve.
-    - db (Session): SQLAlchemy database session.
+    - db (Session): SQLAlchemy database session, on a read replica when one is available.
+    - response (Response): Outgoing response, used to set the Warning header.
+    - fields (str): Comma-separated CustomerResponse fields to return, e.g. "id,email"; all when omitted.
+    - request (Request): Incoming request, whose Accept header picks the representation.
 
     Returns:
-    - CustomerResponse: Retrieved customer and property address details.
+    - Response: Retrieved customer and property address details, shaped as CustomerResponse,
+      as JSON, as a protobuf Customer message or as XML.
     """
-    data = get_customer_and_property_address(customer_id, db)
+    media_type = negotiate(request)
+    try:
+        fields = parse_fields(CustomerResponse, fields)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    # Every spelling of the ID shares the cache entry and single-flight key of the canonical one
+    customer_id = canonical_uuid(customer_id)
+    if customer_id is None:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    cached, state, refresh_failed = customer_cache.get(customer_id)
+    if state == FRESH:
+        metrics.increment("customer_cache_hits")
+        return customer_response(cached, response, fields, media_type)
+
+    if cached is not None:
+        if customer_cache.begin_refresh(customer_id):
+            refresh_executor.submit(refresh_customer, customer_id, session_factory_for(db))
+        if refresh_failed or database_breaker.state == OPEN:
+            return customer_response(serve_stale(cached, response, REVALIDATION_FAILED_WARNING, reason="error"), response, fields, media_type)
+        return customer_response(serve_stale(cached, response, STALE_WARNING, reason="revalidate"), response, fields, media_type)
+
+    metrics.increment("customer_cache_misses")
+    try:
+        data = load_customer(customer_id, db, fields)
+    except (SQLAlchemyError, CircuitOpenError):
+        raise HTTPException(status_code=503, detail="Customer data temporarily unavailable")
+
     if data:
-        return data
+        return customer_response(data, response, fields, media_type)
     raise HTTPException(status_code=404, detail="Customer not found")    
 
 
+@router.get("/customer", response_model=CustomerResponse)
+def read_customer_by_email(email: str, db: Session = Depends(get_read_db), request: Request = None):
+    """
+    Endpoint to read a customer by their email, ignoring case.
+
+    The email is resolved to a customer ID through the unique normalized email index,
+    then the customer is loaded like GET /customer/{customer_id}.
+
+    Args:
+    - email (str): Email of the customer to retrieve, from the query string.
+    - db (Session): SQLAlchemy database session, on a read replica when one is available.
+    - request (Request): Incoming request, whose Accept header picks the representation.
+
+    Returns:
+    - Response: Retrieved customer and property address details, shaped as CustomerResponse,
+      as JSON, as a protobuf Customer message or as XML.
+    """
+    media_type = negotiate(request)
+    try:
+        customer_id = database_breaker.call(lambda: get_customer_id_by_email(email, db))
+        data = load_customer(customer_id, db) if customer_id is not None else None
+    except (SQLAlchemyError, CircuitOpenError):
+        raise HTTPException(status_code=503, detail="Customer data temporarily unavailable")
+
+    if data:
+        return customer_response(data, media_type=media_type)
+    raise HTTPException(status_code=404, detail="Customer not found")
+
+
+@router.get("/customers/search", response_model=List[CustomerSearchResult])
+def search_customers(q: str, db: Session = Depends(get_read_db), limit: int = 10):
+    """
+    Endpoint to search customers by name, email or city, for autocomplete.
+
+    Served from the in-memory search index, which is built from the database on first use
+    and rebuilt in the background once older than SEARCH_INDEX_MAX_AGE_SECONDS.
+    Customers created or patched through this process are indexed immediately.
+
+    Args:
+    - q (str): Search text; whole and leading words rank above substring matches.
+    - db (Session): SQLAlchemy database session, on a read replica when one is available.
+    - limit (int): Maximum number of results, up to CUSTOMER_SEARCH_MAX_LIMIT.
+
+    Returns:
+    - List[CustomerSearchResult]: Matching customers, best matches first.
+    """
+    if not 1 <= limit <= CUSTOMER_SEARCH_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit should be between 1 and {CUSTOMER_SEARCH_MAX_LIMIT}")
+
+    if not customer_search.is_built:
+        try:
+            database_breaker.call(lambda: customer_reads.do(("search_index", read_source(db)), lambda: customer_search.rebuild(db)))
+        except (SQLAlchemyError, CircuitOpenError):
+            raise HTTPException(status_code=503, detail="Customer data temporarily unavailable")
+    elif customer_search.age() >= SEARCH_INDEX_MAX_AGE_SECONDS and not customer_search.is_rebuilding:
+        refresh_executor.submit(rebuild_search_index, session_factory_for(db))
+
+    return customer_search.search(q, limit)
+
+
+@router.get("/customers/near", response_model=List[Customer])
+def read_customers_near(postal_code: str, radius_km: float, db: Session = Depends(get_read_db),
+                        limit: Optional[int] = None, offset: int = 0, request: Request = None):
+    """
+    Endpoint to read the customers whose property address is within radius_km of a postal code.
+
+    The radius is resolved to the postal codes whose centroids lie inside it using the
+    in-memory PostalCodeGrid. Customers are then read through the postal_code index,
+    in id order and paginated in SQL.
+
+    Args:
+    - postal_code (str): 5-digit postal code at the center of the search.
+    - radius_km (float): Search radius in kilometers, up to NEAR_MAX_RADIUS_KM.
+    - db (Session): SQLAlchemy database session, on a read replica when one is available.
+    - limit (int): Page size, up to CUSTOMERS_MAX_PAGE_SIZE; all matching customers when omitted.
+    - offset (int): Number of matching customers skipped.
+    - request (Request): Incoming request, whose Accept header picks the representation.
+
+    Returns:
+    - Response: Customers with a property address in the area, shaped as List[Customer],
+      as JSON or as a protobuf CustomerList message.
+    """
+    media_type = negotiate(request)
+    if not validate_postal_code(postal_code):
+        raise HTTPException(status_code=400, detail="Invalid Postal Code. It should be a 5-digit number.")
+
+    if not 0 < radius_km <= NEAR_MAX_RADIUS_KM:
+        raise HTTPException(status_code=400, detail=f"radius_km should be greater than 0 and at most {NEAR_MAX_RADIUS_KM}")
+
+    if limit is not None and not 1 <= limit <= CUSTOMERS_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit should be between 1 and {CUSTOMERS_MAX_PAGE_SIZE}")
+
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset should not be negative")
+
+    grid = postal_code_grid()
+    if grid is None:
+        raise HTTPException(status_code=503, detail="Postal code dataset is not installed")
+
+    nearby = grid.near(postal_code, radius_km)
+    if nearby is None:
+        raise HTTPException(status_code=404, detail="Postal code not found")
+    postal_codes = [code for _, code in nearby]
+
+    def load_customers():
+        query = db.query(*customer_columns()).filter(CustomerModel.id.in_(
+            select(PropertyAddressModel.customer_id).where(PropertyAddressModel.postal_code.in_(postal_codes))
+        )).order_by(CustomerModel.id)
+        rows = scatter_gather(db, query, key=lambda customer: customer.id, limit=limit, offset=offset)
+        serialize = serializer_for(Customer)
+        return [serialize(row) for row in rows]
+
+    customers = customer_reads.do(("customers_near", read_source(db), postal_code, radius_km, limit, offset), load_customers)
+    return customers_response(customers, media_type)
+
+
 @router.get("/customers", response_model=List[Customer])
-def read_customers(db: Session = Depends(get_db)):
+def read_customers(db: Session = Depends(get_read_db), state_code: Optional[str] = None, postal_prefix: Optional[str] = None,
+                   old_roof: Optional[bool] = None, min_usage: Optional[int] = None, max_usage: Optional[int] = None,
+                   last_name_prefix: Optional[str] = None, email_prefix: Optional[str] = None,
+                   sort: str = "id", limit: Optional[int] = None, offset: int = 0, fields: Optional[str] = None,
+                   include: Optional[str] = None, request: Request = None):
     """
-    Endpoint to read all customers.
+    Endpoint to read customers, optionally filtered, sorted and paginated.
+
+    Filtering, sorting and pagination happen in SQL. Only filter combinations backed by
+    an index are accepted (see app.queryplan); anything else is rejected with a 400.
+    With fields, only the requested columns (plus the sort key) are selected.
+    With include=property_address, the addresses of the whole page are loaded with one
+    more query (per shard) through the property_address relationship.
+    XML is streamed: rows are read in batches from a database cursor (one per shard) and
+    written to the response as they arrive, so memory does not grow with the list.
 
     Args:
-    - db (Session): SQLAlchemy database session.
+    - db (Session): SQLAlchemy database session, on a read replica when one is available.
+    - state_code (str): State code of the property address, matched in any letter case.
+    - postal_prefix (str): Leading digits of the property address postal code.
+    - old_roof (bool): Whether the customer has an old roof.
+    - min_usage, max_usage (int): Inclusive electricity usage range in kWh.
+    - last_name_prefix, email_prefix (str): Leading characters of the last name or email.
+    - sort (str): Sort key (id, last_name, email, electricity_usage_kwh); prefix with "-" for descending.
+    - limit (int): Page size, up to CUSTOMERS_MAX_PAGE_SIZE; all matching customers when omitted.
+    - offset (int): Number of matching customers skipped.
+    - fields (str): Comma-separated fields to return, e.g. "id,email"; all when omitted.
+    - include (str): "property_address" to embed each customer's address.
+    - request (Request): Incoming request, whose Accept header picks the representation.
 
     Returns:
-    - List[Customer]: List of all customers.
+    - Response: List of matching customers, shaped as List[Customer], or as
+      List[CustomerResponse] with include=property_address; as JSON, as a protobuf
+      CustomerList message or as a streamed XML document.
     """
-    
-    customers_db = db.query(CustomerModel).all()
-    return customers_db
+    media_type = negotiate(request)
+    if include is not None and include != PROPERTY_ADDRESS:
+        raise HTTPException(status_code=400, detail=f"include should be {PROPERTY_ADDRESS}")
+    schema = CustomerResponse if include else Customer
+    try:
+        fields = parse_fields(schema, fields)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    if state_code is not None and not 1 <= len(state_code) <= STATE_CODE_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail=f"state_code should be 1 to {STATE_CODE_MAX_LENGTH} characters")
+
+    if postal_prefix is not None and not re.fullmatch(r"\d{1,5}", postal_prefix):
+        raise HTTPException(status_code=400, detail="postal_prefix should be 1 to 5 digits")
+
+    for name, prefix in (("last_name_prefix", last_name_prefix), ("email_prefix", email_prefix)):
+        if prefix == "":
+            raise HTTPException(status_code=400, detail=f"{name} should not be empty")
+
+    if limit is not None and not 1 <= limit <= CUSTOMERS_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit should be between 1 and {CUSTOMERS_MAX_PAGE_SIZE}")
+
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset should not be negative")
+
+    filters = dict(state_code=state_code, postal_prefix=postal_prefix, old_roof=old_roof, min_usage=min_usage,
+                   max_usage=max_usage, last_name_prefix=last_name_prefix, email_prefix=email_prefix)
+    try:
+        # The sort key and id are selected too, to merge shards in order
+        columns = customer_columns(fields, extra=(sort.lstrip("-"), ID))
+        if include:
+            # Customers are loaded as objects so the relationship can batch-load their addresses
+            customers = db.query(CustomerModel).options(load_only(*columns))
+            if fields is None or PROPERTY_ADDRESS in fields:
+                customers = customers.options(selectinload(CustomerModel.property_address))
+        else:
+            customers = db.query(*columns)
+        query, sort_key = build_customer_query(customers, sort=sort, **filters)
+    except UnsupportedQueryError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    if media_type == XML_MEDIA_TYPE:
+        # Streams are neither shared between callers nor held in memory
+        def write_customers():
+            serialize = serializer_for(schema, fields)
+            rows = iter_scatter_gather(db, query, key=sort_key, limit=limit, offset=offset, reverse=sort.startswith("-"),
+                                       batch_size=CUSTOMERS_STREAM_BATCH_SIZE)
+            try:
+                yield from iter_customers_xml(serialize(row) for row in rows)
+            finally:
+                # The cursors' connections belong to the producer thread, so they are released on it
+                rows.close()
+                db.close()
+
+        return negotiated(StreamingResponse(iterate_in_thread(write_customers, name="customers-xml"),
+                                            media_type=XML_MEDIA_TYPE))
+
+    def load_customers():
+        # Every shard is read in sort order and the results merged
+        rows = scatter_gather(db, query, key=sort_key, limit=limit, offset=offset, reverse=sort.startswith("-"))
+        serialize = serializer_for(schema, fields)
+        return [serialize(row) for row in rows]
+
+    # Keyed by database so reads pinned to the primary never join a replica read
+    page = tuple(sorted(filters.items())) + (("sort", sort), ("limit", limit), ("offset", offset), ("fields", fields),
+                                             ("include", include))
+    # Every caller sharing the read gets a response of its own
+    return customers_response(customer_reads.do(("customers", read_source(db), page), load_customers), media_type)
 
 
 @router.patch("/customer/{customer_id}", response_model=CustomerResponse)
-def patch_customer(customer_id: str, updated_customer: dict, db: Session = Depends(get_db)):
+def patch_customer(customer_id: str, updated_customer: dict, db: Session = Depends(get_db), response: Response = None,
+                   request: Request = None):
     """
     Endpoint to partially update a customer's details.
 
     Args:
     - customer_id (str): ID of the customer to update.
     - updated_customer (dict): Payload containing updated customer details.
-    - db (Session): SQLAlchemy database session.
+    - db (Session): SQLAlchemy database session on the primary.
+    - response (Response): Outgoing response, used to hand out the consistency token.
+    - request (Request): Incoming request, whose Accept header picks the representation.
 
     Returns:
-    - CustomerResponse: Retrieved customer and property address details.
+    - CustomerResponse: Retrieved customer and property address details, as a protobuf
+      Customer message or as XML when negotiated.
     """
+    media_type = negotiate(request)
+
+    # remove id and the derived normalized email if present in payload
+    updated_customer.pop(ID, None)
+    updated_customer.pop(EMAIL_NORMALIZED, None)
+
+    # Every error of the payload, checked against the request schema in customers.yaml
+    errors = validate_customer_patch(updated_customer)
+    if errors:
+        raise HTTPException(status_code=400, detail="; ".join(errors))
+
+    # The canonical spelling, which the cache is keyed and the shard is chosen by
+    customer_id = canonical_uuid(customer_id)
+    if customer_id is None:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    # Validation above never touches the database; the lookups below do
+    # Locked so concurrent patches of the customer apply their stats deltas one after the other
+    customer_db = db.query(CustomerModel).filter(CustomerModel.id == customer_id).with_for_update().first()
 
-    customer_db = db.query(CustomerModel).filter(CustomerModel.id == customer_id).first()
-    # remove id if present in payload
-    updated_customer.pop(ID)
-    
     if customer_db is None:
         raise HTTPException(status_code=404, detail="Customer not found")
 
-    if EMAIL in updated_customer.keys() and not check_if_email_unique(updated_customer.get("email"), db):
+    # A customer may change the case of their own email
+    if EMAIL in updated_customer.keys() and get_customer_id_by_email(updated_customer.get("email"), db) not in (None, customer_db.id):
         raise HTTPException(status_code=409, detail="Email already taken")
-    
-    if ELECTRICITY_USAGE_KWH in updated_customer.keys() and not isinstance(updated_customer.get("electricity_usage_kwh"), int):
-        raise HTTPException(status_code=400, detail="electricity_usage_kwh should be number")
-
-    if OLD_ROOF in updated_customer.keys() and not isinstance(updated_customer.get("old_roof"), bool):
-        raise HTTPException(status_code=400, detail="old_roof should be boolean")
-    
-    if PROPERTY_ADDRESS in updated_customer.keys():
-        property_address_payload = updated_customer.get("property_address")
-
-        if POSTAL_CODE in property_address_payload.keys() and not validate_postal_code(property_address_payload.get("postal_code")):
-            raise HTTPException(status_code=400, detail="Invalid Postal Code. It should be a 5-digit number.")
-        
+
+    if EMAIL in updated_customer.keys():
+        register_customer_email(updated_customer.get("email"), customer_db.id, db, previous_email=customer_db.email)
+
+    # The state and usage before the update, for the per-state stats
+    updates_stats = PROPERTY_ADDRESS in updated_customer or ELECTRICITY_USAGE_KWH in updated_customer
+    property_address_db = None
+    if updates_stats:
+        property_address_db = db.query(PropertyAddressModel).filter(
+            PropertyAddressModel.customer_id == customer_db.id).first()
+        stats_before = customer_stats_entry(property_address_db.state_code if property_address_db else None,
+                                            customer_db.electricity_usage_kwh)
+
+    # The state code and city must agree with the postal code, the stored one unless it changes
+    if updated_customer.get(PROPERTY_ADDRESS) is not None:
+        current = {}
+        if property_address_db is not None:
+            current = {field: getattr(property_address_db, field) for field in ("postal_code", STATE_CODE, "city")}
+        try:
+            updated_customer[PROPERTY_ADDRESS] = resolve_property_address(updated_customer[PROPERTY_ADDRESS], current)
+        except ValueError as error:
+            raise HTTPException(status_code=400, detail=str(error))
+
     # Update customer data if the field is present in the request payload
     for field, value in updated_customer.items():
         if "property_address" not in field and hasattr(customer_db, field):
@@ -160,9 +657,6 @@ def patch_customer(customer_id: str, updated_customer: dict, db: Session = Depen
 
     # Update property address data if the field is present in the request payload
     if "property_address" in updated_customer:
-        property_address_db = db.query(PropertyAddressModel).filter(
-            PropertyAddressModel.customer_id == customer_db.id).first()
-        
         if property_address_db is None:
             property_address_db = create_property_address_record(updated_customer.get("property_address"), customer_db.id, db)
 
@@ -171,7 +665,19 @@ def patch_customer(customer_id: str, updated_customer: dict, db: Session = Depen
                 if hasattr(property_address_db, field):
                     setattr(property_address_db, field, value)
 
+    if updates_stats:
+        stats_after = customer_stats_entry(property_address_db.state_code if property_address_db else None,
+                                           customer_db.electricity_usage_kwh)
+        if stats_after != stats_before:
+            apply_customer_stats_delta(db, customer_db.id, before=stats_before, after=stats_after)
+
     db.commit()
     db.refresh(customer_db)
 
-    return get_customer_and_property_address(customer_db.id, db)
+    data = get_customer_and_property_address(customer_db.id, db)
+    customer_cache.set(customer_db.id, data)
+    customer_search.add_customer(data)
+    pin_reads_to_primary(response)
+    if media_type != JSON_MEDIA_TYPE:
+        return customer_response(data, response, media_type=media_type)
+    return data
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from app.metrics import metrics
+
+router = APIRouter()
+
+"""
+Defines the API endpoint exposing in-process metrics.
+
+This module contains the FastAPI router for:
+- Reading the current counters and gauges (cache hits, stale serves, circuit breaker state, ...)
+"""
+
+
+@router.get("/metrics")
+def read_metrics():
+    """
+    Endpoint to read the current metrics.
+
+    Returns:
+    - dict: Counters and gauges keyed by metric name and labels.
+    """
+    return metrics.snapshot()
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.database import get_read_db
+from app.stats import read_customer_state_stats
+
+router = APIRouter()
+
+"""
+Defines the API endpoint exposing customer totals.
+
+This module contains the FastAPI router for:
+- Reading the number of customers and their electricity usage, overall and per state
+"""
+
+
+@router.get("/stats")
+def read_stats(db: Session = Depends(get_read_db)):
+    """
+    Endpoint to read customer counts and usage totals per state.
+
+    Read from the customer_state_stats rollup, which customer writes keep up to date, so
+    the cost does not grow with the number of customers.
+
+    Args:
+    - db (Session): SQLAlchemy database session, on a read replica when one is available.
+
+    Returns:
+    - dict: customers, customers_with_usage and electricity_usage_kwh overall, and per state under states.
+    """
+    return read_customer_state_stats(db)
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Optional
+
+"""
+Defines a Pydantic model representing a customer search result.
+
+This module contains the Pydantic CustomerSearchResult model returned by GET /customers/search:
+- ID
+- First name
+- Last name
+- Email
+- Optional attribute: city of the property address
+"""
+class CustomerSearchResult(BaseModel):
+    id: str
+    first_name: str
+    last_name: str
+    email: str
+    city: Optional[str] = None
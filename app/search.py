@@ -0,0 +1,322 @@
+import array
+import bisect
+import heapq
+import threading
+import time
+from app.models.customer import CustomerModel
+from app.models.propertyAddress import PropertyAddressModel
+
+"""
+Defines the in-process search index behind GET /customers/search.
+
+The support tool's autocomplete used LIKE '%x%' queries that scan the whole customer table.
+This index answers the same questions from memory:
+- Prefix matches on first name, last name, full name and city, from a sorted array of terms
+  searched with bisect. It serves the same lookups as a prefix trie, with one list instead of
+  a dict per character.
+- Substring matches on names, email and city, from trigram postings. The postings of the
+  query's rarest trigram give the candidates, which are then checked against the text.
+  Long candidate lists are first intersected with the second rarest trigram's postings.
+
+Customers are numbered by ordinal in insertion order. Postings are compact arrays of
+ordinals, or a bare ordinal for a term only one customer has. Updating a customer gives it
+a new ordinal and tombstones the old one. Tombstones are dropped when the index compacts
+itself, or when it is rebuilt from the database.
+
+This module contains:
+- trigrams: the set of 3-character substrings of a string
+- CustomerSearchIndex: the index, updated incrementally and rebuildable from the database
+"""
+
+# Terms added since the last merge are kept in a small sorted list of their own
+NEW_TERMS_MERGE_THRESHOLD = 4096
+# Compact once tombstones outnumber live customers (and at least this many)
+COMPACT_MIN_TOMBSTONES = 1024
+# Substring candidates verified one by one before intersecting with a second trigram
+INTERSECT_AFTER_CANDIDATES = 256
+EMPTY_POSTINGS = array.array("I")
+
+
+def trigrams(text: str) -> set:
+    """
+    Return the set of 3-character substrings of text.
+    """
+    return {text[index:index + 3] for index in range(len(text) - 2)}
+
+
+def _normalize(value) -> str:
+    return " ".join(str(value).replace("\0", "").lower().split()) if value else ""
+
+
+# Documents are plain tuples: the garbage collector stops tracking tuples of strings,
+# so a million indexed customers do not slow down every full collection
+CUSTOMER_ID, FIRST_NAME, LAST_NAME, EMAIL, CITY, TEXT = range(6)
+
+
+def _document(customer_id, first_name, last_name, email, city) -> tuple:
+    # Fields are separated by a character queries never contain, so matches cannot span fields
+    text = "\0".join(_normalize(field) for field in (first_name, last_name, email, city))
+    return customer_id, first_name, last_name, email, city, text
+
+
+def _prefix_terms(document: tuple) -> set:
+    first_name, last_name, city = (_normalize(document[field]) for field in (FIRST_NAME, LAST_NAME, CITY))
+    terms = {first_name, last_name, f"{first_name} {last_name}".strip(), city}
+    for field in (first_name, last_name, city):
+        terms.update(field.split())
+    terms.discard("")
+    return terms
+
+
+def _as_result(document: tuple) -> dict:
+    return {"id": document[CUSTOMER_ID], "first_name": document[FIRST_NAME], "last_name": document[LAST_NAME],
+            "email": document[EMAIL], "city": document[CITY]}
+
+
+def _substring_candidates(postings: list):
+    # Ordinals having every trigram in postings (sorted rarest first), plus some false positives
+    candidates = postings[0]
+    if len(postings) == 1 or len(candidates) <= INTERSECT_AFTER_CANDIDATES:
+        yield from candidates
+        return
+    # Common matches fill the limit from the first candidates. Otherwise the rest is narrowed
+    # down to ordinals that also have the second rarest trigram.
+    yield from candidates[:INTERSECT_AFTER_CANDIDATES]
+    yield from sorted(set(candidates[INTERSECT_AFTER_CANDIDATES:]).intersection(postings[1]))
+
+
+class _IndexState:
+    def __init__(self):
+        self.documents = []           # ordinal -> document tuple, None once replaced
+        self.ordinals = {}            # customer id -> live ordinal
+        self.terms = []               # sorted prefix terms
+        self.new_terms = []           # sorted prefix terms added since the last merge
+        self.term_postings = {}       # prefix term -> ordinal, or array of ordinals once shared
+        self.trigram_postings = {}    # trigram -> array of ordinals
+        self.tombstones = 0
+
+    def add(self, document: tuple, bulk: bool = False):
+        previous = self.ordinals.get(document[CUSTOMER_ID])
+        if previous is not None:
+            self.documents[previous] = None
+            self.tombstones += 1
+
+        ordinal = len(self.documents)
+        self.documents.append(document)
+        self.ordinals[document[CUSTOMER_ID]] = ordinal
+
+        for term in _prefix_terms(document):
+            postings = self.term_postings.get(term)
+            if postings is None:
+                # Most terms (full names, rare last names) belong to one customer: store the bare ordinal
+                self.term_postings[term] = ordinal
+                if not bulk:
+                    bisect.insort(self.new_terms, term)
+            elif type(postings) is int:
+                self.term_postings[term] = array.array("I", (postings, ordinal))
+            else:
+                postings.append(ordinal)
+        for trigram in trigrams(document[TEXT]):
+            postings = self.trigram_postings.get(trigram)
+            if postings is None:
+                postings = self.trigram_postings[trigram] = array.array("I")
+            postings.append(ordinal)
+
+        if len(self.new_terms) > NEW_TERMS_MERGE_THRESHOLD:
+            self.merge_terms()
+
+    def merge_terms(self):
+        # Sorting two concatenated sorted runs is a linear merge
+        self.terms.extend(self.new_terms)
+        self.terms.sort()
+        self.new_terms = []
+
+    def finish_bulk(self):
+        # Documents added in bulk skip the term lists; sort every term once at the end
+        self.terms = sorted(self.term_postings)
+        self.new_terms = []
+
+    def needs_compaction(self) -> bool:
+        return self.tombstones >= max(COMPACT_MIN_TOMBSTONES, len(self.ordinals))
+
+    def terms_with_prefix(self, prefix: str):
+        # Every term starting with prefix sorts between prefix and prefix + U+10FFFF
+        ranges = []
+        for terms in (self.terms, self.new_terms):
+            start = bisect.bisect_left(terms, prefix)
+            end = bisect.bisect_left(terms, prefix + "\U0010ffff", start)
+            # Iterate the range without copying it out of the big term list
+            ranges.append(map(terms.__getitem__, range(start, end)))
+        return heapq.merge(*ranges)
+
+
+class CustomerSearchIndex:
+    """
+    In-memory prefix and substring index over customer names, emails and cities.
+
+    Results are ranked in three tiers:
+    1. A whole term equals the query.
+    2. A term starts with the query, in term order.
+    3. A field contains the query (queries of at least 3 characters), in insertion order.
+    Ranking stops as soon as limit results are found, so the work per query is bounded
+    by the limit rather than by the number of customers.
+
+    Parameters:
+    - clock (callable): Monotonic time source for the index age, replaceable in tests.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._state = _IndexState()
+        self._built_at = None
+        self._rebuilding = None
+
+    @property
+    def is_built(self) -> bool:
+        return self._built_at is not None
+
+    @property
+    def is_rebuilding(self) -> bool:
+        return self._rebuilding is not None
+
+    def age(self):
+        """
+        Seconds since the last rebuild from the database, None if never built.
+        """
+        return None if self._built_at is None else self.clock() - self._built_at
+
+    def __len__(self):
+        return len(self._state.ordinals)
+
+    def add(self, customer_id, first_name, last_name, email, city=None):
+        """
+        Index a customer, replacing any earlier version of it.
+        """
+        document = _document(customer_id, first_name, last_name, email, city)
+        with self._lock:
+            self._state.add(document)
+            if self._rebuilding is not None:
+                self._rebuilding.append(document)
+            if self._state.needs_compaction():
+                self._state = self._compacted(self._state)
+
+    def add_customer(self, customer):
+        """
+        Index a CustomerResponse.
+        """
+        city = customer.property_address.city if customer.property_address else None
+        self.add(customer.id, customer.first_name, customer.last_name, customer.email, city)
+
+    @staticmethod
+    def _compacted(state):
+        compacted = _IndexState()
+        for document in state.documents:
+            if document is not None:
+                compacted.add(document, bulk=True)
+        compacted.finish_bulk()
+        return compacted
+
+    def rebuild(self, db, batch_size: int = 10000):
+        """
+        Rebuild the index from the database, replacing the current one when done.
+
+        Searches keep using the current index while the new one is built, and customers
+        indexed in the meantime are carried over.
+
+        Args:
+        - db (Session): SQLAlchemy database session; every shard is read when sharded.
+        - batch_size (int): Rows fetched from the database at a time.
+
+        Returns:
+        - bool: False if another rebuild was already running and nothing was done.
+        """
+        rows = db.query(
+            CustomerModel.id, CustomerModel.first_name, CustomerModel.last_name, CustomerModel.email,
+            PropertyAddressModel.city,
+        ).outerjoin(PropertyAddressModel, PropertyAddressModel.customer_id == CustomerModel.id).yield_per(batch_size)
+        return self.load(rows)
+
+    def load(self, rows):
+        """
+        Replace the index with one built from rows, as done by rebuild().
+
+        Args:
+        - rows (iterable): (customer_id, first_name, last_name, email, city) tuples.
+
+        Returns:
+        - bool: False if another rebuild was already running and nothing was done.
+        """
+        with self._lock:
+            if self._rebuilding is not None:
+                return False
+            self._rebuilding = changes = []
+        try:
+            state = _IndexState()
+            for row in rows:
+                state.add(_document(*row), bulk=True)
+            state = self._compacted(state) if state.tombstones else state
+            state.finish_bulk()
+        except BaseException:
+            with self._lock:
+                self._rebuilding = None
+            raise
+
+        with self._lock:
+            for document in changes:
+                state.add(document)
+            self._state = state
+            self._rebuilding = None
+            self._built_at = self.clock()
+        return True
+
+    def clear(self):
+        """
+        Drop every customer and mark the index as not built.
+        """
+        with self._lock:
+            self._state = _IndexState()
+            self._built_at = None
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """
+        Find customers whose names, email or city match query, best matches first.
+
+        Args:
+        - query (str): Text typed by the user; case and repeated spaces are ignored.
+        - limit (int): Maximum number of results.
+
+        Returns:
+        - list: Dicts with id, first_name, last_name, email and city.
+        """
+        query = _normalize(query)
+        if not query or limit <= 0:
+            return []
+
+        with self._lock:
+            state = self._state
+            documents = state.documents
+            found = []
+            seen = set()
+
+            for term in state.terms_with_prefix(query):
+                postings = state.term_postings[term]
+                for ordinal in (postings,) if type(postings) is int else postings:
+                    if ordinal not in seen and documents[ordinal] is not None:
+                        seen.add(ordinal)
+                        found.append(documents[ordinal])
+                        if len(found) == limit:
+                            return [_as_result(document) for document in found]
+
+            if len(query) >= 3:
+                postings = sorted((state.trigram_postings.get(trigram, EMPTY_POSTINGS) for trigram in trigrams(query)), key=len)
+                for ordinal in _substring_candidates(postings):
+                    document = documents[ordinal]
+                    if document is None or ordinal in seen or query not in document[TEXT]:
+                        continue
+                    seen.add(ordinal)
+                    found.append(document)
+                    if len(found) == limit:
+                        break
+
+            return [_as_result(document) for document in found]
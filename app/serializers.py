@@ -0,0 +1,110 @@
+import functools
+from pydantic import BaseModel
+from app.models.customer import CustomerModel
+from app.schemas.customer import Customer
+from app.schemas.propertyAddress import CustomerResponse
+
+"""
+Defines output serializers for data read from our own database.
+
+Returning ORM objects or pydantic models from an endpoint makes FastAPI validate every
+row against the response_model and walk it again with jsonable_encoder. Rows read from
+our own tables already have the right types, so that work only costs CPU. Validation
+stays on the input side; output goes through a serializer compiled once per schema.
+
+A compiled serializer is a plain function, generated from the schema's fields, that reads
+each field as an attribute (of a SQLAlchemy row, an ORM object or a pydantic model) into
+a dict with the schema's keys in the schema's order, recursing into nested schemas. The
+result encodes to the same JSON as the response_model path.
+
+This module contains:
+- compile_serializer: generate the serializer of a pydantic schema, or of some of its fields
+- parse_fields / serializer_for: the sparse fieldsets of the fields= query parameter
+- serialize_customer / serialize_customer_response: serializers of Customer and CustomerResponse
+- CUSTOMER_COLUMNS / customer_columns: the CustomerModel columns a Customer is serialized from
+"""
+
+
+def _nested(serialize):
+    def serialize_nested(value):
+        # Customers have at most one property address, loaded as a list through the relationship
+        if isinstance(value, list):
+            value = value[0] if value else None
+        return None if value is None else serialize(value)
+    return serialize_nested
+
+
+def compile_serializer(schema, fields: tuple = None):
+    """
+    Generate a function mapping an object with the schema's fields as attributes to a dict.
+
+    Parameters:
+    - schema (type): Pydantic model class. Fields typed with another model (optionally
+      Optional) are serialized with that model's serializer, or None. For those fields a
+      list, as loaded through a one-to-many relationship, stands for its first element.
+    - fields (tuple): Names of the fields to include, all fields when None.
+
+    Returns:
+    - callable: serialize(obj) -> dict. Values are not validated or converted.
+    """
+    namespace = {}
+    entries = []
+    for index, field in enumerate(schema.__fields__.values()):
+        if fields is not None and field.name not in fields:
+            continue
+        if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+            nested = f"_serialize_{index}"
+            namespace[nested] = _nested(compile_serializer(field.type_))
+            entries.append(f"{field.alias!r}: {nested}(obj.{field.name})")
+        else:
+            entries.append(f"{field.alias!r}: obj.{field.name}")
+    source = f"def serialize(obj):\n    return {{{', '.join(entries)}}}\n"
+    exec(compile(source, f"<serializer {schema.__name__}>", "exec"), namespace)
+    serialize = namespace["serialize"]
+    serialize.__doc__ = f"Serialize a trusted {schema.__name__} object to a dict."
+    return serialize
+
+
+def parse_fields(schema, fields: str = None):
+    """
+    Parse the fields= query parameter: comma-separated names of the schema's fields.
+
+    Returns:
+    - tuple: The requested field names in schema order, None when fields is None (all fields).
+
+    Raises:
+    - ValueError: If fields is empty or names a field the schema does not have.
+    """
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",")} - {""}
+    unknown = requested - set(schema.__fields__)
+    if not requested or unknown:
+        raise ValueError(f"fields should be a comma-separated list of {', '.join(schema.__fields__)}")
+    return tuple(name for name in schema.__fields__ if name in requested)
+
+
+@functools.lru_cache(maxsize=256)
+def serializer_for(schema, fields: tuple = None):
+    """
+    Return the serializer of a schema's fields (from parse_fields), compiled on first use.
+    """
+    return compile_serializer(schema, fields)
+
+
+serialize_customer = serializer_for(Customer)
+serialize_customer_response = serializer_for(CustomerResponse)
+
+# Selecting only these columns skips building ORM objects for list responses
+CUSTOMER_COLUMNS = [getattr(CustomerModel, name) for name in Customer.__fields__]
+
+
+def customer_columns(fields: tuple = None, extra: tuple = ()) -> list:
+    """
+    Return the CustomerModel columns to select for the given Customer fields, plus the
+    attributes in extra (e.g. the sort key), without duplicates and in schema order.
+    """
+    if fields is None:
+        return CUSTOMER_COLUMNS
+    wanted = set(fields) | set(extra)
+    return [column for column in CUSTOMER_COLUMNS if column.key in wanted]
@@ -0,0 +1,208 @@
+import bisect
+import hashlib
+import heapq
+import itertools
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
+
+"""
+Defines hash-sharded customer storage on top of SQLAlchemy's horizontal sharding extension.
+
+This module contains:
+- HashRing: consistent hashing of customer ids onto shard ids
+- make_sharded_session_factory: a sessionmaker producing ShardedSessions that
+  - place customers by the hash of CustomerModel.id
+  - co-locate property addresses with their customer (hash of customer_id)
+  - keep the global customer_email lookup table on the directory shard (the first shard)
+  - route queries filtering on a customer id to one shard, and everything else to all shards
+- scatter_gather: runs an ordered query on every shard and merges the results in order
+- iter_scatter_gather: the same, streaming rows from every shard instead of loading them
+"""
+
+# Columns whose equality predicates pin a statement to the shard of the compared customer id
+CUSTOMER_KEY_COLUMNS = {("customer", "id"), ("property_address", "customer_id")}
+DIRECTORY_TABLES = {"customer_email"}
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to shard ids.
+
+    Each shard owns `replicas` virtual points on the ring, so adding a shard only
+    moves roughly 1/N of the keys.
+
+    Parameters:
+    - shard_ids (list): Names of the shards.
+    - replicas (int): Virtual points per shard.
+    """
+
+    def __init__(self, shard_ids, replicas: int = 128):
+        self.shard_ids = list(shard_ids)
+        points = sorted(
+            (self._hash(f"{shard_id}#{index}"), shard_id)
+            for shard_id in self.shard_ids
+            for index in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [shard_id for _, shard_id in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def shard_for(self, key: str) -> str:
+        """
+        Return the shard id owning key.
+        """
+        index = bisect.bisect(self._hashes, self._hash(str(key))) % len(self._hashes)
+        return self._owners[index]
+
+
+def _customer_ids_in(whereclause, parameters=None):
+    """
+    Collect the customer ids a WHERE clause pins the statement to.
+
+    Parameters:
+    - whereclause (ClauseElement): The statement's WHERE clause.
+    - parameters (dict): Values passed at execution for bind parameters without a value, such
+      as the "primary_keys" parameter of relationship selectin loads.
+
+    Returns:
+    - set: The compared customer ids, or None if the clause does not restrict the customer id.
+    """
+    customer_ids = set()
+
+    def visit_binary(binary: BinaryExpression):
+        left, right = binary.left, binary.right
+        if isinstance(right, BindParameter) and not isinstance(left, BindParameter):
+            column, parameter = left, right
+        elif isinstance(left, BindParameter):
+            column, parameter = right, left
+        else:
+            return
+        table = getattr(column, "table", None)
+        if table is None or (table.name, getattr(column, "name", None)) not in CUSTOMER_KEY_COLUMNS:
+            return
+        value = parameter.effective_value
+        if value is None and parameters:
+            value = parameters.get(parameter.key)
+        if binary.operator == operators.eq:
+            customer_ids.add(value)
+        elif binary.operator == operators.in_op:
+            customer_ids.update(value or ())
+
+    if whereclause is not None:
+        visitors.traverse(whereclause, {}, {"binary": visit_binary})
+    return customer_ids or None
+
+
+def make_sharded_session_factory(shards: dict) -> sessionmaker:
+    """
+    Build a sessionmaker producing ShardedSessions over the given shard engines.
+
+    Parameters:
+    - shards (dict): Shard id to Engine. The first shard also holds the customer_email table.
+
+    Returns:
+    - sessionmaker: Factory whose sessions have info["sharded"] set to True.
+    """
+    shard_ids = list(shards)
+    directory_shard = shard_ids[0]
+    ring = HashRing(shard_ids)
+
+    def shard_chooser(mapper, instance, clause=None):
+        table = mapper.local_table.name if mapper is not None else None
+        if instance is None or table in DIRECTORY_TABLES:
+            return directory_shard
+        if table == "customer":
+            return ring.shard_for(instance.id)
+        if table == "property_address":
+            return ring.shard_for(instance.customer_id)
+        return directory_shard
+
+    def id_chooser(query, ident):
+        entity = query.column_descriptions[0]["entity"]
+        table = entity.__table__.name if entity is not None else None
+        if table == "customer":
+            return [ring.shard_for(ident[0])]
+        if table in DIRECTORY_TABLES:
+            return [directory_shard]
+        return shard_ids
+
+    def execute_chooser(orm_context):
+        mappers = orm_context.all_mappers
+        if mappers and all(mapper.local_table.name in DIRECTORY_TABLES for mapper in mappers):
+            return [directory_shard]
+        parameters = orm_context.parameters if isinstance(orm_context.parameters, dict) else None
+        customer_ids = _customer_ids_in(getattr(orm_context.statement, "whereclause", None), parameters)
+        if customer_ids is None:
+            return shard_ids
+        return sorted({ring.shard_for(customer_id) for customer_id in customer_ids})
+
+    session_factory = sessionmaker(
+        class_=ShardedSession,
+        autocommit=False,
+        autoflush=False,
+        shard_chooser=shard_chooser,
+        id_chooser=id_chooser,
+        execute_chooser=execute_chooser,
+        shards=shards,
+        info={"sharded": True, "ring": ring, "directory_shard": directory_shard},
+    )
+    session_factory.kw["info"]["session_factory"] = session_factory
+    return session_factory
+
+
+def is_sharded(db) -> bool:
+    return bool(db.info.get("sharded"))
+
+
+def scatter_gather(db, query, key, limit: int = None, offset: int = 0, reverse: bool = False):
+    """
+    Run an ordered query on every shard and merge the per-shard results in order.
+
+    Parameters:
+    - db (Session): SQLAlchemy database session, sharded or not.
+    - query (Query): Query already ordered by key.
+    - key (callable): Sort key of a result row, matching the query's ORDER BY.
+    - limit (int): Maximum number of rows returned, None for all.
+    - offset (int): Rows of the merged order skipped before the first returned row.
+    - reverse (bool): True if the query is ordered descending.
+
+    Returns:
+    - list: The requested rows in key order.
+
+    Each shard is asked for its first offset + limit rows, since any of them may land in
+    the requested page once merged.
+    """
+    if not is_sharded(db):
+        return query.offset(offset or None).limit(limit).all()
+    ring = db.info["ring"]
+    if limit is not None:
+        query = query.limit(offset + limit)
+    per_shard = [query.set_shard(shard_id).all() for shard_id in ring.shard_ids]
+    merged = heapq.merge(*per_shard, key=key, reverse=reverse)
+    return list(itertools.islice(merged, offset, None if limit is None else offset + limit))
+
+
+def iter_scatter_gather(db, query, key, limit: int = None, offset: int = 0, reverse: bool = False,
+                        batch_size: int = 1000):
+    """
+    Like scatter_gather, but yield the merged rows as they are read.
+
+    Every shard's rows are fetched batch_size at a time (Query.yield_per, a server-side
+    cursor where the driver supports one), so memory does not grow with the result.
+    The cursors stay open until the iterator is exhausted or closed; consume it from a
+    single thread.
+    """
+    if not is_sharded(db):
+        yield from query.offset(offset or None).limit(limit).yield_per(batch_size)
+        return
+    ring = db.info["ring"]
+    if limit is not None:
+        query = query.limit(offset + limit)
+    per_shard = [query.set_shard(shard_id).yield_per(batch_size) for shard_id in ring.shard_ids]
+    merged = heapq.merge(*per_shard, key=key, reverse=reverse)
+    yield from itertools.islice(merged, offset, None if limit is None else offset + limit)
@@ -0,0 +1,80 @@
+import threading
+
+"""
+Coalesces concurrent identical reads into a single in-flight call.
+
+This module contains the SingleFlight group used by the customer routes:
+- The first caller for a key (the leader) runs the loader
+- Concurrent callers for the same key wait for the leader and share its result
+- Exceptions raised by the loader are re-raised to every waiting caller
+"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls that share the same key.
+
+    FastAPI runs the synchronous customer routes in a thread pool, so a burst of
+    requests for the same customer id can reach the database at the same moment.
+    Routing them through do() means only one of them actually queries the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, loader):
+        """
+        Run loader() once for all concurrent callers using the same key.
+
+        Parameters:
+        - key (hashable): Identifies the read, e.g. ("customer", customer_id).
+        - loader (callable): Zero-argument function performing the read.
+
+        Returns:
+        - The value returned by loader(), shared by every caller of the flight.
+
+        Raises:
+        - Whatever exception loader() raised, for the leader and all waiters.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = loader()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        """
+        Return the number of keys currently being loaded.
+        """
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,187 @@
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.models.customer import CustomerModel
+from app.models.customerStateStats import CustomerStateStatsModel
+from app.models.propertyAddress import PropertyAddressModel
+from app.models.types import STATE_CODES, STATE_CODE_VALUES, normalize_state_code
+from app.sharding import is_sharded
+
+"""
+Defines the per-state customer rollup behind GET /stats.
+
+Counting customers and summing usage per state with COUNT(*) ... GROUP BY reads every
+customer. Instead, the customer_state_stats table keeps the totals, and every write that
+creates a customer or changes its state or usage applies the difference to it in the
+same transaction. Reading the stats is then a read of at most one row per state (per shard).
+
+reconcile_customer_state_stats rebuilds the rollup from the base tables. Run it once to
+fill the rollup of an existing database, and periodically to repair drift from writes
+made outside the API:
+    python -m app.stats
+
+This module contains:
+- customer_stats_entry: the rollup row and usage a customer counts towards
+- apply_customer_stats_delta: move a customer between rollup rows within the caller's transaction
+- reconcile_customer_state_stats: rebuild the rollup from the customer and property_address tables
+- read_customer_state_stats: the totals, overall and per state
+"""
+
+NO_STATE = 0
+
+
+def customer_stats_entry(state_code, electricity_usage_kwh) -> tuple:
+    """
+    Return the (rollup key, usage) a customer counts towards: the STATE_CODE_VALUES value
+    of its state code in any letter case, NO_STATE without a known one.
+    """
+    return STATE_CODE_VALUES.get(normalize_state_code(state_code), NO_STATE), electricity_usage_kwh
+
+
+def _bind_arguments(db, customer_id: str) -> dict:
+    # The rollup rows of a customer live on the customer's shard
+    if not is_sharded(db):
+        return {}
+    return {"shard_id": db.info["ring"].shard_for(customer_id)}
+
+
+def apply_customer_stats_delta(db, customer_id: str, before: tuple = None, after: tuple = None):
+    """
+    Update the rollup for a customer written in the current transaction. Nothing is committed.
+
+    Args:
+    - db (Session): SQLAlchemy database session holding the customer write.
+    - customer_id (str): ID of the customer, which places the rollup rows when sharded.
+    - before (tuple): customer_stats_entry() before the write, None for a new customer.
+    - after (tuple): customer_stats_entry() after the write, None for a deleted customer.
+    """
+    deltas = {}
+    for entry, sign in ((before, -1), (after, 1)):
+        if entry is None:
+            continue
+        key, usage = entry
+        customers, customers_with_usage, usage_total = deltas.get(key, (0, 0, 0))
+        deltas[key] = (
+            customers + sign,
+            customers_with_usage + sign * (usage is not None),
+            usage_total + sign * (usage or 0),
+        )
+
+    bind_arguments = _bind_arguments(db, customer_id)
+    dialect_name = db.get_bind(CustomerStateStatsModel, **bind_arguments).dialect.name
+    for key, (customers, customers_with_usage, usage_total) in deltas.items():
+        if customers == customers_with_usage == usage_total == 0:
+            continue
+        db.execute(
+            _upsert_stats(dialect_name, key, customers, customers_with_usage, usage_total),
+            bind_arguments=bind_arguments,
+        )
+
+
+def _upsert_stats(dialect_name: str, key: int, customers: int, customers_with_usage: int, usage_total: int):
+    # One statement inserts the first row of a state or adds to the existing one, so two
+    # transactions writing the first customer of a state cannot both try to insert it
+    values = dict(state_code=key, customers=customers, customers_with_usage=customers_with_usage,
+                  electricity_usage_kwh=usage_total)
+    if dialect_name == "mysql":
+        statement = mysql_insert(CustomerStateStatsModel).values(**values)
+        added = statement.inserted
+        return statement.on_duplicate_key_update(
+            customers=CustomerStateStatsModel.customers + added.customers,
+            customers_with_usage=CustomerStateStatsModel.customers_with_usage + added.customers_with_usage,
+            electricity_usage_kwh=CustomerStateStatsModel.electricity_usage_kwh + added.electricity_usage_kwh,
+        )
+    statement = sqlite_insert(CustomerStateStatsModel).values(**values)
+    added = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=[CustomerStateStatsModel.state_code],
+        set_=dict(
+            customers=CustomerStateStatsModel.customers + added.customers,
+            customers_with_usage=CustomerStateStatsModel.customers_with_usage + added.customers_with_usage,
+            electricity_usage_kwh=CustomerStateStatsModel.electricity_usage_kwh + added.electricity_usage_kwh,
+        ),
+    )
+
+
+def reconcile_customer_state_stats(db):
+    """
+    Rebuild the rollup from the customer and property_address tables, one transaction per shard.
+
+    Args:
+    - db (Session): SQLAlchemy database session on the primary; committed.
+    """
+    # The same key as customer_stats_entry: the known code in any letter case, or NO_STATE
+    state_key = case(STATE_CODE_VALUES, value=func.upper(func.trim(PropertyAddressModel.state_code)), else_=NO_STATE)
+    totals = (
+        select(
+            state_key,
+            func.count(),
+            func.count(CustomerModel.electricity_usage_kwh),
+            func.coalesce(func.sum(CustomerModel.electricity_usage_kwh), 0),
+        )
+        .select_from(CustomerModel)
+        .outerjoin(PropertyAddressModel, PropertyAddressModel.customer_id == CustomerModel.id)
+        .group_by(state_key)
+    )
+    rebuild = insert(CustomerStateStatsModel).from_select(
+        ["state_code", "customers", "customers_with_usage", "electricity_usage_kwh"], totals
+    )
+    shard_ids = db.info["ring"].shard_ids if is_sharded(db) else [None]
+    for shard_id in shard_ids:
+        bind_arguments = {} if shard_id is None else {"shard_id": shard_id}
+        db.execute(delete(CustomerStateStatsModel).execution_options(synchronize_session=False),
+                   bind_arguments=bind_arguments)
+        db.execute(rebuild, bind_arguments=bind_arguments)
+        db.commit()
+
+
+def read_customer_state_stats(db) -> dict:
+    """
+    Read the rollup, summing the rows of every shard when sharded.
+
+    Args:
+    - db (Session): SQLAlchemy database session.
+
+    Returns:
+    - dict: customers, customers_with_usage and electricity_usage_kwh overall, and the same
+      per state under states, ordered by state code with customers without a state last.
+    """
+    totals = {}
+    rows = db.query(
+        CustomerStateStatsModel.state_code, CustomerStateStatsModel.customers,
+        CustomerStateStatsModel.customers_with_usage, CustomerStateStatsModel.electricity_usage_kwh,
+    ).all()
+    for key, customers, customers_with_usage, usage_total in rows:
+        counts = totals.setdefault(key, [0, 0, 0])
+        counts[0] += customers
+        counts[1] += customers_with_usage
+        counts[2] += usage_total
+
+    states = [
+        {
+            "state_code": STATE_CODES[key - 1] if key != NO_STATE else None,
+            "customers": customers,
+            "customers_with_usage": customers_with_usage,
+            "electricity_usage_kwh": usage_total,
+        }
+        for key, (customers, customers_with_usage, usage_total) in totals.items()
+        if customers
+    ]
+    states.sort(key=lambda state: (state["state_code"] is None, state["state_code"] or ""))
+    return {
+        "customers": sum(state["customers"] for state in states),
+        "customers_with_usage": sum(state["customers_with_usage"] for state in states),
+        "electricity_usage_kwh": sum(state["electricity_usage_kwh"] for state in states),
+        "states": states,
+    }
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal, ensure_schema
+
+    ensure_schema(SessionLocal)
+    session = SessionLocal()
+    try:
+        reconcile_customer_state_stats(session)
+    finally:
+        session.close()
@@ -0,0 +1,83 @@
+import queue
+import threading
+from starlette.concurrency import run_in_threadpool
+
+"""
+Defines streaming of response bodies produced by blocking code.
+
+Starlette iterates a synchronous body iterator in the threadpool, one item per worker call,
+so consecutive items may be produced on different threads. Database cursors must stay on
+the thread that opened them (SQLite connections refuse to be shared), so streamed query
+results are produced on a thread of their own and handed over through a bounded queue,
+which also stops the producer from running ahead of a slow client.
+
+This module contains:
+- iterate_in_thread: run a blocking iterator on a dedicated thread as an async iterator
+"""
+
+STREAM_MAX_PENDING_CHUNKS = 8
+# How often a producer blocked on a full queue checks whether the client went away
+STREAM_STOP_POLL_SECONDS = 0.1
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def iterate_in_thread(produce, max_pending: int = STREAM_MAX_PENDING_CHUNKS, name: str = "stream"):
+    """
+    Iterate produce() on a new thread, yielding its items as they are produced.
+
+    Args:
+    - produce (callable): Returns the blocking iterator; called on the producer thread.
+    - max_pending (int): Items buffered ahead of the consumer.
+    - name (str): Name of the producer thread.
+
+    Yields:
+    - The items of produce(). An exception raised by the producer is raised here.
+
+    Closing the async iterator early (e.g. when the client disconnects) stops the producer
+    at its next item, which closes its iterator.
+    """
+    pending = queue.Queue(maxsize=max_pending)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                pending.put(item, timeout=STREAM_STOP_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run():
+        try:
+            iterator = iter(produce())
+            try:
+                for item in iterator:
+                    if not put(item):
+                        return
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+        except BaseException as error:
+            put(_Failure(error))
+            return
+        put(_DONE)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    try:
+        while True:
+            item = await run_in_threadpool(pending.get)
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stopped.set()
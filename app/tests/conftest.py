@@ -0,0 +1,14 @@
+import os
+import tempfile
+
+"""
+Defines settings shared by every test module.
+
+The test database lives in a fresh temporary directory per test run, so runs never see
+each other's rows and never write to the working tree. TEST_DATABASE_URL set in the
+environment still takes precedence.
+"""
+
+os.environ.setdefault(
+    "TEST_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='energysage-tests-'), 'test.db')}"
+)
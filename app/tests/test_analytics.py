@@ -0,0 +1,223 @@
+"""
+Defines test cases for the usage analytics snapshot and endpoint.
+
+This module contains test cases for:
+- Grouping usage by state, old roof and postal prefix, with and without NumPy
+- Building a snapshot from the database
+- Serving /analytics/usage from the snapshot without querying the database per request
+- Building the first snapshot in the first request, once, and logging failed refreshes
+- Keeping more unknown state codes than fit in a byte, and surviving any first snapshot failure
+"""
+
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from app import analytics
+from app.analytics import UsageSnapshot, UsageAnalytics, build_usage_snapshot, nearest_rank
+from app.database import Base
+from app.models.customer import CustomerModel
+from app.models.propertyAddress import PropertyAddressModel
+from app.routers import analytics as analytics_router
+from app.routers.analytics import read_usage_analytics
+
+
+@pytest.fixture(params=["arrays", "numpy"])
+def snapshot(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(analytics, "np", None)
+    snapshot = UsageSnapshot(taken_at=1000.0)
+    for usage, old_roof, state_code, postal_code in [
+        (100, True, "MA", "02139"),
+        (300, False, "MA", "02118"),
+        (200, True, "MA", "01002"),
+        (50, None, "NY", "10001"),
+        (None, True, "NY", "10002"),
+        (70, False, None, None),
+    ]:
+        snapshot.append(usage, old_roof, state_code, postal_code)
+    return snapshot
+
+
+def test_nearest_rank():
+    assert nearest_rank([1, 2, 3, 4], 50) == 2
+    assert nearest_rank([1, 2, 3, 4], 99) == 4
+    assert nearest_rank([7], 1) == 7
+
+
+def test_group_by_state(snapshot):
+    assert snapshot.group_by("state_code", percentiles=(50, 100)) == [
+        {"key": "MA", "count": 3, "sum": 600, "mean": 200.0, "p50": 200, "p100": 300},
+        {"key": "NY", "count": 1, "sum": 50, "mean": 50.0, "p50": 50, "p100": 50},
+        {"key": None, "count": 1, "sum": 70, "mean": 70.0, "p50": 70, "p100": 70},
+    ]
+
+
+def test_group_by_old_roof(snapshot):
+    groups = snapshot.group_by("old_roof", percentiles=(50,))
+    assert [(group["key"], group["count"], group["sum"], group["p50"]) for group in groups] == [
+        (False, 2, 370, 70), (True, 2, 300, 100), (None, 1, 50, 50),
+    ]
+
+
+def test_group_by_postal_prefix(snapshot):
+    groups = snapshot.group_by("postal_prefix", prefix_digits=3)
+    assert [(group["key"], group["count"], group["sum"]) for group in groups] == [
+        ("010", 1, 200), ("021", 2, 400), ("100", 1, 50), (None, 1, 70),
+    ]
+    assert [group["key"] for group in snapshot.group_by("postal_prefix", prefix_digits=1)] == ["0", "1", None]
+
+
+def test_group_by_rejects_invalid_arguments(snapshot):
+    with pytest.raises(ValueError):
+        snapshot.group_by("city")
+    with pytest.raises(ValueError):
+        snapshot.group_by("postal_prefix", prefix_digits=6)
+    assert UsageSnapshot().group_by("state_code") == []
+
+
+def test_group_by_state_with_many_unknown_codes(snapshot):
+    # Unknown codes are kept verbatim, more of them than fit in a byte
+    for index in range(300):
+        snapshot.append(index, False, f"X{index}", None)
+    groups = snapshot.group_by("state_code")
+    assert len(groups) == 2 + 300 + 1
+    assert {"key": "X299", "count": 1, "sum": 299, "mean": 299.0, "p50": 299, "p90": 299, "p99": 299} in groups
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'analytics.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    for usage, state_code, postal_code in [(100, "MA", "02139"), (300, "MA", "02118"), (50, "NY", "10001")]:
+        customer_id = str(uuid.uuid4())
+        db.add(CustomerModel(id=customer_id, first_name="A", last_name="B", email=f"{customer_id}@example.com",
+                             electricity_usage_kwh=usage, old_roof=False))
+        db.add(PropertyAddressModel(id=str(uuid.uuid4()), customer_id=customer_id, state_code=state_code,
+                                    postal_code=postal_code))
+    db.add(CustomerModel(id=str(uuid.uuid4()), first_name="No", last_name="Address", email="none@example.com",
+                         electricity_usage_kwh=20))
+    db.commit()
+    db.close()
+    return factory
+
+
+def test_build_usage_snapshot(session_factory):
+    db = session_factory()
+    snapshot = build_usage_snapshot(db, batch_size=2)
+    db.close()
+    assert len(snapshot) == 4
+    assert [(group["key"], group["sum"]) for group in snapshot.group_by("state_code")] == [
+        ("MA", 400), ("NY", 50), (None, 20),
+    ]
+
+
+class ImmediateExecutor:
+    def submit(self, function, *args):
+        function(*args)
+
+
+def test_usage_endpoint_is_served_from_the_snapshot(session_factory, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(analytics_router, "usage_analytics", UsageAnalytics(clock=lambda: now[0]))
+    monkeypatch.setattr(analytics_router, "refresh_executor", ImmediateExecutor())
+    db = session_factory()
+
+    # The first request builds the snapshot itself instead of answering 503
+    result = read_usage_analytics(group_by="state_code", db=db)
+    assert result["customers"] == 4
+    assert [group["key"] for group in result["groups"]] == ["MA", "NY", None]
+
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    result = read_usage_analytics(group_by="postal_prefix", percentiles="50", prefix_digits=2, db=db)
+    assert [group["key"] for group in result["groups"]] == ["02", "10", None]
+    assert statements == []
+
+    # Once stale, the snapshot is refreshed in the background; the executor here runs it inline
+    now[0] += analytics_router.ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS
+    read_usage_analytics(db=db)
+    assert statements
+    assert analytics_router.usage_analytics.age() == 0
+    db.close()
+
+
+def test_first_snapshot_is_built_once(session_factory, monkeypatch):
+    usage_analytics = UsageAnalytics()
+    builds = []
+    monkeypatch.setattr(analytics, "build_usage_snapshot", lambda db: builds.append(db) or UsageSnapshot())
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        snapshots = list(executor.map(usage_analytics.first_snapshot, range(8)))
+    assert len(builds) == 1
+    assert all(snapshot is snapshots[0] for snapshot in snapshots)
+
+
+def test_usage_endpoint_without_snapshot_or_with_bad_input(monkeypatch):
+    usage_analytics = UsageAnalytics()
+    monkeypatch.setattr(analytics_router, "usage_analytics", usage_analytics)
+    submitted = []
+    monkeypatch.setattr(analytics_router, "refresh_executor", type("Executor", (), {"submit": lambda self, *args: submitted.append(args)})())
+    monkeypatch.setattr(analytics_router, "session_factory_for", lambda db: None)
+
+    def unavailable(db):
+        raise OperationalError("SELECT", {}, Exception("database is down"))
+
+    # The first snapshot cannot be built while the database is down
+    monkeypatch.setattr(analytics, "build_usage_snapshot", unavailable)
+    with pytest.raises(HTTPException) as error:
+        read_usage_analytics(db=None)
+    assert error.value.status_code == 503
+    assert usage_analytics.snapshot is None
+    assert submitted == []
+
+    with pytest.raises(HTTPException) as error:
+        read_usage_analytics(percentiles="50,abc", db=None)
+    assert error.value.status_code == 400
+    usage_analytics.snapshot = UsageSnapshot()
+    with pytest.raises(HTTPException) as error:
+        read_usage_analytics(group_by="city", db=None)
+    assert error.value.status_code == 400
+
+
+def test_first_snapshot_failures_are_logged_and_retried(session_factory, monkeypatch, caplog):
+    usage_analytics = UsageAnalytics()
+    monkeypatch.setattr(analytics_router, "usage_analytics", usage_analytics)
+
+    def broken(db):
+        raise RuntimeError("unexpected row")
+
+    monkeypatch.setattr(analytics, "build_usage_snapshot", broken)
+    with pytest.raises(HTTPException) as error:
+        read_usage_analytics(db=None)
+    assert error.value.status_code == 503
+    assert "unexpected row" in caplog.text
+
+    # The next request builds the first snapshot once the failure is gone
+    monkeypatch.setattr(analytics, "build_usage_snapshot", build_usage_snapshot)
+    db = session_factory()
+    assert read_usage_analytics(db=db)["customers"] == 4
+    db.close()
+
+
+def test_refresh_failures_are_logged_and_release_the_claim(monkeypatch, caplog):
+    usage_analytics = UsageAnalytics()
+    monkeypatch.setattr(analytics_router, "usage_analytics", usage_analytics)
+
+    def broken(db):
+        raise RuntimeError("unexpected row")
+
+    monkeypatch.setattr(analytics, "build_usage_snapshot", broken)
+    session = type("Session", (), {"close": lambda self: None})
+    assert usage_analytics.begin_refresh()
+    analytics_router.refresh_usage_snapshot(session)
+    assert "Usage analytics refresh failed" in caplog.text
+    assert "unexpected row" in caplog.text
+    # The next stale request can claim a refresh again
+    assert usage_analytics.begin_refresh()
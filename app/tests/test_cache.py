@@ -0,0 +1,99 @@
+"""
+Defines test cases for the customer cache and the circuit breaker.
+
+This module contains test cases for:
+- Fresh, stale and expired cache entries
+- LRU eviction and refresh bookkeeping
+- Circuit breaker state transitions and metrics
+"""
+
+import pytest
+from app.cache import StaleWhileRevalidateCache, FRESH, STALE
+from app.circuitbreaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from app.metrics import metrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_entry_goes_stale_then_expires():
+    clock = FakeClock()
+    cache = StaleWhileRevalidateCache(soft_ttl=10, hard_ttl=60, clock=clock)
+    cache.set("a", 1)
+
+    assert cache.get("a") == (1, FRESH, False)
+    clock.now = 10
+    assert cache.get("a") == (1, STALE, False)
+    clock.now = 60
+    assert cache.get("a") == (None, None, False)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = StaleWhileRevalidateCache(soft_ttl=10, hard_ttl=60, max_entries=2, clock=FakeClock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") == (None, None, False)
+    assert cache.get("a")[0] == 1
+    assert cache.get("c")[0] == 3
+
+
+def test_cache_refresh_claim_and_failure():
+    cache = StaleWhileRevalidateCache(soft_ttl=10, hard_ttl=60, clock=FakeClock())
+    cache.set("a", 1)
+
+    assert cache.begin_refresh("a") is True
+    assert cache.begin_refresh("a") is False
+    cache.end_refresh("a", succeeded=False)
+
+    assert cache.get("a") == (1, FRESH, True)
+    assert cache.begin_refresh("a") is True
+
+
+def test_cache_rejects_hard_ttl_below_soft_ttl():
+    with pytest.raises(ValueError):
+        StaleWhileRevalidateCache(soft_ttl=10, hard_ttl=5)
+
+
+def failing():
+    raise RuntimeError("boom")
+
+
+def test_circuit_breaker_opens_and_recovers():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30, failure_exceptions=(RuntimeError,), clock=clock)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            breaker.call(failing)
+
+    assert breaker.state == OPEN
+    assert metrics.gauge("circuit_breaker_state", breaker="test") == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+
+    clock.now = 30
+    assert breaker.state == HALF_OPEN
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+    assert metrics.gauge("circuit_breaker_state", breaker="test") == 0
+
+
+def test_circuit_breaker_reopens_when_trial_fails():
+    clock = FakeClock()
+    breaker = CircuitBreaker("trial", failure_threshold=1, reset_timeout=30, failure_exceptions=(RuntimeError,), clock=clock)
+
+    with pytest.raises(RuntimeError):
+        breaker.call(failing)
+    clock.now = 30
+    with pytest.raises(RuntimeError):
+        breaker.call(failing)
+
+    assert breaker.state == OPEN
@@ -0,0 +1,150 @@
+"""
+Defines test cases for response compression.
+
+This module contains test cases for:
+- Parsing Accept-Encoding, including q values
+- Compressing complete responses above the size threshold only
+- Compressing streamed responses chunk by chunk, each chunk flushed to the client as it is sent
+- Buffering the start of a stream to apply the size threshold, leaving short streams uncompressed
+- Passing through responses that are already encoded
+"""
+
+import asyncio
+import gzip
+import zlib
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+from app.compression import CompressionMiddleware, gzip_compressor
+from app.negotiation import accepts_encoding
+
+LARGE = b'{"customers":[' + b",".join(b'{"id":"%d","city":"Boston"}' % index for index in range(200)) + b"]}"
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    (None, False),
+    ("gzip", True),
+    ("gzip, deflate, br", True),
+    ("deflate", False),
+    ("*", True),
+    ("gzip;q=0, *", False),
+    ("*;q=0, GZIP;q=0.5", True),
+    ("identity", False),
+])
+def test_accepts_encoding(accept_encoding, expected):
+    assert accepts_encoding(accept_encoding, "gzip") is expected
+
+
+def make_client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    streamed = []
+
+    @app.get("/small")
+    def small():
+        return Response(b'{"id":"1"}', media_type="application/json")
+
+    @app.get("/large")
+    def large():
+        return Response(LARGE, media_type="application/json")
+
+    @app.get("/stream")
+    def stream():
+        def chunks():
+            for index in range(5):
+                streamed.append(index)
+                yield LARGE
+        return StreamingResponse(chunks(), media_type="application/xml")
+
+    @app.get("/precompressed")
+    def precompressed():
+        compressor = gzip_compressor()
+        return Response(compressor.compress(LARGE) + compressor.flush(), media_type="application/json",
+                        headers={"Content-Encoding": "gzip"})
+
+    return TestClient(app), streamed
+
+
+def test_compresses_large_responses_only():
+    client, _ = make_client()
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"}, stream=True)
+    raw = response.raw.read(decode_content=False)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(raw) < len(LARGE)
+    assert gzip.decompress(raw) == LARGE
+
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == b'{"id":"1"}'
+
+    response = client.get("/large", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in response.headers
+    assert response.content == LARGE
+
+
+def test_compresses_streams_incrementally():
+    client, streamed = make_client()
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"}, stream=True)
+    raw = response.raw.read(decode_content=False)
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw) == LARGE * 5
+    assert streamed == list(range(5))
+
+
+def test_passes_through_encoded_responses():
+    client, _ = make_client()
+    response = client.get("/precompressed", headers={"Accept-Encoding": "gzip"}, stream=True)
+    raw = response.raw.read(decode_content=False)
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw) == LARGE
+
+
+def run_stream(chunks, minimum_size=1024):
+    # Drives the middleware directly, recording every message it sends
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/xml")]})
+        for index, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=minimum_size)(scope, None, send))
+    return Headers(raw=sent[0]["headers"]), [message["body"] for message in sent[1:]]
+
+
+def test_flushes_every_streamed_chunk():
+    chunks = [b"<customer>%d</customer>" % index * 100 for index in range(5)]
+    headers, bodies = run_stream(chunks)
+    assert headers["content-encoding"] == "gzip"
+    assert len(bodies) == len(chunks)
+    # Each compressed chunk decompresses on arrival to the chunk it was made from
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk, body in zip(chunks, bodies):
+        assert decompressor.decompress(body) == chunk
+    assert decompressor.eof
+
+
+def test_buffers_the_start_of_a_stream_until_minimum_size():
+    chunks = [b"x" * 300] * 6
+    headers, bodies = run_stream(chunks)
+    assert headers["content-encoding"] == "gzip"
+    # The first four chunks reach 1024 bytes and are sent together
+    assert len(bodies) == 3
+    assert gzip.decompress(b"".join(bodies)) == b"".join(chunks)
+
+
+def test_leaves_short_streams_uncompressed():
+    chunks = [b'{"id":"1"}', b'{"id":"2"}', b""]
+    headers, bodies = run_stream(chunks)
+    assert "content-encoding" not in headers
+    assert headers["vary"] == "Accept-Encoding"
+    assert bodies == [b'{"id":"1"}{"id":"2"}']
@@ -3,16 +3,25 @@ Defines test cases for the Customer API endpoints.
 
 This module contains test cases for the Customer API endpoints:
 - Creating a customer
-- Reading a customer
+- Reading a customer by ID or by email, with every spelling of an ID sharing one cache entry
+- Listing customers with filters, sorting and pagination
+- Limiting reads to the requested fields, in the response and in SQL
+- Embedding property addresses in customer lists with one batched query
+- Searching customers by name, email or city
 - Updating a customer
 It includes fixture setups for database sessions and test customers, along with various test cases.
 """
 
+import time
 import uuid
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
 import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
 from app.database import get_test_db
-from app.routers.customer import create_customer, read_customer, patch_customer
+from app.fastjson import loads
+from app.metrics import metrics
+from app.routers.customer import create_customer, read_customer, read_customer_by_email, read_customers, search_customers, patch_customer, customer_cache, customer_search, database_breaker, STALE_WARNING, REVALIDATION_FAILED_WARNING
 from app.models.customer import CustomerModel
 from app.models.propertyAddress import PropertyAddressModel
 from app.schemas.propertyAddress import CustomerResponse
@@ -27,6 +36,17 @@ def setup_db():
     db.close()  # Close the database session after all tests in the file complete
 
 
+@pytest.fixture(autouse=True)
+def reset_customer_cache():
+    customer_cache.clear()
+    customer_search.clear()
+    database_breaker.reset()
+    yield
+    customer_cache.clear()
+    customer_search.clear()
+    database_breaker.reset()
+
+
 @pytest.fixture(scope="function")
 def setup_customer(setup_db):
     # Set up a test customer for the entire test file
@@ -66,7 +86,7 @@ def setup_customer(setup_db):
         'property_address': {'street': '112 test road', 'city': 'TestCity', 'state_code': 'AA', 'postal_code': '123456'}}, HTTPException(status_code=400, detail="Invalid Postal Code. It should be a 5-digit number")),
     # Test case: Property address provided
     ({'first_name': 'test', 'last_name': 'customer', 'email': 'omgitworks@xyz.com', "electricity_usage_kwh": 12, "old_roof": True,
-        'property_address': {'street': '112 test road', 'city': 'TestCity', 'state_code': 'AA', 'postal_code': '12345'}}, None)
+        'property_address': {'street': '112 test road', 'city': 'Schenectady', 'state_code': 'NY', 'postal_code': '12345'}}, None)
 ])
 def test_create_customer(setup_db, setup_customer, test_input, expected):
     db = setup_db # Access the database session from the setup_db fixture
@@ -82,6 +102,35 @@ def test_create_customer(setup_db, setup_customer, test_input, expected):
             assert e.value.detail == expected.detail
 
 
+@pytest.mark.parametrize("test_input, expected", [
+    # Test case: Email differing only in case
+    ({'first_name': 'test', 'last_name':'customer', 'email': 'Test@Example.com'}, HTTPException(status_code=409, detail="Email already taken")),
+    # Test case: Property address provided with a state code longer than the column
+    ({'first_name': 'test', 'last_name': 'customer', 'email': 'state@xyz.com',
+        'property_address': {'street': '112 test road', 'city': 'TestCity', 'state_code': 'TOOLONG', 'postal_code': '12345'}}, HTTPException(status_code=400, detail="Invalid State Code. It should be at most 5 characters.")),
+])
+def test_create_customer_rejects_invalid_payloads(setup_db, setup_customer, test_input, expected):
+    with pytest.raises(HTTPException) as e:
+        create_customer(test_input, setup_db)
+    assert e.value.status_code == expected.status_code
+    assert e.value.detail == expected.detail
+
+
+def test_state_codes_are_stored_upper_cased(setup_db):
+    created = {
+        state_code: create_customer({'first_name': 'state', 'last_name': state_code, 'email': f'state{index}@state.com',
+                                     'property_address': {'city': 'TestCity', 'state_code': state_code}}, setup_db)
+        for index, state_code in enumerate(('ma', 'MA', 'xx'))
+    }
+    for state_code, customer in created.items():
+        assert loads(read_customer(customer.id, setup_db).body)['property_address']['state_code'] == state_code.upper()
+
+    # Filters match state codes in any letter case
+    found = loads(read_customers(setup_db, state_code='Ma').body)
+    assert sorted(customer['last_name'] for customer in found) == ['MA', 'ma']
+    assert [customer['last_name'] for customer in loads(read_customers(setup_db, state_code='XX').body)] == ['xx']
+
+
 def test_read_customer(setup_db):
     customer_id = str(uuid.uuid4())
     customer_db = CustomerModel(id=customer_id, first_name='name', last_name='lastname', email='first@last.com')
@@ -89,11 +138,100 @@ def test_read_customer(setup_db):
     setup_db.commit()
 
     # Call the function with the test database and customer ID
-    customer = read_customer(customer_id, setup_db)
-    assert customer.id == customer_id
-    assert customer.first_name == 'name'
-    assert customer.last_name == 'lastname'
-    assert customer.email == 'first@last.com'
+    customer = loads(read_customer(customer_id, setup_db).body)
+    assert customer == {'id': customer_id, 'first_name': 'name', 'last_name': 'lastname', 'email': 'first@last.com',
+                        'electricity_usage_kwh': None, 'old_roof': None, 'property_address': None}
+
+@pytest.mark.parametrize("spell", [str.upper, lambda customer_id: customer_id.replace("-", ""),
+                                   lambda customer_id: "{" + customer_id + "}", lambda customer_id: "urn:uuid:" + customer_id])
+def test_read_customer_by_any_id_spelling_after_patch(setup_db, setup_customer, spell):
+    customer_id = setup_customer.id
+    assert loads(read_customer(spell(customer_id), setup_db).body)['first_name'] == setup_customer.first_name
+
+    patch_customer(spell(customer_id), {'first_name': 'patched'}, setup_db)
+    # The patch refreshed the one entry every spelling reads
+    assert loads(read_customer(spell(customer_id), setup_db).body)['first_name'] == 'patched'
+    assert loads(read_customer(customer_id.upper(), setup_db).body)['id'] == customer_id
+
+
+def test_read_customer_by_email(setup_db):
+    customer = create_customer({'first_name': 'name', 'last_name': 'lastname', 'email': 'Mixed.Case@Last.com'}, setup_db)
+    assert setup_db.query(CustomerModel).filter(CustomerModel.id == customer.id).one().email_normalized == 'mixed.case@last.com'
+
+    found = loads(read_customer_by_email('mixed.case@LAST.com', setup_db).body)
+    assert found['id'] == customer.id
+    assert found['email'] == 'Mixed.Case@Last.com'
+
+    with pytest.raises(HTTPException) as e:
+        read_customer_by_email('nobody@last.com', setup_db)
+    assert e.value.status_code == 404
+
+
+def test_patch_customer_writes_normalized_email(setup_db, setup_customer):
+    patched = patch_customer(setup_customer.id, {'email': 'TEST@example.com', 'email_normalized': 'ignored'}, setup_db)
+    assert patched.email == 'TEST@example.com'
+    assert loads(read_customer_by_email('test@EXAMPLE.com', setup_db).body)['id'] == setup_customer.id
+
+    patch_customer(setup_customer.id, {'email': 'Renamed@example.com'}, setup_db)
+    assert setup_db.query(CustomerModel).filter(CustomerModel.id == setup_customer.id).one().email_normalized == 'renamed@example.com'
+    with pytest.raises(HTTPException):
+        read_customer_by_email('test@example.com', setup_db)
+
+
+def age_cache_entries(monkeypatch, seconds):
+    now = time.monotonic() + seconds
+    monkeypatch.setattr(customer_cache, "clock", lambda: now)
+
+
+def test_read_customer_serves_stale_and_refreshes(setup_db, monkeypatch):
+    customer_id = str(uuid.uuid4())
+    setup_db.add(CustomerModel(id=customer_id, first_name='name', last_name='lastname', email='stale@last.com'))
+    setup_db.commit()
+    read_customer(customer_id, setup_db)
+
+    # Change the row behind the cache's back, then let the entry go stale
+    setup_db.query(CustomerModel).filter(CustomerModel.id == customer_id).update({"first_name": "renamed"})
+    setup_db.commit()
+    age_cache_entries(monkeypatch, customer_cache.soft_ttl + 1)
+
+    response = Response()
+    served = read_customer(customer_id, setup_db, response)
+    assert loads(served.body)['first_name'] == 'name'
+    assert served.headers["Warning"] == STALE_WARNING
+
+    deadline = time.monotonic() + 5
+    while customer_cache.get(customer_id)[0].first_name != 'renamed' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert loads(read_customer(customer_id, setup_db).body)['first_name'] == 'renamed'
+
+
+def test_read_customer_serves_stale_when_breaker_open(setup_db, monkeypatch):
+    customer_id = str(uuid.uuid4())
+    setup_db.add(CustomerModel(id=customer_id, first_name='name', last_name='lastname', email='breaker@last.com'))
+    setup_db.commit()
+    read_customer(customer_id, setup_db)
+
+    def database_down():
+        raise OperationalError("SELECT 1", {}, Exception("database down"))
+
+    for _ in range(database_breaker.failure_threshold):
+        with pytest.raises(OperationalError):
+            database_breaker.call(database_down)
+
+    age_cache_entries(monkeypatch, customer_cache.soft_ttl + 1)
+    served_before = metrics.counter("customer_cache_stale_served", reason="error")
+
+    response = Response()
+    served = read_customer(customer_id, setup_db, response)
+    assert loads(served.body)['id'] == customer_id
+    assert served.headers["Warning"] == REVALIDATION_FAILED_WARNING
+    assert metrics.counter("customer_cache_stale_served", reason="error") == served_before + 1
+
+    # Without a cached copy the open breaker turns into a 503
+    with pytest.raises(HTTPException) as e:
+        read_customer(str(uuid.uuid4()), setup_db)
+    assert e.value.status_code == 503
+
 
 def test_read_customer_not_found(setup_db, setup_customer):
     # Call the function with the test database and a non-existent customer ID
@@ -118,7 +256,7 @@ def test_read_customer_not_found(setup_db, setup_customer):
         # Test case: Customer updated successfully
         (str(uuid.uuid4()), 'new.mail@check.com', {'first_name': 'new_name'}, 'first_name'),
         # Test case: Property Address updated successfully
-        (str(uuid.uuid4()), 'new.mail@check.com', { "property_address": { "street": "110 Beacon St", "city": "Boston", "postal_code": "12345", "state_code": "MA" } }, 'new_property_address'),
+        (str(uuid.uuid4()), 'new.mail@check.com', { "property_address": { "street": "110 Beacon St", "city": "Boston", "postal_code": "02116", "state_code": "MA" } }, 'new_property_address'),
         # Test case: Partial Property Address updated successfully
         (str(uuid.uuid4()), 'new.mail@check.com', { "property_address": { "state_code": "PA" } }, 'update_property_address')
     ]
@@ -142,7 +280,7 @@ def test_patch_customer(customer_id, customer_email, updated_customer, expected,
 
         assert property_address.street == "110 Beacon St"
         assert property_address.city == "Boston"
-        assert property_address.postal_code == "12345"
+        assert property_address.postal_code == "02116"
         assert property_address.state_code == "MA"
  
     elif expected == 'update_property_address':
@@ -173,4 +311,163 @@ def test_patch_customer_not_found(setup_db):
 
     # Assert that the function raised the correct exception
     assert e.value.status_code == 404
-    assert e.value.detail == "Customer not found"
\ No newline at end of file
+    assert e.value.detail == "Customer not found"
+
+@pytest.fixture(scope="function")
+def listed_customers(setup_db):
+    db = setup_db
+    payloads = [
+        ('Smith', 'ann@list.com', 9000, False, 'MA', '02110'),
+        ('Smythe', 'bob@list.com', 7000, False, 'MA', '02139'),
+        ('Jones', 'cat@list.com', 12000, False, 'MA', '01002'),
+        ('Smalls', 'dan@list.com', 8500, True, 'MA', '02110'),
+        ('Brown', 'eve@list.com', 9500, False, 'PA', '19104'),
+    ]
+    created = []
+    for last_name, email, usage, old_roof, state_code, postal_code in payloads:
+        created.append(create_customer({
+            'first_name': 'list', 'last_name': last_name, 'email': email,
+            'electricity_usage_kwh': usage, 'old_roof': old_roof,
+            'property_address': {'street': '1 Main St', 'state_code': state_code, 'postal_code': postal_code},
+        }, db))
+    yield created
+    db.query(PropertyAddressModel).delete()
+    db.commit()
+
+
+@pytest.mark.parametrize("filters,expected_last_names", [
+    ({'state_code': 'ma', 'old_roof': False, 'min_usage': 8000, 'sort': 'last_name'}, ['Jones', 'Smith']),
+    ({'state_code': 'MA', 'postal_prefix': '0211', 'sort': 'last_name'}, ['Smalls', 'Smith']),
+    ({'postal_prefix': '021', 'sort': '-electricity_usage_kwh'}, ['Smith', 'Smalls', 'Smythe']),
+    ({'last_name_prefix': 'Sm', 'sort': 'last_name'}, ['Smalls', 'Smith', 'Smythe']),
+    ({'email_prefix': 'eve'}, ['Brown']),
+    ({'min_usage': 9000, 'max_usage': 9500, 'sort': 'electricity_usage_kwh'}, ['Smith', 'Brown']),
+])
+def test_read_customers_filters(setup_db, listed_customers, filters, expected_last_names):
+    customers = loads(read_customers(setup_db, **filters).body)
+    assert [customer['last_name'] for customer in customers] == expected_last_names
+
+
+def test_read_customers_paginates_in_sort_order(setup_db, listed_customers):
+    all_customers = loads(read_customers(setup_db, sort='-electricity_usage_kwh').body)
+    pages = [loads(read_customers(setup_db, sort='-electricity_usage_kwh', limit=2, offset=offset).body) for offset in (0, 2, 4)]
+
+    assert [customer['electricity_usage_kwh'] for customer in all_customers] == [12000, 9500, 9000, 8500, 7000]
+    assert [customer['id'] for page in pages for customer in page] == [customer['id'] for customer in all_customers]
+    assert [len(page) for page in pages] == [2, 2, 1]
+
+
+@pytest.mark.parametrize("filters,detail", [
+    ({'old_roof': False, 'last_name_prefix': 'Sm'}, "Unsupported filter combination"),
+    ({'sort': 'first_name'}, "Unsupported sort key"),
+    ({'state_code': 'TOOLONG'}, "state_code should be 1 to 5 characters"),
+    ({'postal_prefix': '02a'}, "postal_prefix should be 1 to 5 digits"),
+    ({'last_name_prefix': ''}, "last_name_prefix should not be empty"),
+    ({'email_prefix': ''}, "email_prefix should not be empty"),
+    ({'limit': 0}, "limit should be between 1 and"),
+    ({'offset': -1}, "offset should not be negative"),
+])
+def test_read_customers_rejects_unsupported_queries(setup_db, filters, detail):
+    with pytest.raises(HTTPException) as e:
+        read_customers(setup_db, **filters)
+    assert e.value.status_code == 400
+    assert e.value.detail.startswith(detail)
+
+
+@pytest.fixture()
+def statements(setup_db):
+    captured = []
+
+    def capture(*args):
+        captured.append(args[2])
+
+    event.listen(setup_db.get_bind(), "before_cursor_execute", capture)
+    yield captured
+    event.remove(setup_db.get_bind(), "before_cursor_execute", capture)
+
+
+def test_read_customer_fields_narrow_the_select(setup_db, statements):
+    customer = create_customer({'first_name': 'sparse', 'last_name': 'fields', 'email': 'sparse@fields.com',
+                                'property_address': {'city': 'Boston', 'state_code': 'MA'}}, setup_db)
+    customer_cache.clear()
+    statements.clear()
+
+    served = loads(read_customer(customer.id, setup_db, fields='email,id').body)
+    assert served == {'id': customer.id, 'email': 'sparse@fields.com'}
+    # One SELECT of the two columns, and no property_address query
+    assert len(statements) == 1
+    assert 'first_name' not in statements[0] and 'property_address' not in statements[0]
+
+    served = loads(read_customer(customer.id, setup_db, fields='property_address').body)
+    assert served == {'property_address': {'street': None, 'city': 'Boston', 'postal_code': None, 'state_code': 'MA'}}
+    # Partial reads are not cached; a full read fills the cache and later partial reads use it
+    assert customer_cache.get(customer.id)[0] is None
+    read_customer(customer.id, setup_db)
+    statements.clear()
+    assert loads(read_customer(customer.id, setup_db, fields='last_name').body) == {'last_name': 'fields'}
+    assert statements == []
+
+    with pytest.raises(HTTPException) as e:
+        read_customer(customer.id, setup_db, fields='id,password')
+    assert e.value.status_code == 400
+
+
+def test_read_customers_fields_narrow_the_select(setup_db, listed_customers, statements):
+    customers = loads(read_customers(setup_db, sort='-electricity_usage_kwh', fields='email', limit=2).body)
+    assert customers == [{'email': 'cat@list.com'}, {'email': 'eve@list.com'}]
+    # The sort key is selected for merging shards, but not returned
+    selected = statements[-1].split('FROM')[0]
+    assert 'email' in selected and 'electricity_usage_kwh' in selected and 'first_name' not in selected
+
+    with pytest.raises(HTTPException) as e:
+        read_customers(setup_db, fields='')
+    assert e.value.status_code == 400
+
+
+def test_read_customers_include_property_address(setup_db, listed_customers, statements):
+    statement_counts = []
+    for limit in (1, 5):
+        statements.clear()
+        customers = loads(read_customers(setup_db, sort='last_name', limit=limit, include='property_address').body)
+        statement_counts.append(len(statements))
+        assert len(customers) == limit
+
+    # One query for the page and one IN query for its addresses, whatever the page size
+    assert statement_counts == [2, 2]
+    assert customers[0] == {
+        'id': listed_customers[4].id, 'first_name': 'list', 'last_name': 'Brown', 'email': 'eve@list.com',
+        'electricity_usage_kwh': 9500, 'old_roof': False,
+        'property_address': {'street': '1 Main St', 'city': 'Philadelphia', 'postal_code': '19104', 'state_code': 'PA'},
+    }
+    assert [customer['property_address']['postal_code'] for customer in customers] == ['19104', '01002', '02110', '02110', '02139']
+
+    statements.clear()
+    customers = loads(read_customers(setup_db, sort='last_name', include='property_address', fields='email').body)
+    assert customers[0] == {'email': 'eve@list.com'}
+    assert len(statements) == 1
+
+    with pytest.raises(HTTPException) as e:
+        read_customers(setup_db, include='orders')
+    assert e.value.status_code == 400
+
+
+def test_search_customers_builds_index_and_indexes_writes(setup_db):
+    setup_db.add(CustomerModel(id=str(uuid.uuid4()), first_name='Stored', last_name='Before', email='stored@search.com'))
+    setup_db.commit()
+
+    assert [result['first_name'] for result in search_customers('stor', setup_db)] == ['Stored']
+    assert customer_search.is_built
+
+    created = create_customer({'first_name': 'Searchable', 'last_name': 'Person', 'email': 'findme@search.com',
+                               'property_address': {'street': '1 Main St', 'city': 'Springfield', 'state_code': 'MA', 'postal_code': '01101'}}, setup_db)
+    assert [result['id'] for result in search_customers('springf', setup_db)] == [created.id]
+
+    patch_customer(created.id, {'last_name': 'Renamed'}, setup_db)
+    assert [result['id'] for result in search_customers('renamed', setup_db)] == [created.id]
+    assert search_customers('person', setup_db) == []
+
+
+def test_search_customers_rejects_bad_limit(setup_db):
+    with pytest.raises(HTTPException) as e:
+        search_customers('anything', setup_db, limit=0)
+    assert e.value.status_code == 400
@@ -0,0 +1,75 @@
+"""
+Defines test cases for the lazy database session dependency.
+
+This module contains test cases for:
+- Sessions that are never opened when a request is answered from the cache
+- Sessions that are never opened when request validation fails
+- Pool checkout counts reported per endpoint
+"""
+
+import uuid
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+from app.database import LazySession, TEST_DATABASE_URL, get_db, get_test_db
+from app.fastjson import loads
+from app.metrics import metrics
+from app.models.customer import CustomerModel
+from app.routers.customer import create_customer, read_customer, customer_cache
+
+
+@pytest.fixture(scope="module")
+def session_factory():
+    get_test_db().close()  # make sure the tables exist
+    return sessionmaker(autocommit=False, autoflush=False, bind=create_engine(TEST_DATABASE_URL))
+
+
+@pytest.fixture()
+def customer_id(session_factory):
+    customer_cache.clear()
+    db = session_factory()
+    customer_id = str(uuid.uuid4())
+    db.add(CustomerModel(id=customer_id, first_name='lazy', last_name='session', email=f'{customer_id}@lazy.com'))
+    db.commit()
+    yield customer_id
+    db.query(CustomerModel).filter(CustomerModel.id == customer_id).delete()
+    db.commit()
+    db.close()
+    customer_cache.clear()
+
+
+def test_warm_cache_read_never_checks_out_a_connection(session_factory, customer_id):
+    cold = LazySession(session_factory, endpoint="read_customer")
+    read_customer(customer_id, cold)
+    cold.close()
+
+    checkouts = metrics.counter("db_pool_checkouts", endpoint="read_customer")
+    assert checkouts > 0
+
+    warm = LazySession(session_factory, endpoint="read_customer")
+    customer = loads(read_customer(customer_id, warm).body)
+
+    assert customer['id'] == customer_id
+    assert warm.opened is False
+    assert metrics.counter("db_pool_checkouts", endpoint="read_customer") == checkouts
+
+
+def test_validation_failure_never_opens_a_session(session_factory):
+    db = LazySession(session_factory, endpoint="create_customer")
+    with pytest.raises(HTTPException):
+        create_customer({'first_name': 'test', 'last_name': 'customer', 'email': 'lazy@xyz.com', 'old_roof': 'yes'}, db)
+
+    assert db.opened is False
+
+
+def test_get_db_labels_sessions_with_the_endpoint():
+    request = Request({"type": "http", "endpoint": read_customer})
+    dependency = get_db(request)
+    db = next(dependency)
+
+    assert isinstance(db, LazySession)
+    assert db.endpoint == "read_customer"
+    assert db.opened is False
+    dependency.close()
@@ -0,0 +1,66 @@
+"""
+Defines test cases for fast JSON encoding and decoding.
+
+This module contains test cases for:
+- dumps producing the same bytes as Starlette's JSONResponse, with and without orjson
+- FastJSONRoute parsing request bodies and rejecting invalid JSON
+- The customer router using the fast route and response classes
+"""
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from app import fastjson
+from app.fastjson import FastJSONResponse, FastJSONRoute, dumps, loads
+from app.routers.customer import router as customer_router
+
+CONTENT = [
+    {"id": "0190a1b2-c3d4-7e5f-8a9b-0c1d2e3f4a5b", "first_name": "Zoë", "last_name": "O'Brien",
+     "email": "zoe@example.com", "electricity_usage_kwh": 1200, "old_roof": False, "ratio": 0.25,
+     "property_address": {"street": "1 \"Main\" St\n", "city": "Boston", "state_code": "MA", "postal_code": None}},
+    {"id": "2", "tags": [], "nested": {"empty": {}}},
+]
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(fastjson, "orjson", None)
+    return request.param
+
+
+def test_dumps_matches_json_response(encoder):
+    assert dumps(CONTENT) == JSONResponse(CONTENT).body
+    assert FastJSONResponse(CONTENT).body == JSONResponse(CONTENT).body
+    assert loads(dumps(CONTENT)) == CONTENT
+    assert loads('{"a": [1, 2.5, null]}') == {"a": [1, 2.5, None]}
+
+
+def make_client():
+    router = APIRouter(route_class=FastJSONRoute, default_response_class=FastJSONResponse)
+
+    @router.post("/echo")
+    def echo(payload: dict):
+        return payload
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_route_parses_bodies_and_rejects_invalid_json(encoder):
+    client = make_client()
+    response = client.post("/echo", data='{"name": "Zoë", "usage": 12}', headers={"content-type": "application/json"})
+    assert response.status_code == 200
+    assert response.content == '{"name":"Zoë","usage":12}'.encode("utf-8")
+
+    response = client.post("/echo", data='{"name": ', headers={"content-type": "application/json"})
+    assert response.status_code == 422
+
+
+def test_customer_router_uses_fast_json():
+    assert all(isinstance(route, FastJSONRoute) for route in customer_router.routes)
+    assert all(getattr(route.response_class, "value", route.response_class) is FastJSONResponse for route in customer_router.routes)
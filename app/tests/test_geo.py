@@ -0,0 +1,177 @@
+"""
+Defines test cases for the postal code proximity index.
+
+This module contains test cases for:
+- Reading the GeoNames postal code format, and writing it from the zipcodes package dataset
+- Loading the bundled US postal code file
+- Radius queries on the PostalCodeGrid, compared against a brute-force scan
+- GET /customers/near resolving a radius to customers through their postal codes
+"""
+
+import bz2
+import json
+import os
+import random
+import pytest
+from fastapi import HTTPException
+from app import geo
+from app.database import get_test_db
+from app.fastjson import loads
+from app.geo import PostalCodeGrid, haversine_km, read_geonames_postal_codes, write_geonames_postal_codes
+from app.models.customer import CustomerModel
+from app.models.propertyAddress import PropertyAddressModel
+from app.routers.customer import create_customer, read_customers_near, customer_cache
+
+GEONAMES_ROWS = [
+    ("02110", "Boston", "Massachusetts", "MA", 42.3570, -71.0530),
+    ("02139", "Cambridge", "Massachusetts", "MA", 42.3647, -71.1042),
+    ("01608", "Worcester", "Massachusetts", "MA", 42.2626, -71.8023),
+    ("10001", "New York", "New York", "NY", 40.7506, -73.9972),
+]
+
+
+@pytest.fixture()
+def geonames_file(tmp_path):
+    path = tmp_path / "US.txt"
+    lines = [
+        "\t".join(["US", code, place, state_name, state_code, "County", "001", "", "", str(latitude), str(longitude), "4"])
+        for code, place, state_name, state_code, latitude, longitude in GEONAMES_ROWS
+    ]
+    # Rows without coordinates or with non-ZIP codes are skipped
+    lines.append("\t".join(["US", "0211", "Bad", "Massachusetts", "MA", "", "", "", "", "42.0", "-71.0", ""]))
+    lines.append("\t".join(["US", "02111", "Boston", "Massachusetts", "MA", "", "", "", "", "", "", ""]))
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture()
+def grid(geonames_file):
+    return PostalCodeGrid((code, latitude, longitude) for code, _, _, latitude, longitude in read_geonames_postal_codes(geonames_file))
+
+
+def test_read_geonames_postal_codes(geonames_file):
+    rows = list(read_geonames_postal_codes(geonames_file))
+    assert rows[0] == ("02110", "Boston", "MA", 42.357, -71.053)
+    assert [row[0] for row in rows] == ["02110", "02139", "01608", "10001"]
+
+
+def test_write_geonames_postal_codes(tmp_path):
+    source = tmp_path / "zips.json.bz2"
+    source.write_bytes(bz2.compress(json.dumps([
+        {"zip_code": "02139", "active": True, "city": "Cambridge", "acceptable_cities": ["Cambridgeport"],
+         "state": "MA", "lat": "42.3644", "long": "-71.1012"},
+        {"zip_code": "02110", "active": True, "city": "Boston", "acceptable_cities": [],
+         "state": "MA", "lat": "42.3582", "long": "-71.0541"},
+        {"zip_code": "02112", "active": False, "city": "Boston", "acceptable_cities": [],
+         "state": "MA", "lat": "42.3389", "long": "-70.9196"},
+    ]).encode("utf-8")))
+    path = str(tmp_path / "US.txt.gz")
+    assert write_geonames_postal_codes(str(source), path) == 2
+    assert list(read_geonames_postal_codes(path)) == [
+        ("02110", "Boston", "MA", 42.3582, -71.0541),
+        ("02139", "Cambridge", "MA", 42.3644, -71.1012),
+        ("02139", "Cambridgeport", "MA", 42.3644, -71.1012),
+    ]
+    # Written without a timestamp, so rebuilding gives the same bytes
+    first = open(path, "rb").read()
+    write_geonames_postal_codes(str(source), path)
+    assert open(path, "rb").read() == first
+
+
+def test_bundled_postal_codes():
+    # The file shipped in app/data, loaded the way postal_code_grid does
+    path = os.path.join(os.path.dirname(geo.__file__), "data", "US.txt.gz")
+    grid = PostalCodeGrid((code, latitude, longitude) for code, _, _, latitude, longitude in read_geonames_postal_codes(path))
+    assert len(grid) > 40000
+    assert grid.location("02110") == (42.3582, -71.0541)
+    nearby = [code for _, code in grid.near("02110", 5)]
+    assert nearby[0] == "02110"
+    assert "02139" in nearby
+    assert "10001" not in nearby
+
+
+def test_haversine_km():
+    assert haversine_km(42.357, -71.053, 42.357, -71.053) == 0
+    assert 300 < haversine_km(42.3570, -71.0530, 40.7506, -73.9972) < 310
+
+
+def test_grid_near(grid):
+    assert grid.location("02139") == (42.3647, -71.1042)
+    assert grid.location("99999") is None
+    assert grid.near("99999", 10) is None
+    assert [code for _, code in grid.near("02110", 10)] == ["02110", "02139"]
+    assert [code for _, code in grid.near("02110", 70)] == ["02110", "02139", "01608"]
+    assert len(grid.near("02110", 400)) == 4
+
+
+def test_grid_keeps_first_point_of_a_postal_code():
+    grid = PostalCodeGrid([("02139", 42.3644, -71.1012), ("02139", 10.0, 10.0), ("02110", 42.3582, -71.0541)])
+    assert len(grid) == 2
+    assert grid.location("02139") == (42.3644, -71.1012)
+    assert [code for _, code in grid.near("02139", 10)] == ["02139", "02110"]
+
+
+def test_grid_matches_brute_force_across_cells():
+    rng = random.Random(3)
+    points = [(f"{index:05d}", rng.uniform(40, 43), rng.uniform(-74, -70)) for index in range(2000)]
+    grid = PostalCodeGrid(points, cell_degrees=0.1)
+    for _ in range(20):
+        latitude, longitude, radius_km = rng.uniform(40, 43), rng.uniform(-74, -70), rng.uniform(1, 60)
+        expected = sorted(
+            (haversine_km(latitude, longitude, point_latitude, point_longitude), code)
+            for code, point_latitude, point_longitude in points
+            if haversine_km(latitude, longitude, point_latitude, point_longitude) <= radius_km
+        )
+        assert grid.within(latitude, longitude, radius_km) == expected
+
+
+@pytest.fixture()
+def setup_db():
+    customer_cache.clear()
+    db = get_test_db()
+    yield db
+    db.query(PropertyAddressModel).delete()
+    db.query(CustomerModel).delete()
+    db.commit()
+    db.close()
+    customer_cache.clear()
+
+
+def test_read_customers_near(setup_db, geonames_file, monkeypatch):
+    # The grid is loaded from the dataset file on first use
+    monkeypatch.setattr(geo, "_grid", None)
+    monkeypatch.setattr(geo, "POSTAL_CENTROIDS_PATH", geonames_file)
+    created = {}
+    for index, (code, place, _, state_code, _, _) in enumerate(GEONAMES_ROWS):
+        created[code] = create_customer({
+            'first_name': 'near', 'last_name': place, 'email': f'near{index}@example.com',
+            'property_address': {'street': '1 Main St', 'city': place, 'state_code': state_code, 'postal_code': code},
+        }, setup_db)
+
+    ids = [customer['id'] for customer in loads(read_customers_near('02110', 10, setup_db).body)]
+    assert sorted(ids) == sorted([created['02110'].id, created['02139'].id])
+    assert ids == sorted(ids)
+    assert len(loads(read_customers_near('02110', 70, setup_db, limit=2).body)) == 2
+    assert len(loads(read_customers_near('02110', 70, setup_db, limit=2, offset=2).body)) == 1
+    assert len(geo.postal_code_grid()) == 4
+
+
+@pytest.mark.parametrize("postal_code,radius_km,status_code", [
+    ("0211", 10, 400),
+    ("02110", 0, 400),
+    ("02110", 1000, 400),
+    ("99999", 10, 404),
+])
+def test_read_customers_near_rejects_bad_input(setup_db, grid, monkeypatch, postal_code, radius_km, status_code):
+    monkeypatch.setattr(geo, "_grid", grid)
+    with pytest.raises(HTTPException) as e:
+        read_customers_near(postal_code, radius_km, setup_db)
+    assert e.value.status_code == status_code
+
+
+def test_read_customers_near_without_dataset(setup_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(geo, "_grid", None)
+    monkeypatch.setattr(geo, "POSTAL_CENTROIDS_PATH", str(tmp_path / "missing.txt"))
+    with pytest.raises(HTTPException) as e:
+        read_customers_near("02110", 10, setup_db)
+    assert e.value.status_code == 503
@@ -0,0 +1,151 @@
+"""
+Defines test cases for hedged replica reads.
+
+This module contains test cases for:
+- Hedge delays derived from per-replica latency histograms
+- Replica selection preferring the faster replica
+- A slow first attempt being hedged on a second replica
+- Failing over when the first attempt errors
+- Failed and abandoned attempts feeding the latency histograms
+"""
+
+import threading
+import time
+import uuid
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, LazySession, ReplicaSet
+from app.fastjson import loads
+from app.hedging import HedgedReader
+from app.metrics import metrics
+from app.models.customer import CustomerModel
+from app.routers.customer import read_customer, customer_cache
+
+
+@pytest.fixture()
+def replica_set(tmp_path):
+    metrics.reset()
+    engines = [create_engine(f"sqlite:///{tmp_path / f'replica{index}.db'}") for index in range(2)]
+    for bind in engines:
+        Base.metadata.create_all(bind=bind)
+    return ReplicaSet(engines)
+
+
+def seed_latencies(replica_set, *seconds):
+    for index, value in enumerate(seconds):
+        for _ in range(50):
+            replica_set.latencies[index].observe(value)
+
+
+def replica_index(replica_set, session):
+    return replica_set.engines.index(session.get_bind())
+
+
+def test_hedge_delay_follows_the_latency_percentile(replica_set):
+    reader = HedgedReader(replica_set, percentile=95, default_delay=0.05, min_delay=0.002, min_samples=20)
+    assert reader.hedge_delay(0) == 0.05
+
+    for value in range(1, 101):
+        replica_set.latencies[0].observe(value / 1000)
+    assert reader.hedge_delay(0) == pytest.approx(0.095)
+
+
+def test_choose_index_prefers_the_faster_replica(replica_set):
+    seed_latencies(replica_set, 0.050, 0.001)
+    assert {replica_set.choose_index() for _ in range(10)} == {1}
+    assert replica_set.choose_index(exclude={1}) == 0
+    assert replica_set.choose_index(exclude={0, 1}) is None
+
+
+def test_slow_replica_is_hedged(replica_set):
+    seed_latencies(replica_set, 0.001, 0.002)
+    reader = HedgedReader(replica_set, min_delay=0.001)
+
+    def read(session):
+        index = replica_index(replica_set, session)
+        if index == 0:
+            time.sleep(0.5)
+        return index
+
+    started = time.perf_counter()
+    assert reader.read(read) == 1
+    assert time.perf_counter() - started < 0.4
+    assert metrics.counter("hedged_reads_issued") == 1
+    assert metrics.counter("hedged_reads_won", replica=1) == 1
+
+
+def test_fast_replica_is_not_hedged(replica_set):
+    seed_latencies(replica_set, 0.001, 0.002)
+    reader = HedgedReader(replica_set, default_delay=1, min_samples=1000)
+
+    assert reader.read(lambda session: replica_index(replica_set, session)) == 0
+    assert metrics.counter("hedged_reads_issued") == 0
+
+
+def test_failed_attempt_fails_over(replica_set):
+    seed_latencies(replica_set, 0.001, 0.002)
+    reader = HedgedReader(replica_set, default_delay=1, min_samples=1000)
+
+    def read(session):
+        index = replica_index(replica_set, session)
+        if index == 0:
+            raise RuntimeError("replica down")
+        return index
+
+    assert reader.read(read) == 1
+
+
+def test_failing_replica_stops_being_chosen(replica_set):
+    seed_latencies(replica_set, 0.001, 0.002)
+    reader = HedgedReader(replica_set, default_delay=1, min_samples=1000, failure_penalty=0.5)
+
+    def read(session):
+        index = replica_index(replica_set, session)
+        if index == 0:
+            raise RuntimeError("replica down")
+        return index
+
+    for _ in range(120):
+        assert reader.read(read) == 1
+    # Failures count as the penalty even though they were fast
+    assert replica_set.latencies[0].percentile(100) == 0.5
+    assert {replica_set.choose_index() for _ in range(10)} == {1}
+
+
+def test_abandoned_attempt_is_recorded_once(replica_set):
+    seed_latencies(replica_set, 0.001, 0.002)
+    reader = HedgedReader(replica_set, min_delay=0.02, min_samples=1000, default_delay=0.02)
+    release = threading.Event()
+
+    def read(session):
+        index = replica_index(replica_set, session)
+        if index == 0:
+            release.wait(5)
+        return index
+
+    assert reader.read(read) == 1
+    # The hung attempt already counts with the time it had taken
+    assert len(replica_set.latencies[0]) == 51
+    assert replica_set.latencies[0].percentile(100) >= 0.02
+    release.set()
+    time.sleep(0.05)
+    assert len(replica_set.latencies[0]) == 51
+
+
+def test_read_customer_uses_the_hedged_reader(replica_set):
+    customer_id = str(uuid.uuid4())
+    for bind in replica_set.engines:
+        db = sessionmaker(bind=bind)()
+        db.add(CustomerModel(id=customer_id, first_name='hedged', last_name='read', email=f'{customer_id}@hedge.com'))
+        db.commit()
+        db.close()
+
+    customer_cache.clear()
+    db = LazySession(replica_set.choose(), endpoint="read_customer", create_schema=False, role="replica")
+    db.hedged_reader = HedgedReader(replica_set)
+
+    assert loads(read_customer(customer_id, db).body)['first_name'] == 'hedged'
+    assert db.opened is False
+    assert sum(len(latencies) for latencies in replica_set.latencies) == 1
+    customer_cache.clear()
@@ -2,17 +2,20 @@
 Defines test cases for database operations and helper functions.
 
 This module contains test cases for various helper functions and database operations:
-- Validating email addresses
+- Validating email addresses, in linear time and as the original pattern did
 - Validating postal codes
 - Checking email uniqueness
 - Creating property address records
 It includes fixtures for setting up a database session and a test customer, along with parametrized tests for validation and checking email uniqueness.
 """
 
+import random
+import re
+import time
 import uuid
 import pytest
 from app.database import get_test_db
-from app.helpers import validate_email, validate_postal_code, check_if_email_unique, create_property_address_record
+from app.helpers import validate_email, validate_emails, validate_postal_code, prefix_range, check_if_email_unique, create_property_address_record
 from app.models.customer import CustomerModel
 
 
@@ -49,11 +52,54 @@ def setup_customer(setup_db):
 @pytest.mark.parametrize("test_input,expected", [
     ("test@example.com", True),
     ("invalid_email", False),
+    ("first.last@example.co.uk", True),
+    ("a..b@x-y.org", True),
+    ("aB_9.cd@x.co", True),
+    ("a@b@example.com", True),
+    ("a.b.c@x.co", False),
+    (".ab@x.co", False),
+    ("ab.@x.co", False),
+    ("a@x.co", False),
+    ("ab@x.c", False),
+    ("ab@x.c|m", True),
+    ("ab@.com", False),
+    ("ab@x.com\n", False),
+    ("zoë@x.co", False),
 ])
 def test_validate_email(test_input, expected):
     assert validate_email(test_input) == expected
 
 
+# The pattern validate_email used to match with, which backtracks on long local parts
+ORIGINAL_EMAIL_PATTERN = re.compile(r'^[A-Za-z0-9]+[.-_]*[A-Za-z0-9]+@[A-Za-z0-9-]+(\.[A-Z|a-z]{2,})+$')
+
+
+def test_validate_email_matches_the_original_pattern():
+    rng = random.Random(49)
+    outcomes = set()
+    for _ in range(20000):
+        local = "".join(rng.choice("aZ9.-_@|!/[\\^:é \nbC0") for _ in range(rng.randint(0, 10)))
+        domain = "".join(rng.choice("ab-9.|Z@") for _ in range(rng.randint(0, 8)))
+        email = f"{local}@{domain}" if rng.random() < 0.8 else local
+        expected = ORIGINAL_EMAIL_PATTERN.fullmatch(email) is not None
+        assert validate_email(email) == expected, email
+        outcomes.add(expected)
+    assert outcomes == {True, False}
+
+
+def test_validate_email_is_linear_on_adversarial_input():
+    started = time.perf_counter()
+    assert validate_email("1" * 100000 + "!") is False
+    assert validate_email("a" * 100000 + "@" + "b" * 100000) is False
+    assert validate_email("a" + "." * 100000 + "a@x.co") is True
+    assert time.perf_counter() - started < 1
+
+
+def test_validate_emails():
+    assert validate_emails(["test@example.com", "invalid_email"]) == [True, False]
+    assert validate_emails(iter([])) == []
+
+
 @pytest.mark.parametrize("test_input,expected", [
     ("12345", True),
     ("1234", False),
@@ -64,8 +110,14 @@ def test_validate_postal_code(test_input, expected):
     assert validate_postal_code(test_input) == expected
 
 
+def test_prefix_range():
+    assert prefix_range("021") == ("021", "022")
+    assert prefix_range("9") == ("9", ":")
+
+
 @pytest.mark.parametrize("test_input,expected", [
     ("test@example.com", False),
+    ("Test@Example.com", False),
     ("unique@xyz.com", True),
 ])
 def test_check_if_email_unique(setup_db, setup_customer, test_input, expected):
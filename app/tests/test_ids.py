@@ -0,0 +1,48 @@
+"""
+Defines test cases for ID generation.
+
+This module contains test cases for:
+- Version 7 IDs being valid UUID strings carrying the current time
+- Version 7 IDs increasing strictly, also within one millisecond and when the clock steps back
+- Selecting the generator through ID_GENERATOR
+"""
+
+import time
+import uuid
+import pytest
+from app import ids
+from app.ids import UUIDv7Generator, new_id
+
+
+def test_uuid7_format_and_timestamp():
+    before_ms = time.time_ns() // 1000000
+    value = UUIDv7Generator()()
+    parsed = uuid.UUID(value)
+
+    assert str(parsed) == value
+    assert parsed.version == 7
+    assert parsed.variant == uuid.RFC_4122
+    assert before_ms <= parsed.int >> 80 <= time.time_ns() // 1000000
+
+
+def test_uuid7_is_monotonic_within_a_millisecond():
+    generator = UUIDv7Generator(clock=lambda: 1700000000000 * 1000000)
+    values = [generator() for _ in range(10000)]
+
+    assert values == sorted(values)
+    assert len(set(values)) == len(values)
+    assert [uuid.UUID(value).bytes for value in values] == sorted(uuid.UUID(value).bytes for value in values)
+
+
+def test_uuid7_is_monotonic_when_the_clock_steps_back():
+    now = [1700000000000 * 1000000]
+    generator = UUIDv7Generator(clock=lambda: now[0])
+    first = generator()
+    now[0] -= 5000 * 1000000
+    assert generator() > first
+
+
+@pytest.mark.parametrize("generator_name, version", [("uuid4", 4), ("uuid7", 7)])
+def test_new_id_uses_the_selected_generator(monkeypatch, generator_name, version):
+    monkeypatch.setattr(ids, "ID_GENERATOR", generator_name)
+    assert uuid.UUID(new_id()).version == version
@@ -0,0 +1,163 @@
+"""
+Defines test cases for the data migrations.
+
+This module contains test cases for:
+- Converting UUID text keys written by the old String(255) schema to 16-byte binary keys
+- Adding the geography indexes, upper-casing state codes and reporting postal codes that do not fit
+- Leaving SQLite customer columns alone, as SQLite already compares by code point
+- Creating model indexes missing from existing tables
+- Adding and backfilling the normalized email column
+"""
+
+import uuid
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.helpers import get_customer_and_property_address
+from app.migrations import create_missing_indexes, migrate_customer_sort_collation, migrate_email_normalized, migrate_ids_to_binary, migrate_property_address_geo_columns
+from app.models.propertyAddress import PropertyAddressModel
+
+
+def test_migrate_ids_to_binary(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(bind=engine)
+
+    customer_ids = [str(uuid.uuid4()) for _ in range(5)]
+    with engine.begin() as connection:
+        for customer_id in customer_ids:
+            connection.execute(
+                text("INSERT INTO customer (id, first_name, last_name, email) VALUES (:id, 'legacy', 'row', :email)"),
+                {"id": customer_id, "email": f"{customer_id}@legacy.com"},
+            )
+            connection.execute(
+                text("INSERT INTO property_address (id, customer_id, city) VALUES (:id, :customer_id, 'Boston')"),
+                {"id": str(uuid.uuid4()), "customer_id": customer_id},
+            )
+
+    migrate_ids_to_binary(engine, chunk_size=2)
+    migrate_ids_to_binary(engine, chunk_size=2)  # re-running is a no-op
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT DISTINCT typeof(id) FROM customer")).scalars().all() == ["blob"]
+        assert connection.execute(text("SELECT DISTINCT length(customer_id) FROM property_address")).scalars().all() == [16]
+
+    db = sessionmaker(bind=engine)()
+    for customer_id in customer_ids:
+        customer = get_customer_and_property_address(customer_id, db)
+        assert customer.id == customer_id
+        assert customer.property_address.city == 'Boston'
+    db.close()
+
+
+def test_migrate_property_address_geo_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy_geo.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE property_address (id BLOB PRIMARY KEY, customer_id BLOB, street VARCHAR(255), "
+            "city VARCHAR(255), postal_code VARCHAR(255), state_code VARCHAR(5))"
+        ))
+        for state_code in ['MA', 'ma', ' Ny', 'xx', None]:
+            connection.execute(
+                text("INSERT INTO property_address (id, postal_code, state_code) VALUES (:id, '02110', :state_code)"),
+                {"id": uuid.uuid4().bytes, "state_code": state_code},
+            )
+
+    # A chunk size smaller than the table upper-cases it over several statements
+    assert migrate_property_address_geo_columns(engine, chunk_size=1) == 0
+    assert migrate_property_address_geo_columns(engine, chunk_size=1) == 0  # re-running is a no-op
+
+    # State codes are stored upper-cased, as the model writes them
+    db = sessionmaker(bind=engine)()
+    state_codes = sorted(row.state_code or '' for row in db.query(PropertyAddressModel).all())
+    assert state_codes == ['', 'MA', 'MA', 'NY', 'XX']
+    db.close()
+
+    with engine.connect() as connection:
+        indexes = connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars().all()
+    assert {"ix_property_address_state_postal", "ix_property_address_postal_code"} <= set(indexes)
+
+
+def test_migrate_property_address_geo_columns_reports_long_postal_codes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy_long.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE property_address (id BLOB PRIMARY KEY, postal_code VARCHAR(255), state_code VARCHAR(5))"
+        ))
+        for postal_code in ['02110', '02110-1234', '123456']:
+            connection.execute(text("INSERT INTO property_address (id, postal_code) VALUES (:id, :postal_code)"),
+                               {"id": uuid.uuid4().bytes, "postal_code": postal_code})
+
+    assert migrate_property_address_geo_columns(engine) == 2
+    with engine.connect() as connection:
+        assert sorted(connection.execute(text("SELECT postal_code FROM property_address")).scalars()) == [
+            '02110', '02110-1234', '123456',
+        ]
+        indexes = connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars().all()
+    assert "ix_property_address_state_postal" in indexes
+
+
+def test_migrate_customer_sort_collation_leaves_sqlite_alone(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'collation.db'}")
+    migrate_customer_sort_collation(engine)  # no customer table yet
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as connection:
+        schema = connection.execute(text("SELECT sql FROM sqlite_master WHERE name = 'customer'")).scalar()
+
+    migrate_customer_sort_collation(engine)
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT sql FROM sqlite_master WHERE name = 'customer'")).scalar() == schema
+
+
+def test_create_missing_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy_indexes.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_customer_old_roof_usage"))
+        connection.execute(text("DROP INDEX ix_property_address_customer_id"))
+
+    create_missing_indexes(engine)
+    create_missing_indexes(engine)  # re-running is a no-op
+
+    with engine.connect() as connection:
+        indexes = connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars().all()
+    assert {"ix_customer_old_roof_usage", "ix_property_address_customer_id", "ix_customer_last_name"} <= set(indexes)
+
+
+def create_legacy_customer_table(engine, emails):
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE customer (id BLOB PRIMARY KEY, first_name VARCHAR(255), last_name VARCHAR(255), "
+            "email VARCHAR(255) UNIQUE, electricity_usage_kwh INTEGER, old_roof BOOLEAN)"
+        ))
+        connection.execute(text("CREATE TABLE customer_email (email VARCHAR(255) PRIMARY KEY, customer_id BLOB)"))
+        for email in emails:
+            customer_id = uuid.uuid4().bytes
+            connection.execute(
+                text("INSERT INTO customer (id, first_name, last_name, email) VALUES (:id, 'legacy', 'row', :email)"),
+                {"id": customer_id, "email": email},
+            )
+            connection.execute(text("INSERT INTO customer_email VALUES (:email, :id)"), {"id": customer_id, "email": email})
+
+
+def test_migrate_email_normalized(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy_email.db'}")
+    create_legacy_customer_table(engine, ["Ann@Example.com", "bob@example.com", "CAT@EXAMPLE.COM"])
+
+    migrate_email_normalized(engine, chunk_size=2)
+    migrate_email_normalized(engine, chunk_size=2)  # re-running is a no-op
+
+    with engine.connect() as connection:
+        normalized = connection.execute(text("SELECT email_normalized FROM customer ORDER BY email_normalized")).scalars().all()
+        directory = connection.execute(text("SELECT email FROM customer_email ORDER BY email")).scalars().all()
+        indexes = connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars().all()
+    assert normalized == directory == ["ann@example.com", "bob@example.com", "cat@example.com"]
+    assert "ix_customer_email_normalized" in indexes
+
+
+def test_migrate_email_normalized_rejects_case_duplicates(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy_email_duplicates.db'}")
+    create_legacy_customer_table(engine, ["ann@example.com", "Ann@Example.com"])
+
+    with pytest.raises(ValueError):
+        migrate_email_normalized(engine)
@@ -0,0 +1,151 @@
+"""
+Defines test cases for the protobuf representation of customers.
+
+This module contains test cases for:
+- Encoding and decoding Customer and CustomerList messages
+- Choosing a representation from the Accept header
+- FastJSONRoute decoding protobuf request bodies through body_decoders
+- The customer endpoints negotiating protobuf responses
+"""
+
+import uuid
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+from app.database import get_test_db
+from app.fastjson import FastJSONResponse, FastJSONRoute, loads
+from app.models.customer import CustomerModel
+from app.negotiation import choose_media_type, media_type
+from app.protobuf import PROTOBUF_MEDIA_TYPE, ProtobufResponse, decode_customer, decode_customers, encode_customer, encode_customers
+from app.routers.customer import CustomerRoute, customer_cache, patch_customer, read_customer, read_customers
+
+CUSTOMER = {
+    "id": "0190a1b2-c3d4-7e5f-8a9b-0c1d2e3f4a5b", "first_name": "Zoë", "last_name": "O'Brien",
+    "email": "zoe@example.com", "electricity_usage_kwh": 0, "old_roof": False,
+    "property_address": {"street": "1 Main St", "city": "Boston", "state_code": "MA", "postal_code": None},
+}
+
+
+def test_customer_round_trip_leaves_none_unset():
+    decoded = decode_customer(encode_customer(CUSTOMER))
+    # Zero and False are set, None is not
+    assert decoded == dict(CUSTOMER, property_address={"street": "1 Main St", "city": "Boston", "state_code": "MA"})
+    assert decode_customer(encode_customer({"email": "a@b.co", "property_address": None})) == {"email": "a@b.co"}
+    assert decode_customer(b"") == {}
+
+
+def test_customer_list_round_trip():
+    contents = [{"id": "1", "first_name": "A"}, {"id": "2", "electricity_usage_kwh": 2 ** 40}]
+    assert decode_customers(encode_customers(contents)) == contents
+    assert decode_customers(encode_customers([])) == []
+
+
+def test_decode_rejects_invalid_messages():
+    with pytest.raises(ValueError):
+        decode_customer(b"\xff\xff\xff")
+    with pytest.raises(ValueError):
+        decode_customers(b"\x0a\x05ab")
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, "application/json"),
+    ("*/*", "application/json"),
+    ("application/x-protobuf", PROTOBUF_MEDIA_TYPE),
+    ("application/json;q=0.5, application/x-protobuf", PROTOBUF_MEDIA_TYPE),
+    ("application/*, application/x-protobuf;q=0.1", "application/json"),
+    ("application/x-protobuf;q=0, */*", "application/json"),
+    ("text/html", "application/json"),
+    ("text/html,application/xhtml+xml,application/x-protobuf;q=0.9,*/*;q=0.8", "application/json"),
+    ("application/x-protobuf, */*;q=0.1", PROTOBUF_MEDIA_TYPE),
+    ("text/html, application/x-protobuf;q=0.5", PROTOBUF_MEDIA_TYPE),
+    ("application/json;q=0", None),
+    ("text/html, */*;q=0", None),
+])
+def test_choose_media_type(accept, expected):
+    assert choose_media_type(accept, ("application/json", PROTOBUF_MEDIA_TYPE)) == expected
+
+
+def test_media_type():
+    assert media_type("Application/X-Protobuf; proto=energysage.customer.v1.Customer") == PROTOBUF_MEDIA_TYPE
+    assert media_type(None) == ""
+
+
+def make_client():
+    router = APIRouter(route_class=CustomerRoute, default_response_class=FastJSONResponse)
+
+    @router.post("/echo")
+    def echo(payload: dict):
+        return payload
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_route_decodes_protobuf_bodies():
+    client = make_client()
+    response = client.post("/echo", data=encode_customer({"first_name": "Zoë", "old_roof": True}),
+                           headers={"content-type": PROTOBUF_MEDIA_TYPE})
+    assert response.status_code == 200
+    assert response.json() == {"first_name": "Zoë", "old_roof": True}
+
+    response = client.post("/echo", data=b"\xff\xff\xff", headers={"content-type": PROTOBUF_MEDIA_TYPE})
+    assert response.status_code == 400
+    assert client.post("/echo", json={"a": 1}).json() == {"a": 1}
+    assert issubclass(CustomerRoute, FastJSONRoute) and FastJSONRoute.body_decoders == {}
+
+
+def request_accepting(accept: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"",
+                    "headers": [(b"accept", accept.encode("latin-1"))]})
+
+
+@pytest.fixture()
+def customer():
+    customer_cache.clear()
+    db = get_test_db()
+    customer = CustomerModel(id=str(uuid.uuid4()), email="proto@example.com", first_name="Proto", last_name="Buf",
+                             electricity_usage_kwh=500)
+    db.add(customer)
+    db.commit()
+    yield db, customer.id
+    db.query(CustomerModel).delete()
+    db.commit()
+    db.close()
+    customer_cache.clear()
+
+
+def test_read_customer_negotiates_protobuf(customer):
+    db, customer_id = customer
+    result = read_customer(customer_id, db, request=request_accepting(PROTOBUF_MEDIA_TYPE))
+    assert isinstance(result, ProtobufResponse)
+    assert result.headers["content-type"] == PROTOBUF_MEDIA_TYPE
+    assert result.headers["vary"] == "Accept"
+    assert decode_customer(result.body) == {"id": customer_id, "first_name": "Proto", "last_name": "Buf",
+                                            "email": "proto@example.com", "electricity_usage_kwh": 500}
+
+    result = read_customer(customer_id, db, request=request_accepting("application/json, */*;q=0.1"))
+    assert loads(result.body)["email"] == "proto@example.com"
+
+    # Headers matching no representation get JSON; only refusing JSON as well is a 406
+    result = read_customer(customer_id, db, request=request_accepting("text/html"))
+    assert loads(result.body)["email"] == "proto@example.com"
+    with pytest.raises(HTTPException) as error:
+        read_customer(customer_id, db, request=request_accepting("text/html, */*;q=0"))
+    assert error.value.status_code == 406
+
+
+def test_read_customers_negotiates_protobuf(customer):
+    db, customer_id = customer
+    result = read_customers(db=db, fields="id,email", request=request_accepting(PROTOBUF_MEDIA_TYPE))
+    assert decode_customers(result.body) == [{"id": customer_id, "email": "proto@example.com"}]
+
+
+def test_patch_customer_with_protobuf_body(customer):
+    db, customer_id = customer
+    payload = decode_customer(encode_customer({"electricity_usage_kwh": 0, "property_address": {"state_code": "NY"}}))
+    result = patch_customer(customer_id, payload, db, request=request_accepting(PROTOBUF_MEDIA_TYPE))
+    decoded = decode_customer(result.body)
+    assert decoded["electricity_usage_kwh"] == 0
+    assert decoded["property_address"]["state_code"] == "NY"
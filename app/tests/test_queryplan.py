@@ -0,0 +1,97 @@
+"""
+Defines test cases for planning the filtered customer listing.
+
+This module contains test cases for:
+- Choosing the index that answers each supported filter combination
+- Rejecting filter combinations and sort keys no index supports
+- Ordering string sort keys by code point through the column collation, not ORDER BY
+- SQLite answering every supported combination without scanning a whole table
+"""
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Query, sessionmaker
+from sqlalchemy.schema import CreateTable
+from app.database import Base
+from app.models.customer import CustomerModel
+from app.queryplan import build_customer_query, plan_customer_query, UnsupportedQueryError
+
+SUPPORTED_FILTERS = [
+    {"old_roof": False},
+    {"old_roof": False, "min_usage": 8000},
+    {"old_roof": True, "min_usage": 1000, "max_usage": 9000},
+    {"max_usage": 5000, "sort": "-electricity_usage_kwh"},
+    {"last_name_prefix": "Sm"},
+    {"email_prefix": "jo"},
+    {"state_code": "MA"},
+    {"state_code": "MA", "postal_prefix": "021"},
+    {"postal_prefix": "9"},
+    {"state_code": "MA", "old_roof": False, "min_usage": 8000},
+    {"postal_prefix": "02", "last_name_prefix": "Sm"},
+]
+
+
+@pytest.mark.parametrize("filters,expected", [
+    ({}, {"customer": None, "property_address": None}),
+    ({"old_roof": False, "min_usage": 8000}, {"customer": "ix_customer_old_roof_usage", "property_address": None}),
+    ({"min_usage": 8000}, {"customer": "ix_customer_usage", "property_address": None}),
+    ({"state_code": "MA", "postal_prefix": "021"}, {"customer": None, "property_address": "ix_property_address_state_postal"}),
+    ({"postal_prefix": "021"}, {"customer": None, "property_address": "ix_property_address_postal_code"}),
+    ({"state_code": "MA", "old_roof": False, "max_usage": 100, "email_prefix": None},
+     {"customer": "ix_customer_old_roof_usage", "property_address": "ix_property_address_state_postal"}),
+])
+def test_plan_customer_query(filters, expected):
+    assert plan_customer_query(filters) == expected
+
+
+@pytest.mark.parametrize("filters", [
+    {"old_roof": False, "last_name_prefix": "Sm"},
+    {"min_usage": 10, "email_prefix": "jo"},
+    {"last_name_prefix": "Sm", "email_prefix": "jo"},
+])
+def test_plan_customer_query_rejects_unindexed_combinations(filters):
+    with pytest.raises(UnsupportedQueryError):
+        plan_customer_query(filters)
+
+
+def test_build_customer_query_rejects_unknown_sort(tmp_path):
+    db = sessionmaker(bind=create_engine(f"sqlite:///{tmp_path / 'sort.db'}"))()
+    with pytest.raises(UnsupportedQueryError):
+        build_customer_query(db.query(CustomerModel), sort="first_name")
+    db.close()
+
+
+@pytest.mark.parametrize("sort,expected", [
+    ("last_name", "ORDER BY customer.last_name, customer.id"),
+    ("-email", "ORDER BY customer.email DESC, customer.id DESC"),
+])
+def test_string_sort_keys_order_by_code_point(sort, expected):
+    # The columns are declared with a binary collation, so ORDER BY needs none and the index sorts
+    query, _ = build_customer_query(Query(CustomerModel), sort=sort)
+    assert str(query.statement.compile(dialect=mysql.dialect())).endswith(expected)
+    ddl = str(CreateTable(CustomerModel.__table__).compile(dialect=mysql.dialect()))
+    assert f"{sort.lstrip('-')} VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL" in ddl
+
+
+@pytest.mark.parametrize("filters", SUPPORTED_FILTERS)
+def test_supported_filters_never_scan_a_table(filters, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plan.db'}")
+    Base.metadata.create_all(bind=engine)
+
+    executed = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+
+    db = sessionmaker(bind=engine)()
+    query, _ = build_customer_query(db.query(CustomerModel), **filters)
+    event.listen(engine, "before_cursor_execute", capture)
+    query.all()
+    db.close()
+
+    statement, parameters = executed[-1]
+    connection = engine.raw_connection()
+    details = [row[-1] for row in connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    connection.close()
+    assert not [detail for detail in details if detail.startswith("SCAN")], details
@@ -0,0 +1,105 @@
+"""
+Defines test cases for read replica routing.
+
+This module contains test cases for:
+- GET endpoints reading from a replica
+- Writes going to the primary and handing out a consistency token
+- Reads pinned to the primary while the consistency token is valid
+
+Two SQLite files stand in for the primary and the replica. Replication is not
+simulated, so the same customer id holds different names on each side to show
+which database served a read.
+"""
+
+import time
+import uuid
+import pytest
+from fastapi import Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+from app import database
+from app.database import Base, ReplicaSet, CONSISTENCY_COOKIE, CONSISTENCY_HEADER, get_read_db, get_db
+from app.fastjson import loads
+from app.models.customer import CustomerModel
+from app.routers.customer import create_customer, read_customer, customer_cache
+
+
+@pytest.fixture()
+def primary_and_replica(tmp_path, monkeypatch):
+    primary_engine = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica_engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for bind in (primary_engine, replica_engine):
+        Base.metadata.create_all(bind=bind)
+
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=primary_engine))
+    monkeypatch.setattr(database, "replicas", ReplicaSet([replica_engine]))
+    customer_cache.clear()
+    yield primary_engine, replica_engine
+    customer_cache.clear()
+
+
+def add_customer(bind, customer_id, first_name):
+    db = sessionmaker(bind=bind)()
+    db.add(CustomerModel(id=customer_id, first_name=first_name, last_name='customer', email=f'{customer_id}@replica.com'))
+    db.commit()
+    db.close()
+
+
+def make_request(headers=None):
+    raw_headers = [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]
+    return Request({"type": "http", "endpoint": read_customer, "headers": raw_headers})
+
+
+def read_through_dependency(customer_id, request):
+    dependency = get_read_db(request)
+    db = next(dependency)
+    try:
+        return loads(read_customer(customer_id, db).body)
+    finally:
+        dependency.close()
+        customer_cache.clear()
+
+
+def test_reads_go_to_the_replica(primary_and_replica):
+    primary_engine, replica_engine = primary_and_replica
+    customer_id = str(uuid.uuid4())
+    add_customer(primary_engine, customer_id, 'primary')
+    add_customer(replica_engine, customer_id, 'replica')
+
+    assert read_through_dependency(customer_id, make_request())['first_name'] == 'replica'
+
+
+def test_consistency_token_pins_reads_to_the_primary(primary_and_replica):
+    primary_engine, replica_engine = primary_and_replica
+    customer_id = str(uuid.uuid4())
+    add_customer(primary_engine, customer_id, 'primary')
+    add_customer(replica_engine, customer_id, 'replica')
+
+    valid = f"{time.time() + 60:.3f}"
+    expired = f"{time.time() - 60:.3f}"
+
+    assert read_through_dependency(customer_id, make_request({CONSISTENCY_HEADER: valid}))['first_name'] == 'primary'
+    assert read_through_dependency(customer_id, make_request({"Cookie": f"{CONSISTENCY_COOKIE}={valid}"}))['first_name'] == 'primary'
+    assert read_through_dependency(customer_id, make_request({CONSISTENCY_HEADER: expired}))['first_name'] == 'replica'
+    assert read_through_dependency(customer_id, make_request({CONSISTENCY_HEADER: 'garbage'}))['first_name'] == 'replica'
+
+
+def test_writes_go_to_the_primary_and_hand_out_a_token(primary_and_replica):
+    primary_engine, replica_engine = primary_and_replica
+    dependency = get_db(Request({"type": "http", "endpoint": create_customer, "headers": []}))
+    db = next(dependency)
+    response = Response()
+    customer = create_customer({'first_name': 'new', 'last_name': 'customer', 'email': 'write@primary.com'}, db, response)
+    dependency.close()
+
+    token = response.headers[CONSISTENCY_HEADER]
+    assert float(token) > time.time()
+    assert f"{CONSISTENCY_COOKIE}={token}" in response.headers["set-cookie"]
+
+    replica_db = sessionmaker(bind=replica_engine)()
+    assert replica_db.query(CustomerModel).filter(CustomerModel.id == customer.id).first() is None
+    replica_db.close()
+
+    # The replica has not caught up, but the writer's reads are pinned to the primary
+    assert read_through_dependency(customer.id, make_request({CONSISTENCY_HEADER: token}))['first_name'] == 'new'
@@ -0,0 +1,112 @@
+"""
+Defines test cases for the in-memory customer search index.
+
+This module contains test cases for:
+- Ranking whole-term, prefix and substring matches
+- Replacing customers on update and compacting tombstones
+- Rebuilding from the database while customers are being indexed
+"""
+
+import uuid
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models.customer import CustomerModel
+from app.models.propertyAddress import PropertyAddressModel
+from app import search
+from app.search import CustomerSearchIndex, trigrams
+
+
+@pytest.fixture()
+def index():
+    index = CustomerSearchIndex()
+    index.load([
+        ("1", "Ann", "Smith", "ann.smith@example.com", "Boston"),
+        ("2", "Sam", "Annable", "sam@example.com", "New York"),
+        ("3", "Joanna", "Brown", "jo@example.com", "Newton"),
+        ("4", "Bob", "Jones", "bob@hannover.de", None),
+    ])
+    return index
+
+
+def ids(results):
+    return [result["id"] for result in results]
+
+
+def test_trigrams():
+    assert trigrams("anna") == {"ann", "nna"}
+    assert trigrams("an") == set()
+
+
+def test_search_ranks_whole_terms_then_prefixes_then_substrings(index):
+    # "ann" is a whole first name for 1, a prefix of a last name for 2, inside 3's and 4's text
+    assert ids(index.search("ann")) == ["1", "2", "3", "4"]
+    assert ids(index.search("ANN", limit=2)) == ["1", "2"]
+
+
+def test_search_matches_full_names_cities_and_emails(index):
+    assert ids(index.search("ann sm")) == ["1"]
+    assert ids(index.search("new")) == ["2", "3"]
+    assert ids(index.search("york")) == ["2"]
+    assert ids(index.search("hannover")) == ["4"]
+    assert index.search("zzz") == []
+    assert index.search("  ") == []
+
+
+def test_search_does_not_match_across_fields(index):
+    # "smith" + "ann.smith": "hann" only exists by joining last name and email
+    assert index.search("thann") == []
+
+
+def test_add_replaces_previous_version(index):
+    index.add("1", "Ann", "Taylor", "ann.taylor@example.com", "Salem")
+    assert ids(index.search("smith")) == []
+    assert ids(index.search("taylor")) == ["1"]
+    assert ids(index.search("ann", limit=1)) == ["1"]
+    assert len(index) == 4
+
+
+def test_tombstones_are_compacted(monkeypatch):
+    monkeypatch.setattr(search, "COMPACT_MIN_TOMBSTONES", 3)
+    monkeypatch.setattr(search, "NEW_TERMS_MERGE_THRESHOLD", 2)
+    index = CustomerSearchIndex()
+    for version in range(10):
+        index.add("1", "Ann", f"Version{version}", "ann@example.com")
+        index.add("2", "Bob", f"Version{version}", "bob@example.com")
+
+    assert index._state.tombstones < 3
+    assert ids(index.search("version9")) == ["1", "2"]
+    assert index.search("version3") == []
+
+
+def test_rebuild_from_database_keeps_concurrent_updates(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    customer_id = str(uuid.uuid4())
+    db.add(CustomerModel(id=customer_id, first_name="Ann", last_name="Smith", email="ann@example.com"))
+    db.add(PropertyAddressModel(id=str(uuid.uuid4()), customer_id=customer_id, city="Boston"))
+    db.commit()
+
+    index = CustomerSearchIndex()
+    rows = iter(db.query(CustomerModel.id, CustomerModel.first_name, CustomerModel.last_name,
+                         CustomerModel.email, PropertyAddressModel.city)
+                .outerjoin(PropertyAddressModel, PropertyAddressModel.customer_id == CustomerModel.id).all())
+
+    def rows_with_concurrent_add():
+        yield next(rows)
+        # A customer indexed while the rebuild is reading the database
+        index.add("late", "Late", "Comer", "late@example.com")
+        assert index.load([]) is False
+
+    assert index.load(rows_with_concurrent_add())
+    assert ids(index.search("boston")) == [customer_id]
+    assert ids(index.search("late")) == ["late"]
+
+    db.add(CustomerModel(id=str(uuid.uuid4()), first_name="Cy", last_name="Young", email="cy@example.com"))
+    db.commit()
+    assert index.rebuild(db)
+    assert len(index) == 2
+    assert index.search("late") == []
+    db.close()
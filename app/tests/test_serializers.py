@@ -0,0 +1,78 @@
+"""
+Defines test cases for the compiled output serializers.
+
+This module contains test cases checking that the serializers produce byte-identical
+responses to the response_model path they replace:
+- Customer lists, from ORM objects before and SQLAlchemy rows now
+- CustomerResponse, with and without a property address
+"""
+
+import asyncio
+import uuid
+import pytest
+from fastapi.routing import serialize_response
+from app.database import get_test_db
+from app.fastjson import FastJSONResponse
+from app.helpers import get_customer_and_property_address
+from app.models.customer import CustomerModel
+from app.models.propertyAddress import PropertyAddressModel
+from app.routers.customer import router, read_customer, read_customers, create_customer, customer_cache
+from app.schemas.customer import Customer
+from app.serializers import compile_serializer, serialize_customer
+
+PAYLOADS = [
+    {'first_name': 'Zoë', 'last_name': "Serializer-O'Brien \"Jr\"", 'email': 'zoe.serializer@example.com', 'electricity_usage_kwh': 0,
+     'old_roof': False, 'property_address': {'street': '1 Main St\n', 'city': 'Boston', 'state_code': 'ma', 'postal_code': '02110'}},
+    {'first_name': 'Al', 'last_name': 'Serializer', 'email': 'al.serializer@example.com', 'old_roof': True,
+     'property_address': {'city': None}},
+    {'first_name': '名前', 'last_name': 'Serializer', 'email': 'name.serializer@example.com', 'electricity_usage_kwh': 123456789},
+]
+
+
+@pytest.fixture()
+def created():
+    db = get_test_db()
+    customer_cache.clear()
+    customers = [create_customer(dict(payload), db) for payload in PAYLOADS]
+    yield db, customers
+    customer_cache.clear()
+    ids = [customer.id for customer in customers]
+    db.query(PropertyAddressModel).filter(PropertyAddressModel.customer_id.in_(ids)).delete(synchronize_session=False)
+    db.query(CustomerModel).filter(CustomerModel.id.in_(ids)).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+def response_model_body(endpoint, content) -> bytes:
+    # What FastAPI sent before: response_model validation, jsonable_encoder, then the response class
+    route = next(route for route in router.routes if route.endpoint is endpoint)
+    encoded = asyncio.run(serialize_response(field=route.response_field, response_content=content))
+    return FastJSONResponse(encoded).body
+
+
+def test_customer_list_is_byte_identical(created):
+    db, customers = created
+    ids = [customer.id for customer in customers]
+    orm_customers = db.query(CustomerModel).filter(CustomerModel.id.in_(ids)).order_by(CustomerModel.id).all()
+    expected = response_model_body(read_customers, [Customer.from_orm(customer) for customer in orm_customers])
+
+    served = read_customers(db, last_name_prefix='Serializer', sort='id')
+    assert served.body == expected
+    assert FastJSONResponse([serialize_customer(customer) for customer in orm_customers]).body == expected
+
+
+def test_customer_response_is_byte_identical(created):
+    db, customers = created
+    for customer in customers:
+        expected = response_model_body(read_customer, get_customer_and_property_address(customer.id, db))
+        assert read_customer(customer.id, db).body == expected
+        # Cached copies go through the same serializer
+        assert read_customer(customer.id, db).body == expected
+
+
+def test_compile_serializer_follows_schema_order_and_nesting():
+    serialize = compile_serializer(Customer)
+    row = type("Row", (), {"id": str(uuid.uuid4()), "first_name": "a", "last_name": "b", "email": "c",
+                           "electricity_usage_kwh": None, "old_roof": True, "ignored": 1})()
+    assert list(serialize(row)) == list(Customer.__fields__)
+    assert serialize(row)["old_roof"] is True
@@ -0,0 +1,273 @@
+"""
+Defines test cases for hash-sharded customer storage.
+
+This module contains test cases for:
+- Consistent placement of customer ids on the hash ring
+- Customers and their property addresses being written to the same shard
+- Point reads and patches touching a single shard
+- GET /customers merging every shard in id order, and paginating filtered results across shards
+- Mixed-case names merged across shards in the code point order each shard sorts them in
+- Embedded property addresses loaded on the shard of their customers
+- XML customer lists streamed from every shard in id order
+- Email uniqueness and lookups across shards through the global customer_email table
+- The per-state stats rollup living on the shard of each customer
+
+Three SQLite files stand in for the shards.
+"""
+
+import asyncio
+import uuid
+import xml.etree.ElementTree as ElementTree
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from sqlalchemy import create_engine, event
+from app.database import Base, LazySession
+from app.fastjson import loads
+from app.models.customer import CustomerModel
+from app.models.customerEmail import CustomerEmailModel
+from app.models.propertyAddress import PropertyAddressModel
+from app.routers.customer import create_customer, read_customer, read_customer_by_email, read_customers, patch_customer, customer_cache
+from app.models.customerStateStats import CustomerStateStatsModel
+from app.sharding import HashRing, make_sharded_session_factory
+from app.stats import read_customer_state_stats, reconcile_customer_state_stats
+
+SHARD_IDS = ["shard0", "shard1", "shard2"]
+
+
+@pytest.fixture()
+def shards(tmp_path):
+    engines = {shard_id: create_engine(f"sqlite:///{tmp_path / f'{shard_id}.db'}") for shard_id in SHARD_IDS}
+    statements = {shard_id: 0 for shard_id in SHARD_IDS}
+    for shard_id, shard_engine in engines.items():
+        Base.metadata.create_all(bind=shard_engine)
+
+        def count(*args, shard_id=shard_id, **kwargs):
+            statements[shard_id] += 1
+
+        event.listen(shard_engine, "before_cursor_execute", count)
+
+    customer_cache.clear()
+    yield make_sharded_session_factory(engines), engines, statements
+    customer_cache.clear()
+
+
+def rows_per_shard(engines, model):
+    counts = {}
+    for shard_id, shard_engine in engines.items():
+        with shard_engine.connect() as connection:
+            counts[shard_id] = connection.execute(model.__table__.select()).fetchall()
+    return counts
+
+
+def new_customer_payload(index):
+    return {'first_name': f'shard{index}', 'last_name': 'customer', 'email': f'shard{index}@example.com',
+            'property_address': {'street': '1 Main St', 'city': 'Boston', 'state_code': 'MA', 'postal_code': '02110'}}
+
+
+def test_hash_ring_is_stable_and_spreads_keys():
+    ring = HashRing(SHARD_IDS)
+    keys = [str(uuid.uuid4()) for _ in range(3000)]
+    placement = [ring.shard_for(key) for key in keys]
+
+    assert placement == [HashRing(SHARD_IDS).shard_for(key) for key in keys]
+    assert all(placement.count(shard_id) > 600 for shard_id in SHARD_IDS)
+
+    # Adding a shard only moves the keys the new shard takes over
+    grown = HashRing(SHARD_IDS + ["shard3"])
+    moved = [key for key, shard_id in zip(keys, placement) if grown.shard_for(key) != shard_id]
+    assert all(grown.shard_for(key) == "shard3" for key in moved)
+
+
+def test_customers_and_addresses_are_co_located(shards):
+    session_factory, engines, _ = shards
+    ring = HashRing(SHARD_IDS)
+    db = session_factory()
+    created = [create_customer(new_customer_payload(index), db) for index in range(12)]
+    db.close()
+
+    customers = rows_per_shard(engines, CustomerModel)
+    addresses = rows_per_shard(engines, PropertyAddressModel)
+    for customer in created:
+        shard_id = ring.shard_for(customer.id)
+        assert customer.id in [row.id for row in customers[shard_id]]
+        assert customer.id in [row.customer_id for row in addresses[shard_id]]
+    assert sum(len(rows) for rows in customers.values()) == 12
+
+    # Every email is registered once, on the directory shard
+    emails = rows_per_shard(engines, CustomerEmailModel)
+    assert len(emails["shard0"]) == 12
+    assert emails["shard1"] == emails["shard2"] == []
+
+
+def test_point_read_and_patch_touch_one_shard(shards):
+    session_factory, engines, statements = shards
+    db = session_factory()
+    customer = create_customer(new_customer_payload(0), db)
+    db.close()
+    customer_cache.clear()
+
+    for shard_id in SHARD_IDS:
+        statements[shard_id] = 0
+    db = LazySession(session_factory, endpoint="read_customer", create_schema=False)
+    assert loads(read_customer(customer.id, db).body)['property_address']['city'] == 'Boston'
+    db.close()
+    assert sorted(statements.values()) == [0, 0, 2]
+
+    for shard_id in SHARD_IDS:
+        statements[shard_id] = 0
+    db = session_factory()
+    patched = patch_customer(customer.id, {'first_name': 'patched', 'property_address': {'city': 'Cambridge', 'postal_code': '02139'}}, db)
+    db.close()
+    assert patched.first_name == 'patched'
+    assert patched.property_address.city == 'Cambridge'
+    assert sum(1 for count in statements.values() if count) == 1
+
+
+def test_read_customers_merges_shards_in_id_order(shards):
+    session_factory, _, _ = shards
+    db = session_factory()
+    created = [create_customer(new_customer_payload(index), db) for index in range(9)]
+    db.close()
+
+    db = session_factory()
+    customers = loads(read_customers(db).body)
+    db.close()
+    assert [customer['id'] for customer in customers] == sorted(customer.id for customer in created)
+
+
+def test_read_customers_paginates_across_shards(shards):
+    session_factory, _, _ = shards
+    db = session_factory()
+    for index in range(9):
+        payload = new_customer_payload(index)
+        payload['electricity_usage_kwh'] = 1000 * index
+        create_customer(payload, db)
+    db.close()
+
+    db = session_factory()
+    pages = [loads(read_customers(db, state_code='MA', sort='-electricity_usage_kwh', limit=4, offset=offset).body) for offset in (0, 4, 8)]
+    db.close()
+    assert [customer['electricity_usage_kwh'] for page in pages for customer in page] == [1000 * index for index in range(8, -1, -1)]
+    assert [len(page) for page in pages] == [4, 4, 1]
+
+
+def test_read_customers_paginates_mixed_case_names_across_shards(tmp_path):
+    # Each shard and the merge of their pages order "adams" and "Baker" by code point alike
+    engines = {shard_id: create_engine(f"sqlite:///{tmp_path / f'{shard_id}.db'}") for shard_id in SHARD_IDS}
+    for shard_engine in engines.values():
+        Base.metadata.create_all(bind=shard_engine)
+    session_factory = make_sharded_session_factory(engines)
+    customer_cache.clear()
+
+    names = ["adams", "Baker", "carter", "Davis", "evans", "Foster", "garcia", "Hughes", "irving", "Jones", "kelly", "Lopez"]
+    db = session_factory()
+    for index, name in enumerate(names):
+        payload = new_customer_payload(index)
+        payload['last_name'] = name
+        payload['email'] = f'{name}@example.com'
+        create_customer(payload, db)
+    db.close()
+
+    for sort, key in (('last_name', 'last_name'), ('-email', 'email')):
+        db = session_factory()
+        pages = [loads(read_customers(db, sort=sort, limit=5, offset=offset).body) for offset in (0, 5, 10)]
+        db.close()
+        values = [customer[key] for page in pages for customer in page]
+        assert values == sorted(values, reverse=sort.startswith('-'))
+        assert len(values) == len(names)
+    customer_cache.clear()
+
+
+def test_email_is_unique_across_shards(shards):
+    session_factory, engines, _ = shards
+    db = session_factory()
+    first = create_customer(new_customer_payload(0), db)
+    with pytest.raises(HTTPException) as e:
+        create_customer(new_customer_payload(0), db)
+    assert e.value.status_code == 409
+
+    second = create_customer(new_customer_payload(1), db)
+    with pytest.raises(HTTPException) as e:
+        patch_customer(second.id, {'email': first.email}, db)
+    assert e.value.status_code == 409
+    db.rollback()
+
+    patch_customer(second.id, {'email': 'moved@example.com'}, db)
+    db.close()
+    emails = sorted(row.email for row in rows_per_shard(engines, CustomerEmailModel)["shard0"])
+    assert emails == ['moved@example.com', first.email]
+
+
+def test_email_lookup_ignores_case_across_shards(shards):
+    session_factory, engines, _ = shards
+    db = session_factory()
+    created = create_customer({'first_name': 'case', 'last_name': 'customer', 'email': 'Case@Example.com'}, db)
+    with pytest.raises(HTTPException) as e:
+        create_customer({'first_name': 'case', 'last_name': 'customer', 'email': 'CASE@example.com'}, db)
+    assert e.value.status_code == 409
+    db.close()
+
+    assert [row.email for row in rows_per_shard(engines, CustomerEmailModel)["shard0"]] == ['case@example.com']
+    db = session_factory()
+    assert loads(read_customer_by_email('case@EXAMPLE.com', db).body)['id'] == created.id
+    db.close()
+
+
+def test_stats_rollup_is_kept_per_shard(shards):
+    session_factory, engines, _ = shards
+    ring = HashRing(SHARD_IDS)
+    db = session_factory()
+    created = [create_customer(dict(new_customer_payload(index), electricity_usage_kwh=10), db) for index in range(9)]
+    patch_customer(created[0].id, {'property_address': {'postal_code': '10001'}}, db)
+
+    # Every shard counts its own customers
+    rollups = rows_per_shard(engines, CustomerStateStatsModel)
+    for shard_id in SHARD_IDS:
+        on_shard = sum(1 for customer in created if ring.shard_for(customer.id) == shard_id)
+        assert sum(row.customers for row in rollups[shard_id]) == on_shard
+
+    stats = read_customer_state_stats(db)
+    assert stats["customers"] == 9 and stats["electricity_usage_kwh"] == 90
+    assert [(state["state_code"], state["customers"]) for state in stats["states"]] == [("MA", 8), ("NY", 1)]
+
+    reconcile_customer_state_stats(db)
+    assert read_customer_state_stats(db) == stats
+    db.close()
+
+
+def test_read_customers_includes_addresses_across_shards(shards):
+    session_factory, _, statements = shards
+    db = session_factory()
+    created = [create_customer(new_customer_payload(index), db) for index in range(9)]
+    db.close()
+
+    for shard_id in SHARD_IDS:
+        statements[shard_id] = 0
+    db = session_factory()
+    customers = loads(read_customers(db, include='property_address').body)
+    ring = db.info["ring"]
+    db.close()
+    assert [customer['id'] for customer in customers] == sorted(customer.id for customer in created)
+    assert all(customer['property_address']['city'] == 'Boston' for customer in customers)
+    # A page query on every shard, and an address query on every shard holding customers
+    holding = {ring.shard_for(customer.id) for customer in created}
+    assert statements == {shard_id: 1 + (shard_id in holding) for shard_id in SHARD_IDS}
+
+
+def test_read_customers_streams_xml_across_shards(shards):
+    session_factory, _, _ = shards
+    db = session_factory()
+    created = sorted(create_customer(new_customer_payload(index), db).id for index in range(9))
+    db.close()
+
+    async def body(response):
+        return b"".join([chunk async for chunk in response.body_iterator])
+
+    request = Request({"type": "http", "method": "GET", "path": "/", "query_string": b"",
+                       "headers": [(b"accept", b"application/xml")]})
+    db = session_factory()
+    response = read_customers(db, limit=5, offset=2, request=request)
+    root = ElementTree.fromstring(asyncio.run(body(response)))
+    db.close()
+    assert [customer.findtext("id") for customer in root] == created[2:7]
@@ -0,0 +1,79 @@
+"""
+Defines test cases for request coalescing.
+
+This module contains test cases for the SingleFlight group:
+- Concurrent calls with the same key share one loader call
+- Calls with different keys are not coalesced
+- Loader errors are re-raised to every waiting caller
+"""
+
+import threading
+import time
+from app.singleflight import SingleFlight
+
+
+def run_concurrently(count, target):
+    results = [None] * count
+    errors = [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(index):
+        barrier.wait()
+        try:
+            results[index] = target(index)
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_calls_share_one_load():
+    group = SingleFlight()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"id": "abc"}
+
+    results, errors = run_concurrently(8, lambda i: group.do(("customer", "abc"), loader))
+
+    assert len(calls) == 1
+    assert errors == [None] * 8
+    assert all(result is results[0] for result in results)
+    assert group.in_flight() == 0
+
+
+def test_different_keys_are_not_coalesced():
+    group = SingleFlight()
+    calls = []
+
+    def loader(index):
+        calls.append(index)
+        time.sleep(0.05)
+        return index
+
+    results, _ = run_concurrently(4, lambda i: group.do(("customer", i), lambda: loader(i)))
+
+    assert sorted(calls) == [0, 1, 2, 3]
+    assert results == [0, 1, 2, 3]
+
+
+def test_errors_are_shared_with_waiters():
+    group = SingleFlight()
+
+    def loader():
+        time.sleep(0.2)
+        raise RuntimeError("database unavailable")
+
+    _, errors = run_concurrently(4, lambda i: group.do("customers", loader))
+
+    assert all(isinstance(e, RuntimeError) for e in errors)
+
+    # The failed flight is forgotten so the next call retries
+    assert group.do("customers", lambda: "ok") == "ok"
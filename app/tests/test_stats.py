@@ -0,0 +1,137 @@
+"""
+Defines test cases for the per-state customer rollup behind GET /stats.
+
+This module contains test cases for:
+- Creating and patching customers keeping the rollup in step with the base tables
+- Two transactions writing the first customer of a state, on SQLite and as compiled for MySQL
+- Reconciling the rollup from the base tables
+- GET /stats reading the rollup without scanning customers
+"""
+
+import uuid
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models.customer import CustomerModel
+from app.models.propertyAddress import PropertyAddressModel
+from app.routers.customer import create_customer, patch_customer, customer_cache, customer_search
+from app.routers.stats import read_stats
+from app.stats import _upsert_stats, apply_customer_stats_delta, customer_stats_entry, reconcile_customer_state_stats, read_customer_state_stats
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    Base.metadata.create_all(bind=engine)
+    customer_cache.clear()
+    customer_search.clear()
+    yield sessionmaker(bind=engine)
+    customer_cache.clear()
+    customer_search.clear()
+
+
+# A ZIP code in each state the tests use, so addresses agree with the ZIP table
+POSTAL_CODES = {'MA': '02110', 'NY': '10001', 'CA': '94103'}
+
+
+def payload(index, state_code=None, usage=None):
+    customer = {'first_name': 'stats', 'last_name': f'customer{index}', 'email': f'stats{index}@example.com'}
+    if usage is not None:
+        customer['electricity_usage_kwh'] = usage
+    if state_code is not None:
+        customer['property_address'] = {'state_code': state_code, 'postal_code': POSTAL_CODES[state_code.upper()]}
+    return customer
+
+
+def states(stats):
+    return {state["state_code"]: (state["customers"], state["customers_with_usage"], state["electricity_usage_kwh"])
+            for state in stats["states"]}
+
+
+def reconciled(session_factory):
+    db = session_factory()
+    reconcile_customer_state_stats(db)
+    stats = read_customer_state_stats(db)
+    db.close()
+    return stats
+
+
+def test_writes_keep_the_rollup_in_step(session_factory):
+    db = session_factory()
+    first = create_customer(payload(0, "MA", 100), db)
+    second = create_customer(payload(1, "ma", 300), db)
+    create_customer(payload(2, "NY"), db)
+    fourth = create_customer(payload(3, usage=50), db)
+
+    stats = read_customer_state_stats(db)
+    assert (stats["customers"], stats["customers_with_usage"], stats["electricity_usage_kwh"]) == (4, 3, 450)
+    assert states(stats) == {"MA": (2, 2, 400), "NY": (1, 0, 0), None: (1, 1, 50)}
+
+    patch_customer(first.id, {'electricity_usage_kwh': 150}, db)
+    patch_customer(second.id, {'property_address': {'postal_code': '10001'}}, db)
+    patch_customer(fourth.id, {'property_address': {'city': 'Boston', 'state_code': 'MA'}}, db)
+    patch_customer(first.id, {'first_name': 'renamed', 'property_address': {'street': '2 Main St'}}, db)
+
+    stats = read_customer_state_stats(db)
+    db.close()
+    assert states(stats) == {"MA": (2, 2, 200), "NY": (2, 1, 300)}
+    assert reconciled(session_factory) == stats
+
+
+def test_concurrent_first_customers_of_a_state(session_factory):
+    db = session_factory()
+    other = session_factory()
+    competing = []
+
+    def first_insert_commits_first(conn, cursor, statement, parameters, context, executemany):
+        # Another transaction commits the first MA customer just before this one writes its own
+        if statement.startswith("INSERT INTO customer_state_stats") and not competing:
+            competing.append(statement)
+            apply_customer_stats_delta(other, str(uuid.uuid4()), after=customer_stats_entry("MA", 100))
+            other.commit()
+
+    event.listen(db.get_bind(), "before_cursor_execute", first_insert_commits_first)
+    apply_customer_stats_delta(db, str(uuid.uuid4()), after=customer_stats_entry("MA", 300))
+    db.commit()
+    event.remove(db.get_bind(), "before_cursor_execute", first_insert_commits_first)
+
+    assert competing
+    assert states(read_customer_state_stats(db)) == {"MA": (2, 2, 400)}
+    db.close()
+    other.close()
+
+
+def test_stats_upsert_on_mysql():
+    statement = str(_upsert_stats("mysql", 1, 1, 1, 100).compile(dialect=mysql.dialect()))
+    assert statement.startswith("INSERT INTO customer_state_stats")
+    assert "ON DUPLICATE KEY UPDATE customers = (customer_state_stats.customers + VALUES(customers))" in statement
+
+
+def test_reconcile_rebuilds_the_rollup(session_factory):
+    db = session_factory()
+    create_customer(payload(0, "MA", 100), db)
+    # Written outside the API, so the rollup misses it until reconciled
+    customer_id = str(uuid.uuid4())
+    db.add(CustomerModel(id=customer_id, first_name="a", last_name="b", email="direct@example.com", electricity_usage_kwh=20))
+    db.add(PropertyAddressModel(id=str(uuid.uuid4()), customer_id=customer_id, state_code="MA"))
+    db.commit()
+    assert states(read_customer_state_stats(db)) == {"MA": (1, 1, 100)}
+    db.close()
+
+    assert states(reconciled(session_factory)) == {"MA": (2, 2, 120)}
+
+
+def test_read_stats_only_reads_the_rollup(session_factory):
+    db = session_factory()
+    for index in range(5):
+        create_customer(payload(index, "CA", 10), db)
+
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    stats = read_stats(db)
+    db.close()
+    assert states(stats) == {"CA": (5, 5, 50)}
+    assert len(statements) == 1
+    assert "customer_state_stats" in statements[0] and "property_address" not in statements[0]
@@ -0,0 +1,105 @@
+"""
+Defines test cases for the request validators compiled from customers.yaml.
+
+This module contains test cases for:
+- The create and patch validators keeping the API's error messages
+- Collecting every error of a payload in one pass
+- Compiling schemas: nullable, nested objects, patterns, formats and unsupported keywords
+- Validating many payloads lazily
+"""
+
+import pytest
+from fastapi import HTTPException
+from app.routers.customer import create_customer, patch_customer
+from app.validation import (ERROR_MESSAGES, REQUIRED_MESSAGE, compile_validator, iter_validation_errors,
+                            validate_customer_create, validate_customer_patch)
+
+VALID = {"first_name": "Ada", "last_name": "Lovelace", "email": "ada@example.com", "electricity_usage_kwh": 100,
+         "old_roof": False, "property_address": {"street": "1 Main St", "city": "Boston", "postal_code": "02110",
+                                                 "state_code": "ma"}}
+
+
+@pytest.mark.parametrize("change, expected", [
+    ({}, []),
+    ({"property_address": None}, []),
+    ({"property_address": {"street": None, "city": None, "state_code": None}}, []),
+    ({"email": "invalid_email"}, [ERROR_MESSAGES["email"]]),
+    ({"email": 42}, [ERROR_MESSAGES["email"]]),
+    ({"electricity_usage_kwh": "100"}, ["electricity_usage_kwh should be number"]),
+    ({"electricity_usage_kwh": 10.5}, ["electricity_usage_kwh should be number"]),
+    ({"electricity_usage_kwh": True}, ["electricity_usage_kwh should be number"]),
+    ({"old_roof": "yes"}, ["old_roof should be boolean"]),
+    ({"property_address": {"postal_code": "1234"}}, [ERROR_MESSAGES["property_address.postal_code"]]),
+    ({"property_address": {"postal_code": "1234a"}}, [ERROR_MESSAGES["property_address.postal_code"]]),
+    ({"property_address": {"postal_code": None}}, [ERROR_MESSAGES["property_address.postal_code"]]),
+    ({"property_address": {"state_code": "ZZ"}}, []),
+    ({"property_address": {"state_code": "TOOLONG"}}, [ERROR_MESSAGES["property_address.state_code"]]),
+    ({"property_address": "1 Main St"}, ["property_address should be object"]),
+    ({"first_name": 7}, ["first_name should be string"]),
+])
+def test_validate_customer_create(change, expected):
+    assert validate_customer_create(dict(VALID, **change)) == expected
+
+
+def test_validators_collect_every_error():
+    assert validate_customer_create({"email": "nope", "old_roof": 1, "property_address": {"postal_code": "1"}}) == [
+        REQUIRED_MESSAGE, ERROR_MESSAGES["email"], "old_roof should be boolean",
+        ERROR_MESSAGES["property_address.postal_code"],
+    ]
+    assert validate_customer_create([]) == ["Request body should be an object"]
+
+
+def test_validate_customer_patch():
+    assert validate_customer_patch({}) == []
+    assert validate_customer_patch({"first_name": "Ada", "unknown": object()}) == []
+    assert validate_customer_patch({"property_address": None}) == ["property_address should be object"]
+    assert validate_customer_patch({"electricity_usage_kwh": None, "property_address": {"state_code": "XXXXXX"}}) == [
+        "electricity_usage_kwh should be number", ERROR_MESSAGES["property_address.state_code"],
+    ]
+
+
+def test_compile_validator():
+    validate = compile_validator({
+        "type": "object", "required": ["code"],
+        "properties": {
+            "code": {"type": "string", "pattern": "^[A-Z]{2}$"},
+            "size": {"type": "number", "nullable": True},
+            "nested": {"type": "object", "required": ["id"], "properties": {"id": {"type": "integer"}}},
+        },
+    }, "thing", messages={"code": "bad code"})
+    assert validate.__name__ == "validate_thing"
+    assert validate({"code": "MA", "size": None, "nested": {"id": 1}}) == []
+    assert validate({"size": 1.5}) == [REQUIRED_MESSAGE]
+    assert validate({"code": "MAX", "size": "big", "nested": {"id": "1"}}) == [
+        "bad code", "size should be number", "nested.id should be integer",
+    ]
+    assert validate({"code": "MA", "nested": {}}) == ["nested should have id"]
+
+
+@pytest.mark.parametrize("schema", [
+    {"type": "array"},
+    {"type": "object", "properties": {"tags": {"type": "array"}}},
+    {"type": "object", "properties": {"name": {"type": "string", "enum": ["a"]}}},
+    {"type": "object", "properties": {"name": {"type": "string", "format": "uri"}}},
+])
+def test_compile_validator_rejects_unsupported_schemas(schema):
+    with pytest.raises(ValueError):
+        compile_validator(schema)
+
+
+def test_iter_validation_errors():
+    payloads = iter([VALID, {"first_name": "A"}, VALID, dict(VALID, old_roof=None)])
+    assert list(iter_validation_errors(validate_customer_create, payloads)) == [
+        (1, [REQUIRED_MESSAGE]), (3, ["old_roof should be boolean"]),
+    ]
+
+
+def test_routes_report_every_error():
+    with pytest.raises(HTTPException) as error:
+        create_customer({"first_name": "A", "last_name": "B", "email": "bad", "old_roof": "no"}, db=None)
+    assert error.value.status_code == 400
+    assert error.value.detail == "Please enter correct email - abc@xyz.com; old_roof should be boolean"
+
+    with pytest.raises(HTTPException) as error:
+        patch_customer("not-a-uuid", {"property_address": {"postal_code": "abc"}}, db=None)
+    assert error.value.detail == "Invalid Postal Code. It should be a 5-digit number."
@@ -0,0 +1,180 @@
+"""
+Defines test cases for the XML representation of customers.
+
+This module contains test cases for:
+- Writing customers as XML elements, escaped and without None fields
+- Writing a <customers> document incrementally, in chunks
+- Producing a streamed body on a thread of its own
+- The customer endpoints negotiating XML, with /customers streamed from the database
+- Browsers, which accept XML below HTML and */*, getting JSON
+- Creating and patching customers answered in XML when it is the only representation accepted
+"""
+
+import asyncio
+import threading
+import uuid
+import xml.etree.ElementTree as ElementTree
+import pytest
+from fastapi.responses import StreamingResponse
+from starlette.requests import Request
+from app.database import get_test_db
+from app.models.customer import CustomerModel
+from app.models.propertyAddress import PropertyAddressModel
+from app.routers.customer import create_customer, customer_cache, patch_customer, read_customer, read_customers
+from app.streaming import iterate_in_thread
+from app.xmlstream import XML_MEDIA_TYPE, XMLResponse, customer_element, encode_customer_xml, iter_customers_xml
+
+CUSTOMER = {
+    "id": "1", "first_name": "Zoë <&>", "last_name": "O'Brien\x01", "email": "zoe@example.com",
+    "electricity_usage_kwh": 0, "old_roof": False,
+    "property_address": {"street": "1 Main St", "city": "Boston", "postal_code": None, "state_code": "MA"},
+}
+
+
+def collect(aiterator) -> list:
+    async def gather():
+        return [item async for item in aiterator]
+    return asyncio.run(gather())
+
+
+def test_encode_customer_xml():
+    document = encode_customer_xml(CUSTOMER)
+    assert document.startswith(b'<?xml version="1.0" encoding="UTF-8"?>\n<customer><id>1</id>')
+    root = ElementTree.fromstring(document)
+    assert [child.tag for child in root] == ["id", "first_name", "last_name", "email", "electricity_usage_kwh",
+                                             "old_roof", "property_address"]
+    assert root.findtext("first_name") == "Zoë <&>"
+    assert root.findtext("last_name") == "O'Brien�"
+    assert root.findtext("electricity_usage_kwh") == "0"
+    assert root.findtext("old_roof") == "false"
+    assert [child.tag for child in root.find("property_address")] == ["street", "city", "state_code"]
+    assert customer_element({"id": "2", "property_address": None}) == "<customer><id>2</id></customer>"
+
+
+def test_iter_customers_xml_writes_chunks_lazily():
+    consumed = []
+
+    def contents():
+        for index in range(10):
+            consumed.append(index)
+            yield {"id": str(index), "old_roof": True}
+
+    chunks = iter_customers_xml(contents(), chunk_size=100)
+    first = next(chunks)
+    assert consumed == [0, 1]
+    chunks = [first] + list(chunks)
+    assert len(chunks) > 1
+    root = ElementTree.fromstring(b"".join(chunks))
+    assert root.tag == "customers"
+    assert [customer.findtext("id") for customer in root] == [str(index) for index in range(10)]
+    assert b"".join(iter_customers_xml([])).endswith(b"<customers></customers>")
+
+
+def test_iterate_in_thread_produces_on_one_thread():
+    threads = set()
+
+    def produce():
+        for index in range(50):
+            threads.add(threading.get_ident())
+            yield index
+
+    assert collect(iterate_in_thread(produce, max_pending=2)) == list(range(50))
+    assert len(threads) == 1 and threading.get_ident() not in threads
+
+
+def test_iterate_in_thread_raises_producer_errors_and_stops_early():
+    def failing():
+        yield 1
+        raise RuntimeError("cursor lost")
+
+    with pytest.raises(RuntimeError):
+        collect(iterate_in_thread(failing))
+
+    closed = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                yield b"chunk"
+        finally:
+            closed.set()
+
+    async def first_item():
+        stream = iterate_in_thread(endless, max_pending=1)
+        item = await stream.__anext__()
+        await stream.aclose()
+        return item
+
+    assert asyncio.run(first_item()) == b"chunk"
+    assert closed.wait(timeout=2)
+
+
+def request_accepting(accept: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"",
+                    "headers": [(b"accept", accept.encode("latin-1"))]})
+
+
+@pytest.fixture()
+def customers():
+    customer_cache.clear()
+    db = get_test_db()
+    ids = sorted(str(uuid.uuid4()) for _ in range(5))
+    for index, customer_id in enumerate(ids):
+        db.add(CustomerModel(id=customer_id, email=f"xml{index}@example.com", first_name="X", last_name=f"M{index}",
+                             old_roof=index % 2 == 0))
+        db.add(PropertyAddressModel(id=str(uuid.uuid4()), customer_id=customer_id, city="Boston", state_code="MA"))
+    db.commit()
+    yield db, ids
+    db.query(PropertyAddressModel).delete()
+    db.query(CustomerModel).delete()
+    db.commit()
+    db.close()
+    customer_cache.clear()
+
+
+def test_read_customer_negotiates_xml(customers):
+    db, ids = customers
+    result = read_customer(ids[0], db, request=request_accepting("application/xml"))
+    assert isinstance(result, XMLResponse)
+    assert result.headers["content-type"].startswith(XML_MEDIA_TYPE)
+    root = ElementTree.fromstring(result.body)
+    assert root.findtext("email") == "xml0@example.com"
+    assert root.findtext("property_address/city") == "Boston"
+
+
+def test_browsers_get_json(customers):
+    # Browsers accept XML below HTML, and anything below that
+    db, ids = customers
+    result = read_customer(ids[0], db, request=request_accepting(
+        "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8"))
+    assert not isinstance(result, XMLResponse)
+    assert result.headers["content-type"] == "application/json"
+    assert result.headers["vary"] == "Accept"
+
+
+def test_read_customers_streams_xml(customers):
+    db, ids = customers
+    result = read_customers(db=db, limit=3, offset=1, fields="id,old_roof", include="property_address",
+                            request=request_accepting("application/xml;q=0.9, application/json;q=0.5"))
+    assert isinstance(result, StreamingResponse)
+    assert result.headers["vary"] == "Accept"
+    root = ElementTree.fromstring(b"".join(collect(result.body_iterator)))
+    assert [customer.findtext("id") for customer in root] == ids[1:4]
+    assert [customer.findtext("old_roof") for customer in root] == ["false", "true", "false"]
+    assert root.find("customer/email") is None
+
+
+def test_create_and_patch_customer_negotiate_xml(customers):
+    db, _ = customers
+    created = create_customer({"first_name": "X", "last_name": "Writer", "email": "xmlwriter@example.com",
+                               "property_address": {"street": "1 Main St", "state_code": "MA"}},
+                              db, request=request_accepting("application/xml"))
+    assert isinstance(created, XMLResponse)
+    assert created.headers["vary"] == "Accept"
+    root = ElementTree.fromstring(created.body)
+    assert root.findtext("email") == "xmlwriter@example.com"
+    assert root.findtext("property_address/state_code") == "MA"
+
+    patched = patch_customer(root.findtext("id"), {"last_name": "Patched"}, db, request=request_accepting("application/xml"))
+    assert isinstance(patched, XMLResponse)
+    assert ElementTree.fromstring(patched.body).findtext("last_name") == "Patched"
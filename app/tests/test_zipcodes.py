@@ -0,0 +1,209 @@
+"""
+Defines test cases for the offline ZIP code reference table.
+
+This module contains test cases for:
+- Building the table file and looking postal codes up in it, one at a time and in batches
+- The table shipped in app/data, and it matching a fresh build from the bundled postal codes
+- Warning once when the table file is missing
+- Checking and completing property addresses against the table, cities included
+- Creating and patching customers whose addresses disagree with or omit what the table knows
+"""
+
+import os
+import random
+import struct
+import pytest
+from fastapi import HTTPException
+from app import geo, zipcodes
+from app.database import get_test_db
+from app.models.customer import CustomerModel
+from app.models.propertyAddress import PropertyAddressModel
+from app.routers.customer import create_customer, patch_customer, customer_cache
+from app.zipcodes import ZipTable, build_zip_table, resolve_property_address
+
+ZIP_ROWS = [
+    ("10001", "New York", "NY"),
+    ("02139", "Cambridge", "MA"),
+    ("02110", "Boston", "MA"),
+    # Later rows of a postal code are the other cities it serves, each kept once
+    ("02139", "Cambridgeport", "MA"),
+    ("02139", " CAMBRIDGE ", "MA"),
+    ("01608", "Worcester", "MA"),
+    ("00601", "Adjuntas", "PR"),
+    # Rows without a USPS state code keep their cities
+    ("96910", "Hagåtña", ""),
+    ("96910", "Agana Heights", ""),
+]
+
+
+@pytest.fixture()
+def table(tmp_path):
+    path = str(tmp_path / "zipcodes.bin")
+    assert build_zip_table(ZIP_ROWS, path) == 6
+    table = ZipTable(path)
+    yield table
+    table.close()
+
+
+def test_lookup(table):
+    assert len(table) == 6
+    assert list(table.zips) == [601, 1608, 2110, 2139, 10001, 96910]
+    assert table.lookup("02110") == ("MA", "Boston", ())
+    assert table.lookup("02139") == ("MA", "Cambridge", ("Cambridgeport",))
+    assert table.lookup("10001") == ("NY", "New York", ())
+    assert table.lookup("00601") == ("PR", "Adjuntas", ())
+    assert table.lookup("96910") == (None, "Hagåtña", ("Agana Heights",))
+    assert table.lookup("00000") is None
+    assert table.lookup("99999") is None
+    assert table.lookup("02111") is None
+
+
+def test_table_is_little_endian(table, tmp_path):
+    # The same bytes on every machine, so the built table can ship with the code
+    with open(tmp_path / "zipcodes.bin", "rb") as table_file:
+        raw = table_file.read()
+    assert struct.unpack_from("<2I", raw, zipcodes.HEADER.size) == (601, 1608)
+
+
+def test_lookup_many(table):
+    codes = ["10001", "99999", "02110", "00601", "02110", "00000"]
+    assert table.lookup_many(codes) == [table.lookup(code) for code in codes]
+    assert table.lookup_many([]) == []
+
+
+def test_lookup_many_matches_lookup(tmp_path):
+    rng = random.Random(5)
+    rows = [(f"{code:05d}", f"City {code % 97}", rng.choice(["MA", "NY", "CA"])) for code in rng.sample(range(100000), 3000)]
+    path = str(tmp_path / "zipcodes.bin")
+    build_zip_table(rows, path)
+    table = ZipTable(path)
+    codes = [f"{rng.randrange(100000):05d}" for _ in range(2000)] + [row[0] for row in rows[:500]]
+    assert table.lookup_many(codes) == [table.lookup(code) for code in codes]
+    expected = {code: (state, city, ()) for code, city, state in rows}
+    assert [table.lookup(code) for code in codes[-500:]] == [expected[code] for code in codes[-500:]]
+    table.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "US.txt"
+    path.write_bytes(b"US\t02110\tBoston\tMassachusetts\tMA\n" * 4)
+    with pytest.raises(ValueError):
+        ZipTable(str(path))
+
+
+def test_bundled_zip_table(tmp_path, monkeypatch):
+    # The table shipped in app/data, mapped the way the API maps it
+    monkeypatch.setattr(zipcodes, "_table", None)
+    table = zipcodes.zip_table()
+    assert os.path.samefile(zipcodes.ZIP_TABLE_PATH, os.path.join(os.path.dirname(zipcodes.__file__), "data", "zipcodes.bin"))
+    assert len(table) > 40000
+    assert table.lookup("02139") == ("MA", "Cambridge", ())
+    assert table.lookup("01002") == ("MA", "Amherst", ("Cushman", "Pelham"))
+    assert resolve_property_address({"postal_code": "19104", "city": "phila"}) == {
+        "postal_code": "19104", "state_code": "PA", "city": "Phila",
+    }
+
+    # It is up to date with the bundled postal codes
+    path = str(tmp_path / "zipcodes.bin")
+    bundled = os.path.join(os.path.dirname(geo.__file__), "data", "US.txt.gz")
+    build_zip_table(((code, city, state_code) for code, city, state_code, _, _ in geo.read_geonames_postal_codes(bundled)), path)
+    with open(path, "rb") as built, open(zipcodes.ZIP_TABLE_PATH, "rb") as shipped:
+        assert built.read() == shipped.read()
+
+
+def test_zip_table_without_file(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(zipcodes, "_table", None)
+    monkeypatch.setattr(zipcodes, "_table_missing_logged", False)
+    monkeypatch.setattr(zipcodes, "ZIP_TABLE_PATH", str(tmp_path / "missing.bin"))
+    assert zipcodes.zip_table() is None
+    assert zipcodes.zip_table() is None
+    # Logged once, not on every address
+    assert [record.levelname for record in caplog.records] == ["WARNING"]
+    assert "missing.bin is missing" in caplog.text
+    address = {"postal_code": "99999", "state_code": "NY"}
+    assert resolve_property_address(address) is address
+
+
+@pytest.mark.parametrize("address,current,expected", [
+    ({"postal_code": "02110"}, None, {"postal_code": "02110", "state_code": "MA", "city": "Boston"}),
+    # State codes keep the client's spelling; cities take the table's
+    ({"postal_code": "02110", "state_code": "ma", "city": " BOSTON "}, None,
+     {"postal_code": "02110", "state_code": "ma", "city": "Boston"}),
+    # ZIP codes serve more places than their primary city
+    ({"postal_code": "02139", "city": "cambridgeport"}, None,
+     {"postal_code": "02139", "state_code": "MA", "city": "Cambridgeport"}),
+    ({"city": "Agana  Heights"}, {"postal_code": "96910"}, {"city": "Agana Heights"}),
+    ({"street": "1 Main St"}, None, {"street": "1 Main St"}),
+    ({"street": "1 Main St"}, {"postal_code": "02110", "state_code": "ma", "city": "Boston"}, {"street": "1 Main St"}),
+    ({"street": "1 Main St"}, {"postal_code": "02110"}, {"street": "1 Main St", "state_code": "MA", "city": "Boston"}),
+    ({"postal_code": "10001"}, {"postal_code": "02110", "state_code": "MA", "city": "Boston"},
+     {"postal_code": "10001", "state_code": "NY", "city": "New York"}),
+    ({"postal_code": "96910", "state_code": "MA"}, None, {"postal_code": "96910", "state_code": "MA", "city": "Hagåtña"}),
+    # Stored postal codes that are not ZIP codes cannot be checked
+    ({"state_code": "PA"}, {"postal_code": "Boston"}, {"state_code": "PA"}),
+])
+def test_resolve_property_address(table, address, current, expected):
+    assert resolve_property_address(address, current, table=table) == expected
+
+
+@pytest.mark.parametrize("address,current,message", [
+    ({"postal_code": "99999"}, None, zipcodes.UNKNOWN_POSTAL_CODE_MESSAGE),
+    ({"postal_code": "02110", "state_code": "NY"}, None, "Invalid State Code. Postal code 02110 is in MA."),
+    ({"state_code": "NY"}, {"postal_code": "02110", "state_code": "MA"}, "Invalid State Code. Postal code 02110 is in MA."),
+    ({"postal_code": "02110", "city": "Cambridge"}, None, "Invalid City. Postal code 02110 is in Boston."),
+    ({"city": "Salem"}, {"postal_code": "02139", "city": "Cambridge"}, "Invalid City. Postal code 02139 is in Cambridge."),
+])
+def test_resolve_property_address_rejects_mismatches(table, address, current, message):
+    with pytest.raises(ValueError) as error:
+        resolve_property_address(address, current, table=table)
+    assert str(error.value) == message
+
+
+@pytest.fixture()
+def setup_db(table, monkeypatch):
+    monkeypatch.setattr(zipcodes, "_table", table)
+    customer_cache.clear()
+    db = get_test_db()
+    yield db
+    db.query(PropertyAddressModel).delete()
+    db.query(CustomerModel).delete()
+    db.commit()
+    db.close()
+    customer_cache.clear()
+
+
+def test_create_customer_fills_in_address(setup_db):
+    created = create_customer({
+        "first_name": "Zip", "last_name": "Code", "email": "zip@example.com",
+        "property_address": {"street": "1 Main St", "postal_code": "02139"},
+    }, setup_db)
+    assert created.property_address.state_code == "MA"
+    assert created.property_address.city == "Cambridge"
+
+
+def test_create_customer_rejects_mismatched_address(setup_db):
+    for address in ({"postal_code": "02139", "state_code": "NY"}, {"postal_code": "02139", "city": "Boston"},
+                    {"postal_code": "99999"}):
+        with pytest.raises(HTTPException) as e:
+            create_customer({"first_name": "Zip", "last_name": "Code", "email": "zip@example.com",
+                             "property_address": address}, setup_db)
+        assert e.value.status_code == 400
+    assert setup_db.query(CustomerModel).count() == 0
+
+
+def test_patch_customer_checks_address(setup_db):
+    created = create_customer({
+        "first_name": "Zip", "last_name": "Code", "email": "zip@example.com",
+        "property_address": {"street": "1 Main St", "city": "Boston", "postal_code": "02110"},
+    }, setup_db)
+
+    with pytest.raises(HTTPException) as e:
+        patch_customer(created.id, {"property_address": {"state_code": "NY"}}, setup_db)
+    assert e.value.status_code == 400
+
+    with pytest.raises(HTTPException) as e:
+        patch_customer(created.id, {"property_address": {"city": "Worcester"}}, setup_db)
+    assert e.value.status_code == 400
+
+    patched = patch_customer(created.id, {"property_address": {"postal_code": "10001"}}, setup_db)
+    assert (patched.property_address.state_code, patched.property_address.city) == ("NY", "New York")
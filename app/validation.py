@@ -0,0 +1,194 @@
+import re
+from pathlib import Path
+import yaml
+from app.helpers import validate_email
+
+"""
+Defines request validators compiled from the OpenAPI specification in customers.yaml.
+
+The request body schemas of POST /customer and PATCH /customer/{customerId} are read from
+the specification once, at import, and each is compiled into a single Python function:
+generated source with one branch per property, in schema order, for the keywords the
+specification uses (required, type, nullable, minLength, maxLength, pattern, format and
+nested object properties). A validator makes one pass over a payload and returns every
+error it finds, so the specification stays the single description of what a valid
+request is. Properties the schema does not list are not checked.
+
+Each property reports at most one error: its message from ERROR_MESSAGES (the messages
+the API has always used), or a generic one built from its path.
+
+This module contains:
+- compile_validator: generate the validator of an object schema
+- request_body_schema: the JSON request body schema of an operation in the specification
+- validate_customer_create / validate_customer_patch: the validators of the customer routes
+- iter_validation_errors: validate many payloads lazily, for bulk and streamed ingest
+"""
+
+SPEC_PATH = Path(__file__).resolve().parent.parent / "customers.yaml"
+
+REQUIRED_MESSAGE = "Missing Required Information"
+BODY_MESSAGE = "Request body should be an object"
+# Messages by property path, kept from the checks these validators replace
+ERROR_MESSAGES = {
+    "email": "Please enter correct email - abc@xyz.com",
+    "electricity_usage_kwh": "electricity_usage_kwh should be number",
+    "old_roof": "old_roof should be boolean",
+    "property_address.postal_code": "Invalid Postal Code. It should be a 5-digit number.",
+    "property_address.state_code": "Invalid State Code. It should be at most 5 characters.",
+}
+
+# Type checks by schema type, as expressions of {value}. Types are compared exactly, as
+# decoded JSON holds no subclasses, which also keeps booleans from passing as integers.
+TYPE_CHECKS = {
+    "string": "{value}.__class__ is str",
+    "integer": "{value}.__class__ is int",
+    "number": "({value}.__class__ is int or {value}.__class__ is float)",
+    "boolean": "({value} is True or {value} is False)",
+    "object": "{value}.__class__ is dict",
+}
+FORMAT_CHECKS = {
+    "email": validate_email,
+}
+SUPPORTED_KEYWORDS = {"type", "nullable", "properties", "required", "minLength", "maxLength", "pattern", "format",
+                      "description", "title"}
+
+
+class _Compiler:
+    def __init__(self, messages: dict):
+        self.messages = messages
+        self.namespace = {}
+        self.lines = []
+        self.variables = 0
+
+    def constant(self, value) -> str:
+        name = f"_constant_{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    def emit(self, indent: int, line: str):
+        self.lines.append("    " * indent + line)
+
+    def error(self, indent: int, message: str):
+        self.emit(indent, f"errors.append({message!r})")
+
+    def object_checks(self, schema: dict, variable: str, path: str, indent: int):
+        required = schema.get("required", [])
+        if required:
+            condition = " and ".join(f"{name!r} in {variable}" for name in required)
+            self.emit(indent, f"if not ({condition}):")
+            message = REQUIRED_MESSAGE if not path else f"{path} should have {', '.join(required)}"
+            self.error(indent + 1, message)
+        for name, property_schema in schema.get("properties", {}).items():
+            self.variables += 1
+            value = f"value_{self.variables}"
+            self.emit(indent, f"if {name!r} in {variable}:")
+            self.emit(indent + 1, f"{value} = {variable}[{name!r}]")
+            self.property_checks(property_schema, value, f"{path}.{name}" if path else name, indent + 1)
+
+    def property_checks(self, schema: dict, value: str, path: str, indent: int):
+        unsupported = set(schema) - SUPPORTED_KEYWORDS
+        if unsupported:
+            raise ValueError(f"Unsupported schema keywords at {path}: {', '.join(sorted(unsupported))}")
+        schema_type = schema.get("type")
+        if schema_type not in TYPE_CHECKS:
+            raise ValueError(f"Unsupported type at {path}: {schema_type}")
+
+        branch = "if"
+        if schema.get("nullable"):
+            self.emit(indent, f"if {value} is None:")
+            self.emit(indent + 1, "pass")
+            branch = "elif"
+        self.emit(indent, f"{branch} not ({TYPE_CHECKS[schema_type].format(value=value)}):")
+        self.error(indent + 1, self.messages.get(path, f"{path} should be {schema_type}"))
+
+        constraints = []
+        if "minLength" in schema and schema["minLength"] == schema.get("maxLength"):
+            constraints.append(f"len({value}) == {int(schema['minLength'])}")
+        else:
+            if "minLength" in schema:
+                constraints.append(f"len({value}) >= {int(schema['minLength'])}")
+            if "maxLength" in schema:
+                constraints.append(f"len({value}) <= {int(schema['maxLength'])}")
+        if "pattern" in schema:
+            # JSON Schema patterns match anywhere unless anchored
+            constraints.append(f"{self.constant(re.compile(schema['pattern']).search)}({value}) is not None")
+        if "format" in schema:
+            if schema["format"] not in FORMAT_CHECKS:
+                raise ValueError(f"Unsupported format at {path}: {schema['format']}")
+            constraints.append(f"{self.constant(FORMAT_CHECKS[schema['format']])}({value})")
+        if constraints:
+            self.emit(indent, f"elif not ({' and '.join(constraints)}):")
+            self.error(indent + 1, self.messages.get(path, f"{path} is invalid"))
+
+        if schema_type == "object" and (schema.get("properties") or schema.get("required")):
+            self.emit(indent, "else:")
+            self.object_checks(schema, value, path, indent + 1)
+
+
+def compile_validator(schema: dict, name: str = "payload", messages: dict = ERROR_MESSAGES):
+    """
+    Generate a function checking a decoded JSON payload against an object schema.
+
+    Parameters:
+    - schema (dict): OpenAPI 3.0 schema of type object.
+    - name (str): Name of what is validated, used in the function's name and docstring.
+    - messages (dict): Error messages by dotted property path, e.g. "property_address.postal_code".
+
+    Returns:
+    - callable: validate(payload) -> list of error messages, empty when the payload is valid.
+
+    Raises:
+    - ValueError: If the schema uses a keyword, type or format the compiler does not support.
+    """
+    if schema.get("type") != "object":
+        raise ValueError("Request body schemas should be objects")
+    compiler = _Compiler(messages)
+    compiler.emit(1, "if not isinstance(payload, dict):")
+    compiler.emit(2, f"return [{BODY_MESSAGE!r}]")
+    compiler.emit(1, "errors = []")
+    compiler.object_checks(schema, "payload", "", 1)
+    compiler.emit(1, "return errors")
+    source = "def validate(payload):\n" + "\n".join(compiler.lines) + "\n"
+    exec(compile(source, f"<validator {name}>", "exec"), compiler.namespace)
+    validate = compiler.namespace["validate"]
+    validate.__name__ = f"validate_{name}"
+    validate.__doc__ = f"Return the errors of a {name}, empty if it is valid."
+    return validate
+
+
+def request_body_schema(spec: dict, path: str, method: str) -> dict:
+    """
+    Return the application/json request body schema of an operation of an OpenAPI spec.
+    """
+    return spec["paths"][path][method]["requestBody"]["content"]["application/json"]["schema"]
+
+
+def load_spec(path: Path = SPEC_PATH) -> dict:
+    """
+    Read an OpenAPI specification, with the libyaml parser when PyYAML was built with it.
+    """
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(path, encoding="utf-8") as spec_file:
+        return yaml.load(spec_file, Loader=loader)
+
+
+def iter_validation_errors(validate, payloads):
+    """
+    Validate payloads one at a time, for bulk and streamed ingest.
+
+    Args:
+    - validate (callable): Validator from compile_validator.
+    - payloads (iterable): Decoded payloads, consumed lazily.
+
+    Yields:
+    - tuple: (index, errors) for every invalid payload.
+    """
+    for index, payload in enumerate(payloads):
+        errors = validate(payload)
+        if errors:
+            yield index, errors
+
+
+_spec = load_spec()
+validate_customer_create = compile_validator(request_body_schema(_spec, "/customer", "post"), "customer_create")
+validate_customer_patch = compile_validator(request_body_schema(_spec, "/customer/{customerId}", "patch"), "customer_patch")
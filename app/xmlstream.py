@@ -0,0 +1,95 @@
+import re
+from xml.sax.saxutils import escape
+from starlette.responses import Response
+
+"""
+Defines the XML representation of customers, served as application/xml.
+
+Documents are written as text, element by element, from the same dicts the JSON endpoints
+use (see app.serializers); no DOM is built. A customer is a <customer> element with one
+child element per field in schema order, property_address nested the same way. Fields
+that are None are left out, booleans are written as true/false.
+
+    <?xml version="1.0" encoding="UTF-8"?>
+    <customers><customer><id>...</id><first_name>...</first_name>...</customer>...</customers>
+
+This module contains:
+- encode_customer_xml: a customer as a <customer> document
+- iter_customers_xml: a <customers> document written incrementally from an iterable of customers
+- XMLResponse: response with the XML media type
+"""
+
+XML_MEDIA_TYPE = "application/xml"
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+# Streamed documents are sent in chunks of at least this many bytes (UTF-8 characters)
+XML_CHUNK_SIZE = 64 * 1024
+
+# Characters XML 1.0 does not allow, even escaped
+_INVALID_XML_CHARACTERS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def _text(value) -> str:
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, str):
+        return escape(_INVALID_XML_CHARACTERS.sub("\ufffd", value))
+    return str(value)
+
+
+def _write_elements(content: dict, parts: list):
+    for name, value in content.items():
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            parts.append(f"<{name}>")
+            _write_elements(value, parts)
+            parts.append(f"</{name}>")
+        else:
+            parts.append(f"<{name}>{_text(value)}</{name}>")
+
+
+def customer_element(content: dict) -> str:
+    """
+    Return a customer dict, shaped as Customer or CustomerResponse, as a <customer> element.
+    """
+    parts = ["<customer>"]
+    _write_elements(content, parts)
+    parts.append("</customer>")
+    return "".join(parts)
+
+
+def encode_customer_xml(content: dict) -> bytes:
+    """
+    Encode a customer dict as a UTF-8 XML document whose root is <customer>.
+    """
+    return (XML_DECLARATION + customer_element(content)).encode("utf-8")
+
+
+def iter_customers_xml(contents, chunk_size: int = XML_CHUNK_SIZE):
+    """
+    Write a <customers> document incrementally.
+
+    Args:
+    - contents (iterable): Customer dicts, consumed lazily.
+    - chunk_size (int): Characters buffered before a chunk is yielded.
+
+    Yields:
+    - bytes: UTF-8 chunks of the document; only one chunk is held at a time.
+    """
+    parts = [XML_DECLARATION, "<customers>"]
+    buffered = 0
+    for content in contents:
+        element = customer_element(content)
+        parts.append(element)
+        buffered += len(element)
+        if buffered >= chunk_size:
+            yield "".join(parts).encode("utf-8")
+            parts, buffered = [], 0
+    parts.append("</customers>")
+    yield "".join(parts).encode("utf-8")
+
+
+class XMLResponse(Response):
+    media_type = XML_MEDIA_TYPE
@@ -0,0 +1,327 @@
+import array
+import bisect
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from app.models.types import STATE_CODES, STATE_CODE_VALUES, normalize_state_code
+
+"""
+Defines the offline ZIP code reference table used to validate and complete property addresses.
+
+The table maps every 5-digit ZIP code to its state, its primary city and the other cities
+it serves. It is built from the bundled postal code file (see app.geo) into one compact
+binary file, ZIP_TABLE_PATH, which ships with the repository as app/data/zipcodes.bin:
+    python -m app.zipcodes [app/data/US.txt.gz [app/data/zipcodes.bin]]
+
+The file is memory-mapped once per process, on first use, and never copied into Python
+objects: lookups binary-search the sorted ZIP column in place, and only the matching
+record is decoded. Pages are shared through the OS page cache by every process mapping the
+file, so a worker's cost is bounded by the size of the file (under 1 MB for the US).
+
+File layout, all integers little-endian:
+- header: HEADER (magic, version, reserved, records, cities, other city references, city bytes)
+- zips: records x uint32, sorted ascending
+- states: records x uint8, the STATE_CODE_VALUES value, 0 when unknown, padded to 4 bytes
+- city_ids: records x uint32, the index of the record's primary city name
+- other_city_starts: (records + 1) x uint32, the start of each record's other cities in
+  other_city_ids
+- other_city_ids: uint32 indexes of the other city names of every record
+- city_offsets: (cities + 1) x uint32, the start of each city name in city_bytes
+- city_bytes: the UTF-8 city names, deduplicated
+
+This module contains:
+- build_zip_table: write the table file from (postal_code, city, state_code) rows
+- ZipTable: a memory-mapped table, with lookup and lookup_many for batches
+- zip_table: the process-wide table, None (with a warning) when the table file is missing
+- resolve_property_address: check a property address against the table and fill in its
+  state code and city
+"""
+
+logger = logging.getLogger(__name__)
+
+ZIP_TABLE_PATH = os.environ.get(
+    "ZIP_TABLE_PATH", os.path.join(os.path.dirname(__file__), "data", "zipcodes.bin")
+)
+MAGIC = b"ZIPT"
+VERSION = 2
+HEADER = struct.Struct("<4sHHIIII")
+
+POSTAL_CODE = "postal_code"
+STATE_CODE = "state_code"
+CITY = "city"
+UNKNOWN_POSTAL_CODE_MESSAGE = "Invalid Postal Code. It is not a known US ZIP code."
+
+
+def _padded(size: int) -> int:
+    return (size + 3) & ~3
+
+
+def _little_endian(values: array.array) -> bytes:
+    if sys.byteorder == "big":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _city_key(city: str) -> str:
+    # Cities compare ignoring case and runs of whitespace
+    return " ".join(city.split()).casefold()
+
+
+def build_zip_table(rows, path: str) -> int:
+    """
+    Write a ZIP table file.
+
+    Parameters:
+    - rows (iterable): (postal_code, city, state_code) tuples; postal codes are 5-digit
+      strings. The first row of a postal code gives its state and primary city, later
+      rows the other cities it serves. State codes that are not USPS state codes are
+      stored as unknown.
+    - path (str): Path of the file to write, replaced atomically. The same rows always
+      give the same bytes.
+
+    Returns:
+    - int: The number of postal codes written.
+    """
+    entries = {}
+    for postal_code, city, state_code in rows:
+        code = int(postal_code)
+        if code not in entries:
+            entries[code] = (STATE_CODE_VALUES.get(normalize_state_code(state_code), 0), city, [])
+        elif all(_city_key(city) != _city_key(known) for known in [entries[code][1]] + entries[code][2]):
+            entries[code][2].append(city)
+
+    zips = array.array("I", sorted(entries))
+    states = bytearray(_padded(len(zips)))
+    city_ids = array.array("I")
+    other_city_starts = array.array("I", [0])
+    other_city_ids = array.array("I")
+    city_index = {}
+    city_offsets = array.array("I", [0])
+    city_bytes = bytearray()
+
+    def city_id(city):
+        if city not in city_index:
+            city_index[city] = len(city_offsets) - 1
+            city_bytes.extend(city.encode("utf-8"))
+            city_offsets.append(len(city_bytes))
+        return city_index[city]
+
+    for position, code in enumerate(zips):
+        state, city, other_cities = entries[code]
+        states[position] = state
+        city_ids.append(city_id(city))
+        other_city_ids.extend(city_id(other_city) for other_city in other_cities)
+        other_city_starts.append(len(other_city_ids))
+
+    header = HEADER.pack(MAGIC, VERSION, 0, len(zips), len(city_offsets) - 1, len(other_city_ids), len(city_bytes))
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as output:
+        for part in (header, _little_endian(zips), states, _little_endian(city_ids), _little_endian(other_city_starts),
+                     _little_endian(other_city_ids), _little_endian(city_offsets), city_bytes):
+            output.write(part)
+    os.replace(temporary, path)
+    return len(zips)
+
+
+class ZipTable:
+    """
+    Memory-mapped ZIP table, read from a file written by build_zip_table.
+
+    Parameters:
+    - path (str): Path of the table file.
+
+    Raises:
+    - ValueError: If the file is not a ZIP table of this version.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as table_file:
+            self._map = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise ValueError(f"{path} is not a ZIP table")
+        magic, version, _, records, cities, other_cities, city_size = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} ZIP table")
+
+        # Typed views over the mapping; slicing a memoryview copies nothing
+        view = memoryview(self._map)
+        offset = HEADER.size
+        self.zips = self._uint32s(view, offset, records)
+        offset += 4 * records
+        self.states = view[offset:offset + records]
+        offset += _padded(records)
+        self.city_ids = self._uint32s(view, offset, records)
+        offset += 4 * records
+        self.other_city_starts = self._uint32s(view, offset, records + 1)
+        offset += 4 * (records + 1)
+        self.other_city_ids = self._uint32s(view, offset, other_cities)
+        offset += 4 * other_cities
+        self.city_offsets = self._uint32s(view, offset, cities + 1)
+        offset += 4 * (cities + 1)
+        self.city_bytes = view[offset:offset + city_size]
+
+    @staticmethod
+    def _uint32s(view: memoryview, offset: int, count: int):
+        column = view[offset:offset + 4 * count]
+        if sys.byteorder == "little":
+            return column.cast("I")
+        # Big-endian machines read a swapped copy instead of the mapping
+        values = array.array("I", column)
+        values.byteswap()
+        column.release()
+        return memoryview(values)
+
+    def __len__(self):
+        return len(self.zips)
+
+    def _city(self, city_id: int) -> str:
+        return str(self.city_bytes[self.city_offsets[city_id]:self.city_offsets[city_id + 1]], "utf-8")
+
+    def _entry(self, position: int) -> tuple:
+        state = self.states[position]
+        other_city_ids = self.other_city_ids[self.other_city_starts[position]:self.other_city_starts[position + 1]]
+        return (STATE_CODES[state - 1] if state else None, self._city(self.city_ids[position]),
+                tuple(self._city(city_id) for city_id in other_city_ids))
+
+    def lookup(self, postal_code: str):
+        """
+        Look up a 5-digit postal code with a binary search of the mapped ZIP column.
+
+        Returns:
+        - tuple: (state_code, city, other_cities), state_code None when unknown and
+          other_cities a tuple of the other cities the postal code serves, or None if the
+          postal code is not in the table.
+        """
+        code = int(postal_code)
+        position = bisect.bisect_left(self.zips, code)
+        if position == len(self.zips) or self.zips[position] != code:
+            return None
+        return self._entry(position)
+
+    def lookup_many(self, postal_codes) -> list:
+        """
+        Look up a batch of 5-digit postal codes, e.g. the rows of a bulk import.
+
+        The distinct codes are searched in ascending order, each search starting where the
+        previous one ended, and every code is decoded once however often it repeats.
+
+        Returns:
+        - list: lookup() of each postal code, in the order given.
+        """
+        postal_codes = list(postal_codes)
+        found = {}
+        low = 0
+        for code in sorted({int(postal_code) for postal_code in postal_codes}):
+            low = bisect.bisect_left(self.zips, code, low)
+            if low == len(self.zips):
+                break
+            if self.zips[low] == code:
+                found[code] = self._entry(low)
+        return [found.get(int(postal_code)) for postal_code in postal_codes]
+
+    def close(self):
+        for view in (self.zips, self.states, self.city_ids, self.other_city_starts, self.other_city_ids,
+                     self.city_offsets, self.city_bytes):
+            view.release()
+        self._map.close()
+
+
+_table = None
+_table_missing_logged = False
+_table_lock = threading.Lock()
+
+
+def zip_table():
+    """
+    Return the process-wide ZipTable, mapping ZIP_TABLE_PATH on first use.
+
+    A missing table file is logged as a warning, once: property addresses are then stored
+    without being checked.
+
+    Returns:
+    - ZipTable: The table, or None if the table file is missing.
+    """
+    global _table, _table_missing_logged
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                if os.path.exists(ZIP_TABLE_PATH):
+                    _table = ZipTable(ZIP_TABLE_PATH)
+                elif not _table_missing_logged:
+                    _table_missing_logged = True
+                    logger.warning("ZIP table %s is missing; property addresses are not checked. "
+                                   "Build it with: python -m app.zipcodes", ZIP_TABLE_PATH)
+    return _table
+
+
+def resolve_property_address(property_address: dict, current: dict = None, table: ZipTable = None) -> dict:
+    """
+    Check a property address against the ZIP table and fill in what the table knows.
+
+    The postal code is the address's own, or the current one when it is not given. A state
+    code given with it must be the postal code's state in any letter case, and is stored
+    upper-cased; a missing one is filled in, as is the current one when the postal code
+    changes. A city given with it must be the postal code's primary city or one of the
+    other cities it serves, ignoring case and extra whitespace, and takes the table's
+    spelling. A missing city is filled in with the primary city, as is the current city
+    when the postal code changes.
+
+    Parameters:
+    - property_address (dict): The property address of a validated request payload.
+    - current (dict): The stored postal_code, state_code and city, for a partial update.
+    - table (ZipTable): The table to use, zip_table() when None.
+
+    Returns:
+    - dict: The property address to store, a copy when anything was filled in. Returned
+      unchanged when there is no 5-digit postal code or the table is missing.
+
+    Raises:
+    - ValueError: If the postal code is unknown, or the state code or city does not match it.
+    """
+    table = table or zip_table()
+    current = current or {}
+    postal_code = property_address.get(POSTAL_CODE, current.get(POSTAL_CODE))
+    # Stored postal codes from before payloads were validated may not be ZIP codes at all
+    if table is None or postal_code is None or not (len(postal_code) == 5 and postal_code.isdigit()):
+        return property_address
+    entry = table.lookup(postal_code)
+    if entry is None:
+        raise ValueError(UNKNOWN_POSTAL_CODE_MESSAGE)
+    state_code, city, other_cities = entry
+
+    resolved = dict(property_address)
+    if state_code is not None:
+        given = property_address.get(STATE_CODE)
+        if given is None:
+            if POSTAL_CODE in property_address or current.get(STATE_CODE) is None:
+                resolved[STATE_CODE] = state_code
+        elif normalize_state_code(given) != state_code:
+            raise ValueError(f"Invalid State Code. Postal code {postal_code} is in {state_code}.")
+
+    given = property_address.get(CITY)
+    if given is not None:
+        known = {_city_key(known_city): known_city for known_city in (city,) + other_cities}
+        if _city_key(given) not in known:
+            raise ValueError(f"Invalid City. Postal code {postal_code} is in {city}.")
+        resolved[CITY] = known[_city_key(given)]
+    elif POSTAL_CODE in property_address or current.get(CITY) is None:
+        resolved[CITY] = city
+    return resolved
+
+
+if __name__ == "__main__":
+    from app.geo import POSTAL_CENTROIDS_PATH, read_geonames_postal_codes
+
+    # Built from the bundled postal code file unless another GeoNames-format file is given
+    source = sys.argv[1] if len(sys.argv) > 1 else POSTAL_CENTROIDS_PATH
+    target = sys.argv[2] if len(sys.argv) > 2 else ZIP_TABLE_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    count = build_zip_table(
+        ((postal_code, city, state_code) for postal_code, city, state_code, _, _ in read_geonames_postal_codes(source)),
+        target,
+    )
+    print(f"{count} postal codes written to {target}")
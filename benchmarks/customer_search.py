@@ -0,0 +1,101 @@
+"""
+Benchmark the in-memory customer search index behind GET /customers/search.
+
+Loads synthetic customers into a CustomerSearchIndex, then reports the build time, the
+memory the index holds and search latency percentiles for autocomplete-style queries:
+name and city prefixes, and email substrings.
+
+Usage (from the repository root):
+    python -m benchmarks.customer_search --rows 1000000
+    python -m benchmarks.customer_search --rows 200000 --queries 5000 --limit 20
+"""
+
+import argparse
+import random
+import string
+import time
+import tracemalloc
+import uuid
+from app.search import CustomerSearchIndex
+
+FIRST_NAMES = ["james", "mary", "robert", "patricia", "john", "jennifer", "michael", "linda", "david", "elizabeth",
+               "william", "barbara", "richard", "susan", "joseph", "jessica", "thomas", "sarah", "charles", "karen",
+               "anna", "noah", "olivia", "liam", "emma", "ava", "sophia", "mia", "lucas", "ethan"]
+CITIES = ["boston", "cambridge", "somerville", "new york", "philadelphia", "pittsburgh", "newton", "salem",
+          "springfield", "worcester", "lowell", "quincy", "brookline", "providence", "hartford", "albany"]
+
+
+def random_word(rng, low, high):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def synthetic_rows(rng, count):
+    for index in range(count):
+        first_name = rng.choice(FIRST_NAMES).title()
+        last_name = random_word(rng, 4, 9).title()
+        email = f"{first_name.lower()}.{last_name.lower()}{index}@{random_word(rng, 4, 8)}.com"
+        city = rng.choice(CITIES).title() if rng.random() < 0.9 else None
+        yield str(uuid.uuid4()), first_name, last_name, email, city
+
+
+def sample_queries(rng, rows, count):
+    queries = []
+    for _ in range(count):
+        _, first_name, last_name, email, city = rng.choice(rows)
+        kind = rng.random()
+        if kind < 0.4:
+            queries.append(last_name[:rng.randint(2, 5)])
+        elif kind < 0.6:
+            queries.append(f"{first_name} {last_name[:2]}")
+        elif kind < 0.8 and city:
+            queries.append(city[:rng.randint(2, 6)])
+        else:
+            start = rng.randint(0, max(0, len(email) - 6))
+            queries.append(email[start:start + rng.randint(4, 6)])
+    return queries
+
+
+def percentile(samples, percent):
+    return samples[max(0, int(round(percent / 100 * len(samples))) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = list(synthetic_rows(rng, args.rows))
+    index = CustomerSearchIndex()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    index.load(rows)
+    build_seconds = time.perf_counter() - started
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # A burst of incremental writes, as create/patch would do, before measuring reads
+    started = time.perf_counter()
+    for row in synthetic_rows(rng, 10000):
+        index.add(*row)
+    add_seconds = (time.perf_counter() - started) / 10000
+
+    queries = sample_queries(rng, rows, args.queries)
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, args.limit)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+
+    print(f"{args.rows} customers, {args.queries} queries, limit {args.limit}")
+    print(f"build {build_seconds:.1f} s, index {index_bytes / 2 ** 20:.0f} MiB, incremental add {add_seconds * 1e6:.0f} us")
+    print(" ".join(f"p{percent} {percentile(latencies, percent) * 1e6:.0f} us" for percent in (50, 95, 99, 99.9)))
+
+
+if __name__ == "__main__":
+    main()
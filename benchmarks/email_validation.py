@@ -0,0 +1,62 @@
+"""
+Benchmark validate_email against the regular expression it replaced.
+
+Reports the time per address for typical addresses (one call at a time and through
+validate_emails for a bulk batch), then for adversarial addresses: a long run of digits
+before an invalid character, on which the replaced pattern backtracks in cubic time. The replaced pattern
+is only run up to --max-original-length characters.
+
+Usage (from the repository root):
+    python -m benchmarks.email_validation
+    python -m benchmarks.email_validation --lengths 250 500 1000 2000 --max-original-length 2000
+"""
+
+import argparse
+import re
+import time
+from app.helpers import validate_email, validate_emails
+
+ORIGINAL_PATTERN = r'^[A-Za-z0-9]+[.-_]*[A-Za-z0-9]+@[A-Za-z0-9-]+(\.[A-Z|a-z]{2,})+$'
+
+
+def original_validate_email(email):
+    return re.fullmatch(ORIGINAL_PATTERN, email) is not None
+
+
+def seconds_per_call(function, values, repeat=1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for value in values:
+            function(value)
+    return (time.perf_counter() - started) / (repeat * len(values))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=100000)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[250, 500, 1000, 100000])
+    parser.add_argument("--max-original-length", type=int, default=1000)
+    args = parser.parse_args()
+
+    typical = [f"customer.{index}@example{index % 7}.com" for index in range(args.batch)]
+    typical += [f"bad {index}@example" for index in range(args.batch // 10)]
+    original = seconds_per_call(original_validate_email, typical)
+    scanner = seconds_per_call(validate_email, typical)
+    started = time.perf_counter()
+    validate_emails(typical)
+    batch = (time.perf_counter() - started) / len(typical)
+    print(f"typical addresses: original {original * 1e6:.2f} us, scanner {scanner * 1e6:.2f} us, "
+          f"validate_emails {batch * 1e6:.2f} us per address")
+
+    for length in args.lengths:
+        adversarial = "1" * length + "!@example.com"
+        scanner = seconds_per_call(validate_email, [adversarial], repeat=10)
+        if length <= args.max_original_length:
+            original = f"{seconds_per_call(original_validate_email, [adversarial]) * 1e3:10.1f} ms"
+        else:
+            original = "   skipped"
+        print(f"adversarial, {length:>7} characters: original {original}, scanner {scanner * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark a state + postal code prefix filter on the old and new property_address schema.
+
+The old schema stores postal_code as String(255) and state_code as String(5) without indexes,
+so the filter is a LIKE 'prefix%' over a full table scan. The new schema stores CHAR(5) postal
+codes and upper-cased state codes under the (state_code, postal_code) index, so the filter is
+one index range scan.
+
+Usage (from the repository root):
+    python -m benchmarks.geo_filter --rows 1000000
+    python -m benchmarks.geo_filter --rows 200000 --prefix 021 --url sqlite:////tmp/geo_filter.db
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import CHAR, Column, Index, Integer, MetaData, String, Table, and_, bindparam, create_engine, func, select
+from app.helpers import prefix_range
+from app.models.types import STATE_CODES, stored_state_code
+
+BATCH_SIZE = 50000
+
+
+def build_tables(metadata):
+    old = Table(
+        "bench_geo_old", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("street", String(255)),
+        Column("postal_code", String(255)),
+        Column("state_code", String(5)),
+    )
+    new = Table(
+        "bench_geo_new", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("street", String(255)),
+        Column("postal_code", CHAR(5)),
+        Column("state_code", String(5)),
+        Index("ix_bench_geo_new_state_postal", "state_code", "postal_code"),
+    )
+    return old, new
+
+
+def load(engine, table, rows):
+    with engine.begin() as connection:
+        for start in range(0, len(rows), BATCH_SIZE):
+            connection.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+
+def time_queries(engine, query, params, repeats):
+    with engine.connect() as connection:
+        matches = connection.execute(query, params).scalar()
+        started = time.perf_counter()
+        for _ in range(repeats):
+            connection.execute(query, params).scalar()
+        elapsed = time.perf_counter() - started
+    return matches, elapsed / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--state", default="MA")
+    parser.add_argument("--prefix", default="02")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--url", default=None, help="database URL; defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'geo_filter.db')}"
+    engine = create_engine(url)
+    metadata = MetaData()
+    old, new = build_tables(metadata)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    rows = [
+        {"id": index, "street": f"{index} test road", "postal_code": f"{random.randrange(100000):05d}",
+         "state_code": random.choice(STATE_CODES)}
+        for index in range(args.rows)
+    ]
+    load(engine, old, rows)
+    load(engine, new, rows)
+
+    low, high = prefix_range(args.prefix)
+    queries = {
+        "String + LIKE": (
+            select(func.count()).select_from(old).where(and_(
+                old.c.state_code == bindparam("state"), old.c.postal_code.like(bindparam("pattern")),
+            )),
+            {"state": args.state, "pattern": f"{args.prefix}%"},
+        ),
+        "Indexed + range": (
+            select(func.count()).select_from(new).where(and_(
+                new.c.state_code == bindparam("state"),
+                new.c.postal_code >= bindparam("low"), new.c.postal_code < bindparam("high"),
+            )),
+            {"state": stored_state_code(args.state), "low": low, "high": high},
+        ),
+    }
+
+    print(f"{args.rows} rows, state {args.state}, postal prefix {args.prefix!r}, {engine.dialect.name}")
+    print(f"{'schema':<18} {'matches':>8} {'query ms':>10}")
+    for label, (query, params) in queries.items():
+        matches, seconds = time_queries(engine, query, params, args.repeats)
+        print(f"{label:<18} {matches:>8} {seconds * 1e3:>10.2f}")
+
+    metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark JSON encoding and decoding per request: Starlette's JSONResponse and json.loads
+against FastJSONResponse and app.fastjson.loads (orjson when installed).
+
+Reports the CPU time per request to render a single customer response, a list response
+of --page customers, and to parse a create-customer request body.
+
+Usage (from the repository root):
+    python -m benchmarks.json_encoding
+    python -m benchmarks.json_encoding --page 1000 --repeat 2000
+"""
+
+import argparse
+import json
+import time
+import uuid
+from fastapi.responses import JSONResponse
+from app import fastjson
+from app.fastjson import FastJSONResponse
+
+
+def customer(index):
+    return {
+        "id": str(uuid.uuid4()), "first_name": f"First{index}", "last_name": f"Last{index}",
+        "email": f"customer{index}@example.com", "electricity_usage_kwh": 1000 + index, "old_roof": index % 2 == 0,
+        "property_address": {"id": str(uuid.uuid4()), "street": f"{index} Main St", "city": "Boston",
+                             "state_code": "MA", "postal_code": "02110"},
+    }
+
+
+def cpu_per_call(function, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        function()
+    return (time.process_time() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5000)
+    args = parser.parse_args()
+
+    single = customer(0)
+    page = [customer(index) for index in range(args.page)]
+    body = json.dumps({key: value for key, value in single.items() if key != "id"}).encode()
+    print(f"fast encoder: {'orjson' if fastjson.orjson is not None else 'stdlib json (orjson not installed)'}")
+
+    cases = [
+        ("single response", lambda: JSONResponse(single), lambda: FastJSONResponse(single), args.repeat),
+        (f"list of {args.page}", lambda: JSONResponse(page), lambda: FastJSONResponse(page), max(1, args.repeat // 10)),
+        ("request body", lambda: json.loads(body), lambda: fastjson.loads(body), args.repeat),
+    ]
+    for name, default, fast, repeat in cases:
+        default_seconds = cpu_per_call(default, repeat)
+        fast_seconds = cpu_per_call(fast, repeat)
+        print(f"{name:>16}: default {default_seconds * 1e6:8.1f} us, fast {fast_seconds * 1e6:8.1f} us, "
+              f"saved {(1 - fast_seconds / default_seconds) * 100:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark serializing a GET /customers page: the response_model path (Customer.from_orm,
+FastAPI validation and jsonable_encoder) against the compiled serializer over rows.
+
+Both paths render with FastJSONResponse, so the difference is the serialization alone.
+
+Usage (from the repository root):
+    python -m benchmarks.list_serialization
+    python -m benchmarks.list_serialization --page 1000 --repeat 50
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections import namedtuple
+from fastapi.routing import serialize_response
+from app.fastjson import FastJSONResponse
+from app.routers.customer import router, read_customers
+from app.schemas.customer import Customer
+from app.serializers import serialize_customer
+
+Row = namedtuple("Row", list(Customer.__fields__))
+
+
+def rows(count):
+    return [Row(str(uuid.uuid4()), f"First{index}", f"Last{index}", f"customer{index}@example.com", 1000 + index, index % 2 == 0)
+            for index in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    page = rows(args.page)
+    field = next(route for route in router.routes if route.endpoint is read_customers).response_field
+    loop = asyncio.new_event_loop()
+
+    def response_model_path():
+        content = [Customer.from_orm(row) for row in page]
+        return FastJSONResponse(loop.run_until_complete(serialize_response(field=field, response_content=content)))
+
+    def compiled_path():
+        return FastJSONResponse([serialize_customer(row) for row in page])
+
+    assert response_model_path().body == compiled_path().body
+    for name, path in (("response_model", response_model_path), ("compiled", compiled_path)):
+        started = time.process_time()
+        for _ in range(args.repeat):
+            path()
+        seconds = (time.process_time() - started) / args.repeat
+        print(f"{name:>14}: {seconds * 1e3:7.3f} ms per page of {args.page}")
+
+
+if __name__ == "__main__":
+    main()
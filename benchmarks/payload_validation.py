@@ -0,0 +1,72 @@
+"""
+Benchmark the create-customer validator compiled from customers.yaml against the chain of
+checks it replaced in create_customer.
+
+Reports the CPU time per payload for a valid payload, a payload with one error and a
+payload with several errors. The replaced checks stop at the first error; the compiled
+validator always reports them all.
+
+Usage (from the repository root):
+    python -m benchmarks.payload_validation
+    python -m benchmarks.payload_validation --repeat 200000
+"""
+
+import argparse
+import time
+from app.helpers import validate_email, validate_postal_code
+from app.validation import validate_customer_create
+
+VALID = {"first_name": "Ada", "last_name": "Lovelace", "email": "ada.lovelace@example.com",
+         "electricity_usage_kwh": 10200, "old_roof": False,
+         "property_address": {"street": "1 Main St", "city": "Boston", "postal_code": "02110", "state_code": "MA"}}
+PAYLOADS = [
+    ("valid", VALID),
+    ("one error", dict(VALID, old_roof="no")),
+    ("several errors", dict(VALID, email="ada", old_roof="no", property_address={"postal_code": "2110", "state_code": "TOOLONG"})),
+]
+
+
+def replaced_checks(customer_payload):
+    # The checks create_customer made before the compiled validator, returning the first error
+    if not {"first_name", "last_name", "email"}.issubset(customer_payload.keys()):
+        return "Missing Required Information"
+    if not validate_email(customer_payload.get("email")):
+        return "Please enter correct email - abc@xyz.com"
+    if "electricity_usage_kwh" in customer_payload.keys() and not isinstance(customer_payload.get("electricity_usage_kwh"), int):
+        return "electricity_usage_kwh should be number"
+    if "old_roof" in customer_payload.keys() and not isinstance(customer_payload.get("old_roof"), bool):
+        return "old_roof should be boolean"
+    property_address_payload = customer_payload.get("property_address")
+    if property_address_payload is not None and "postal_code" in property_address_payload.keys() and not validate_postal_code(property_address_payload.get("postal_code")):
+        return "Invalid Postal Code. It should be a 5-digit number."
+    if property_address_payload is not None and property_address_payload.get("state_code") is not None and len(property_address_payload.get("state_code")) > 5:
+        return "Invalid State Code. It should be at most 5 characters."
+    return None
+
+
+def cpu_per_call(function, payload, repeat, rounds=5):
+    # Best of several rounds, as single calls take about a microsecond
+    best = None
+    for _ in range(rounds):
+        started = time.process_time()
+        for _ in range(repeat):
+            function(payload)
+        seconds = (time.process_time() - started) / repeat
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50000)
+    args = parser.parse_args()
+
+    for name, payload in PAYLOADS:
+        replaced = cpu_per_call(replaced_checks, payload, args.repeat)
+        compiled = cpu_per_call(validate_customer_create, payload, args.repeat)
+        print(f"{name:>15}: replaced checks {replaced * 1e6:6.2f} us, compiled {compiled * 1e6:6.2f} us "
+              f"({replaced / compiled:4.1f}x), {len(validate_customer_create(payload))} error(s) reported")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark the PostalCodeGrid behind GET /customers/near.
+
+Reports the build time and memory of the grid, and the latency of radius lookups around
+random postal codes. Uses a GeoNames-format file such as the bundled app/data/US.txt.gz
+when given, otherwise synthetic centroids spread over the contiguous US in the same
+number (about 41,000).
+
+Usage (from the repository root):
+    python -m benchmarks.postal_proximity --path app/data/US.txt.gz
+    python -m benchmarks.postal_proximity --points 41000 --lookups 2000
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from app.geo import GRID_CELL_DEGREES, PostalCodeGrid, read_geonames_postal_codes
+
+
+def synthetic_points(rng, count):
+    codes = rng.sample(range(1000, 100000), count)
+    return [(f"{code:05d}", rng.uniform(25.0, 49.0), rng.uniform(-124.0, -67.0)) for code in codes]
+
+
+def percentile(samples, percent):
+    return samples[max(0, int(round(percent / 100 * len(samples))) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=None, help="GeoNames postal code file; synthetic points when omitted")
+    parser.add_argument("--points", type=int, default=41000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--cell-degrees", type=float, default=GRID_CELL_DEGREES)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.path:
+        points = [(code, latitude, longitude) for code, _, _, latitude, longitude in read_geonames_postal_codes(args.path)]
+    else:
+        points = synthetic_points(rng, args.points)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    grid = PostalCodeGrid(points, cell_degrees=args.cell_degrees)
+    build_seconds = time.perf_counter() - started
+    grid_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"{len(grid)} postal codes, {len(grid.cells)} cells of {args.cell_degrees} degrees")
+    print(f"build {build_seconds * 1e3:.0f} ms, grid {grid_bytes / 2 ** 20:.1f} MiB")
+    print(f"{'radius km':>9} {'codes':>7} {'p50 us':>8} {'p99 us':>8}")
+    origins = [rng.choice(points)[0] for _ in range(args.lookups)]
+    for radius_km in (5, 25, 50, 100, 250):
+        latencies, found = [], 0
+        for origin in origins:
+            started = time.perf_counter()
+            found += len(grid.near(origin, radius_km))
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        print(f"{radius_km:>9} {found / len(origins):>7.0f} "
+              f"{percentile(latencies, 50) * 1e6:>8.0f} {percentile(latencies, 99) * 1e6:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark the protobuf representation of customers against JSON (app.fastjson, orjson
+when installed).
+
+Reports payload bytes and the CPU time to encode a single customer response and a list
+response of --page customers, and to decode a bulk ingest body of --page customers
+(a CustomerList message against a JSON array).
+
+Usage (from the repository root):
+    python -m benchmarks.protobuf_encoding
+    python -m benchmarks.protobuf_encoding --page 1000 --repeat 2000
+"""
+
+import argparse
+import time
+import uuid
+from app import fastjson
+from app.protobuf import decode_customers, encode_customer, encode_customers
+
+
+def customer(index):
+    return {
+        "id": str(uuid.uuid4()), "first_name": f"First{index}", "last_name": f"Last{index}",
+        "email": f"customer{index}@example.com", "electricity_usage_kwh": 1000 + index, "old_roof": index % 2 == 0,
+        "property_address": {"street": f"{index} Main St", "city": "Boston", "state_code": "MA",
+                             "postal_code": "02110" if index % 3 else None},
+    }
+
+
+def cpu_per_call(function, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        function()
+    return (time.process_time() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5000)
+    args = parser.parse_args()
+
+    single = customer(0)
+    page = [customer(index) for index in range(args.page)]
+    json_page, protobuf_page = fastjson.dumps(page), encode_customers(page)
+    print(f"json encoder: {'orjson' if fastjson.orjson is not None else 'stdlib json (orjson not installed)'}")
+
+    cases = [
+        ("single response", len(fastjson.dumps(single)), len(encode_customer(single)),
+         lambda: fastjson.dumps(single), lambda: encode_customer(single), args.repeat),
+        (f"list of {args.page}", len(json_page), len(protobuf_page),
+         lambda: fastjson.dumps(page), lambda: encode_customers(page), max(1, args.repeat // 10)),
+        (f"ingest {args.page}", len(json_page), len(protobuf_page),
+         lambda: fastjson.loads(json_page), lambda: decode_customers(protobuf_page), max(1, args.repeat // 10)),
+    ]
+    for name, json_bytes, protobuf_bytes, json_call, protobuf_call, repeat in cases:
+        json_seconds = cpu_per_call(json_call, repeat)
+        protobuf_seconds = cpu_per_call(protobuf_call, repeat)
+        print(f"{name:>16}: json {json_bytes:7d} B {json_seconds * 1e6:8.1f} us, "
+              f"protobuf {protobuf_bytes:7d} B {protobuf_seconds * 1e6:8.1f} us "
+              f"({protobuf_bytes / json_bytes * 100:5.1f}% of the bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark gzip compression of customer responses at several compression levels.
+
+Reports, for a single customer and for lists of customers encoded as JSON, the gzip size
+and the CPU time to compress once per level. The single customer shows why responses
+below GZIP_MINIMUM_SIZE are sent as they are; the lists show the level trade-off behind
+GZIP_COMPRESS_LEVEL.
+
+Usage (from the repository root):
+    python -m benchmarks.response_compression
+    python -m benchmarks.response_compression --pages 100 1000 --levels 1 6 9 --repeat 50
+"""
+
+import argparse
+import time
+import uuid
+from app.compression import GZIP_COMPRESS_LEVEL, GZIP_MINIMUM_SIZE, gzip_compressor
+from app.fastjson import dumps
+
+
+def customer(index):
+    return {
+        "id": str(uuid.uuid4()), "first_name": f"First{index}", "last_name": f"Last{index}",
+        "email": f"customer{index}@example.com", "electricity_usage_kwh": 1000 + index, "old_roof": index % 2 == 0,
+        "property_address": {"street": f"{index} Main St", "city": "Boston", "state_code": "MA", "postal_code": "02110"},
+    }
+
+
+def compress(body, level):
+    compressor = gzip_compressor(level)
+    return compressor.compress(body) + compressor.flush()
+
+
+def cpu_per_call(function, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        function()
+    return (time.process_time() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, GZIP_COMPRESS_LEVEL, 9])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    bodies = [("single customer", dumps(customer(0)))]
+    bodies += [(f"list of {page}", dumps([customer(index) for index in range(page)])) for page in args.pages]
+    print(f"threshold {GZIP_MINIMUM_SIZE} B, default level {GZIP_COMPRESS_LEVEL}")
+    for name, body in bodies:
+        results = []
+        for level in args.levels:
+            size = len(compress(body, level))
+            # Small bodies compress in microseconds and need more calls to time
+            repeat = args.repeat * 10 if len(body) < GZIP_MINIMUM_SIZE else args.repeat
+            seconds = cpu_per_call(lambda: compress(body, level), repeat)
+            results.append(f"level {level}: {size:7d} B ({size / len(body) * 100:5.1f}%) {seconds * 1e6:8.1f} us")
+        print(f"{name:>16} {len(body):8d} B | " + " | ".join(results))
+
+
+if __name__ == "__main__":
+    main()
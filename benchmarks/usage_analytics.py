@@ -0,0 +1,70 @@
+"""
+Benchmark the columnar usage snapshot behind GET /analytics/usage.
+
+Appends synthetic customers to a UsageSnapshot, then reports the memory the columns take
+and the latency of a group-by with percentiles for each grouping column, on the NumPy
+path when NumPy is installed and on the stdlib array path.
+
+Usage (from the repository root):
+    python -m benchmarks.usage_analytics --rows 1000000
+    python -m benchmarks.usage_analytics --rows 200000 --repeat 10
+"""
+
+import argparse
+import random
+import time
+from app import analytics
+from app.analytics import UsageSnapshot, GROUP_BY_COLUMNS
+
+STATES = ["MA", "NY", "CA", "TX", "FL", "PA", "NJ", "WA", "IL", "OH", "GA", "NC", "MI", "AZ", "CO", "OR"]
+
+
+def build_snapshot(rng, count):
+    snapshot = UsageSnapshot()
+    for _ in range(count):
+        usage = int(rng.lognormvariate(6.5, 0.5)) if rng.random() < 0.95 else None
+        old_roof = rng.random() < 0.3 if rng.random() < 0.9 else None
+        state_code = rng.choice(STATES) if rng.random() < 0.97 else None
+        postal_code = f"{rng.randint(1000, 99999):05d}" if state_code else None
+        snapshot.append(usage, old_roof, state_code, postal_code)
+    return snapshot
+
+
+def column_bytes(snapshot):
+    columns = (snapshot.usage, snapshot.usage_valid, snapshot.old_roof, snapshot.state, snapshot.postal)
+    return sum(len(column) * column.itemsize for column in columns)
+
+
+def time_group_by(snapshot, repeat):
+    timings = {}
+    for group_by in GROUP_BY_COLUMNS:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            snapshot.group_by(group_by, percentiles=(50, 90, 99))
+        timings[group_by] = (time.perf_counter() - started) / repeat
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    snapshot = build_snapshot(rng, args.rows)
+    build_seconds = time.perf_counter() - started
+    print(f"{args.rows} customers, snapshot built in {build_seconds:.1f} s, columns {column_bytes(snapshot) / 2 ** 20:.1f} MiB")
+
+    paths = [("numpy", analytics.np)] if analytics.np is not None else []
+    paths.append(("arrays", None))
+    for name, numpy_module in paths:
+        analytics.np = numpy_module
+        timings = time_group_by(snapshot, args.repeat)
+        print(f"{name:>6}: " + ", ".join(f"{group_by} {seconds * 1e3:.0f} ms" for group_by, seconds in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark UUID primary keys stored as String(255) text against 16-byte BinaryUUID.
+
+Builds one table per key type with the same rows, then reports the primary key index
+size and the speed of random point lookups through SQLAlchemy.
+
+Usage (from the repository root):
+    python -m benchmarks.uuid_keys --rows 10000000
+    python -m benchmarks.uuid_keys --rows 1000000 --url sqlite:////tmp/uuid_keys.db
+
+Only SQLite reports per-index sizes (through the dbstat table); on other databases the
+index size column is left empty.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+from sqlalchemy import Column, MetaData, String, Table, bindparam, create_engine, select, text
+from app.models.types import BinaryUUID
+
+BATCH_SIZE = 50000
+
+
+def build_table(metadata, name, id_type):
+    return Table(name, metadata, Column("id", id_type, primary_key=True), Column("payload", String(32)))
+
+
+def index_bytes(connection, table_name):
+    if connection.dialect.name != "sqlite":
+        return None
+    index_name = f"sqlite_autoindex_{table_name}_1"
+    return connection.execute(
+        text("SELECT SUM(pgsize) FROM dbstat WHERE name = :name"), {"name": index_name}
+    ).scalar()
+
+
+def load(engine, table, ids):
+    with engine.begin() as connection:
+        for start in range(0, len(ids), BATCH_SIZE):
+            connection.execute(table.insert(), [{"id": value, "payload": "x"} for value in ids[start:start + BATCH_SIZE]])
+
+
+def time_lookups(engine, table, ids, lookups):
+    sample = random.sample(ids, lookups)
+    query = select(table.c.payload).where(table.c.id == bindparam("id"))
+    with engine.connect() as connection:
+        started = time.perf_counter()
+        for value in sample:
+            connection.execute(query, {"id": value}).scalar()
+        elapsed = time.perf_counter() - started
+    return elapsed / lookups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--url", default=None, help="database URL; defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'uuid_keys.db')}"
+    engine = create_engine(url)
+    metadata = MetaData()
+    tables = {
+        "String(255)": build_table(metadata, "bench_text_id", String(255)),
+        "BinaryUUID": build_table(metadata, "bench_binary_id", BinaryUUID),
+    }
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    ids = [str(uuid.uuid4()) for _ in range(args.rows)]
+    print(f"{args.rows} rows, {args.lookups} random point lookups, {engine.dialect.name}")
+    print(f"{'key type':<12} {'load s':>8} {'pk index MiB':>13} {'lookup us':>10}")
+    for label, table in tables.items():
+        started = time.perf_counter()
+        load(engine, table, ids)
+        load_seconds = time.perf_counter() - started
+        with engine.connect() as connection:
+            size = index_bytes(connection, table.name)
+        lookup = time_lookups(engine, table, ids, min(args.lookups, args.rows))
+        size_text = f"{size / 2 ** 20:.1f}" if size else "-"
+        print(f"{label:<12} {load_seconds:>8.1f} {size_text:>13} {lookup * 1e6:>10.1f}")
+
+    metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
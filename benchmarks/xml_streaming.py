@@ -0,0 +1,131 @@
+"""
+Benchmark memory use of GET /customers as XML: the streamed document against a document
+built as a DOM.
+
+Seeds a temporary SQLite database with --rows customers and their property addresses, then
+- streams the whole list through read_customers with Accept: application/xml, reading
+  rows in batches from a cursor and discarding the chunks as a client would
+- loads every row, serializes it and builds the same document with xml.etree.ElementTree
+
+and reports the time, document size and growth of the process's peak RSS for each. The
+streamed run goes first, so the DOM run's growth is measured on top of it.
+
+Usage (from the repository root):
+    python -m benchmarks.xml_streaming
+    python -m benchmarks.xml_streaming --rows 100000
+    python -m benchmarks.xml_streaming --no-dom
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import uuid
+import xml.etree.ElementTree as ElementTree
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+from app.database import Base
+from app.models.customer import CustomerModel
+from app.models.propertyAddress import PropertyAddressModel
+from app.routers.customer import read_customers
+from app.schemas.customer import Customer
+from app.serializers import CUSTOMER_COLUMNS, serialize_customer
+
+INSERT_BATCH = 10000
+
+
+def seed(url, rows):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        for start in range(0, rows, INSERT_BATCH):
+            customers, addresses = [], []
+            for index in range(start, min(rows, start + INSERT_BATCH)):
+                customer_id = str(uuid.UUID(int=index))
+                customers.append({"id": customer_id, "first_name": f"First{index}", "last_name": f"Last{index}",
+                                  "email": f"customer{index}@example.com", "electricity_usage_kwh": 1000 + index % 9000,
+                                  "old_roof": index % 2 == 0})
+                addresses.append({"id": str(uuid.uuid4()), "customer_id": customer_id, "street": f"{index} Main St",
+                                  "city": "Boston", "state_code": "MA", "postal_code": "02110"})
+            connection.execute(insert(CustomerModel.__table__), customers)
+            connection.execute(insert(PropertyAddressModel.__table__), addresses)
+    engine.dispose()
+
+
+def peak_rss_mib():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def stream(session_factory):
+    request = Request({"type": "http", "method": "GET", "path": "/customers", "query_string": b"",
+                       "headers": [(b"accept", b"application/xml")]})
+
+    async def consume(response):
+        size = 0
+        async for chunk in response.body_iterator:
+            size += len(chunk)
+        return size
+
+    db = session_factory()
+    try:
+        return asyncio.run(consume(read_customers(db, request=request)))
+    finally:
+        db.close()
+
+
+def build_dom(session_factory):
+    db = session_factory()
+    try:
+        contents = [serialize_customer(row) for row in db.query(*CUSTOMER_COLUMNS).order_by(CustomerModel.id).all()]
+    finally:
+        db.close()
+    root = ElementTree.Element("customers")
+    for content in contents:
+        customer = ElementTree.SubElement(root, "customer")
+        for name in Customer.__fields__:
+            value = content[name]
+            if value is not None:
+                ElementTree.SubElement(customer, name).text = str(value).lower() if isinstance(value, bool) else str(value)
+    return len(ElementTree.tostring(root, encoding="utf-8", xml_declaration=True))
+
+
+def measure(name, function, session_factory):
+    before = peak_rss_mib()
+    started = time.perf_counter()
+    size = function(session_factory)
+    seconds = time.perf_counter() - started
+    print(f"{name:>8}: {seconds:6.1f} s, {size / 2 ** 20:7.1f} MiB document, "
+          f"peak RSS +{peak_rss_mib() - before:7.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--no-dom", action="store_true", help="skip the DOM run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'customers.db')}"
+        started = time.perf_counter()
+        # Seeded by a child process, so its memory does not count towards the peaks below
+        seeder = multiprocessing.Process(target=seed, args=(url, args.rows))
+        seeder.start()
+        seeder.join()
+        print(f"{args.rows} customers seeded in {time.perf_counter() - started:.1f} s, "
+              f"peak RSS before the runs {peak_rss_mib():.1f} MiB")
+        engine = create_engine(url)
+        session_factory = sessionmaker(bind=engine)
+
+        measure("streamed", stream, session_factory)
+        if not args.no_dom:
+            measure("dom", build_dom, session_factory)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark the memory-mapped ZIP table used to check and complete property addresses.
+
+Builds a table file from a GeoNames-format file such as the bundled app/data/US.txt.gz
+when given, otherwise from synthetic rows in the same number (about 41,000), then reports
+its size, the time to map it, the memory a process allocates for it, and the time per
+lookup, one at a time and through lookup_many for a bulk import batch.
+
+Usage (from the repository root):
+    python -m benchmarks.zip_lookup --path app/data/US.txt.gz
+    python -m benchmarks.zip_lookup --codes 41000 --lookups 100000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from app.geo import read_geonames_postal_codes
+from app.models.types import STATE_CODES
+from app.zipcodes import ZipTable, build_zip_table
+
+
+def synthetic_rows(rng, count):
+    codes = rng.sample(range(1000, 100000), count)
+    return [(f"{code:05d}", f"Place {rng.randrange(count // 2)}", rng.choice(STATE_CODES[:51])) for code in codes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=None, help="GeoNames postal code file; synthetic rows when omitted")
+    parser.add_argument("--codes", type=int, default=41000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.path:
+        rows = [(code, city, state_code) for code, city, state_code, _, _ in read_geonames_postal_codes(args.path)]
+    else:
+        rows = synthetic_rows(rng, args.codes)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "zipcodes.bin")
+        started = time.perf_counter()
+        count = build_zip_table(rows, path)
+        build_seconds = time.perf_counter() - started
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        table = ZipTable(path)
+        open_seconds = time.perf_counter() - started
+        table_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{count} postal codes, file {os.path.getsize(path) / 2 ** 10:.0f} KiB, build {build_seconds * 1e3:.0f} ms")
+        print(f"map {open_seconds * 1e6:.0f} us, {table_bytes / 2 ** 10:.1f} KiB allocated on the Python heap")
+
+        # Mostly known codes, as in real traffic, with some unknown ones
+        codes = [rng.choice(rows)[0] if rng.random() < 0.9 else f"{rng.randrange(100000):05d}"
+                 for _ in range(args.lookups)]
+        started = time.perf_counter()
+        for code in codes:
+            table.lookup(code)
+        single = (time.perf_counter() - started) / len(codes)
+        started = time.perf_counter()
+        table.lookup_many(codes)
+        batch = (time.perf_counter() - started) / len(codes)
+        print(f"lookup {single * 1e6:.2f} us, lookup_many {batch * 1e6:.2f} us per postal code")
+        table.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,27 @@
 from fastapi import FastAPI
 from app.routers.customer import router as customer_router
+from app.routers.metrics import router as metrics_router
+from app.routers.analytics import router as analytics_router
+from app.routers.stats import router as stats_router
+from app.compression import CompressionMiddleware
+from app.zipcodes import zip_table
 import uvicorn
 
 app = FastAPI()
 
+# Large responses are gzip-compressed for clients that accept it
+app.add_middleware(CompressionMiddleware)
+
 # Include the customer router from app.customer module
 app.include_router(customer_router)
+app.include_router(metrics_router)
+app.include_router(analytics_router)
+app.include_router(stats_router)
+
+@app.on_event("startup")
+def load_zip_table():
+    # Mapped before the first request, so a missing table is reported when the server starts
+    zip_table()
 
 @app.get("/")
 def read_root():